@@ -0,0 +1,97 @@
+"""Compare per-object ORM inserts with the batched envoxy helper.
+
+Inserts the same rows with ``session.add`` (one flush per object through
+the listeners) and with :func:`envoxy.db.orm.bulk_insert` (audit fields
+filled per batch, one ``insertmanyvalues`` INSERT per page) and reports
+the rows per second.
+
+In memory:
+
+    python scripts/benchmark_orm_bulk_insert.py --rows 20000
+
+Against a server:
+
+    python scripts/benchmark_orm_bulk_insert.py --url postgresql+psycopg2://u:p@db/app
+"""
+
+import argparse
+import time
+
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import sessionmaker
+
+from envoxy.db.orm import EnvoxyBase, bulk_insert, register_envoxy_listeners
+
+
+class BenchItem(EnvoxyBase):
+    __tablename__ = "bench_bulk_items"
+
+    name = Column(String(64), nullable=False)
+    qty = Column(Integer)
+
+
+def _rows(count):
+    return [{"name": f"item {_n}", "qty": _n} for _n in range(count)]
+
+
+def _session_add(session, rows):
+    for _row in rows:
+        session.add(BenchItem(**_row))
+        # flushing per object is what request handlers creating rows do
+        session.flush()
+
+
+def _session_add_all(session, rows):
+    session.add_all([BenchItem(**_row) for _row in rows])
+
+
+def _bulk_insert(session, rows):
+    bulk_insert(session, BenchItem, rows)
+
+
+STRATEGIES = {
+    "session.add + flush": _session_add,
+    "session.add_all": _session_add_all,
+    "bulk_insert": _bulk_insert,
+}
+
+
+def main():
+    _parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    _parser.add_argument("--url", default="sqlite://")
+    _parser.add_argument("--rows", type=int, default=10000)
+    _args = _parser.parse_args()
+
+    register_envoxy_listeners()
+
+    _engine = create_engine(_args.url)
+    _session_factory = sessionmaker(bind=_engine)
+
+    print(f"{'strategy':<22} {'seconds':>9} {'rows/s':>10} {'speedup':>8}")
+
+    _baseline = None
+
+    for _label, _insert in STRATEGIES.items():
+        BenchItem.__table__.drop(_engine, checkfirst=True)
+        BenchItem.__table__.create(_engine)
+
+        _data = _rows(_args.rows)
+
+        with _session_factory() as _session:
+            _start = time.perf_counter()
+            _insert(_session, _data)
+            _session.commit()
+            _elapsed = time.perf_counter() - _start
+
+        _baseline = _baseline or _elapsed
+
+        print(
+            f"{_label:<22} {_elapsed:>9.3f} {_args.rows / _elapsed:>10.0f} "
+            f"{_baseline / _elapsed:>7.1f}x"
+        )
+
+    BenchItem.__table__.drop(_engine, checkfirst=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Compare the PostgreSQL connection liveness strategies of pgsqlc.
+
+Runs the same queries with the former checks (``SELECT 1`` on every
+checkout and release) and with the default ones (cheap checks, ping only
+after ``ping_after_idle`` seconds idle) and reports the round trips and the
+time per query.
+
+Against a server:
+
+    python scripts/benchmark_pg_liveness.py --host db --db app --user u --passwd p
+
+Without one, every round trip of an in-process fake connection sleeps
+``--fake-rtt-ms``:
+
+    python scripts/benchmark_pg_liveness.py --fake-rtt-ms 0.5
+"""
+
+import argparse
+import time
+
+import psycopg2.extensions
+
+from envoxy.postgresql.client import Client, SemaphoreThreadedConnectionPool
+
+STRATEGIES = {
+    "ping on checkout + release": {"ping_after_idle": 0, "health_check_on_release": True},
+    "cheap checks + idle ping": {},
+}
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def execute(self, query, params=None):
+        self._conn.round_trips += 1
+        time.sleep(self._conn.rtt)
+
+    def fetchall(self):
+        return [{"now": 1}]
+
+    rowcount = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _FakeConn:
+    closed = 0
+
+    class info:
+        transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.round_trips = 0
+
+    def cursor(self, *args, **kwargs):
+        return _FakeCursor(self)
+
+    def close(self):
+        self.closed = 1
+
+
+class _FakePool(SemaphoreThreadedConnectionPool):
+    def __init__(self, minconn, maxconn, rtt):
+        self.conns = []
+        super().__init__(minconn, maxconn, rtt=rtt)
+
+    def _connect(self):
+        _conn = _FakeConn(self._kwargs["rtt"])
+        self.conns.append(_conn)
+
+        return _conn
+
+
+def _client(conf, fake_rtt):
+    Client._instance = None
+
+    if fake_rtt is None:
+        return Client({"bench": conf})
+
+    # same code paths, without a server behind the connections
+    Client._start_validator = lambda self: None
+
+    _client = object.__new__(Client)
+    _client._instances = {
+        "bench": {"server": "bench", "conf": conf, "conn_pool": _FakePool(1, 4, fake_rtt)}
+    }
+    _client._retired_pools = []
+
+    return _client
+
+
+def _round_trips(client):
+    _pool = client._instances["bench"]["conn_pool"]
+
+    return sum(_conn.round_trips for _conn in getattr(_pool, "conns", ()))
+
+
+def main():
+    _parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    _parser.add_argument("--host", default="localhost")
+    _parser.add_argument("--port", type=int, default=5432)
+    _parser.add_argument("--db", default="postgres")
+    _parser.add_argument("--user", default="postgres")
+    _parser.add_argument("--passwd", default="")
+    _parser.add_argument("--queries", type=int, default=2000)
+    _parser.add_argument("--fake-rtt-ms", type=float, default=None)
+    _args = _parser.parse_args()
+
+    _fake_rtt = None if _args.fake_rtt_ms is None else _args.fake_rtt_ms / 1000
+
+    _server_conf = {
+        "host": _args.host,
+        "port": _args.port,
+        "db": _args.db,
+        "user": _args.user,
+        "passwd": _args.passwd,
+    }
+
+    print(f"{'strategy':<28} {'pings':>8} {'round trips':>12} {'per query':>12}")
+
+    for _label, _strategy in STRATEGIES.items():
+        _client_obj = _client({**_server_conf, **_strategy}, _fake_rtt)
+
+        _pings = 0
+        _is_healthy = _client_obj._is_connection_healthy
+
+        def _counting(conn, ping=True, _is_healthy=_is_healthy):
+            nonlocal _pings
+            _pings += bool(ping)
+            return _is_healthy(conn, ping=ping)
+
+        _client_obj._is_connection_healthy = _counting
+
+        _start = time.perf_counter()
+
+        for _ in range(_args.queries):
+            _client_obj.query("bench", "select now()")
+
+        _elapsed = (time.perf_counter() - _start) / _args.queries
+
+        # against a server: one round trip per query plus the pings
+        _trips = _round_trips(_client_obj) if _fake_rtt is not None else _args.queries + _pings
+
+        print(
+            f"{_label:<28} {_pings:>8} {_trips:>12} {_elapsed * 1000:>9.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
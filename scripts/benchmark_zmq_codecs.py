@@ -0,0 +1,109 @@
+"""Compare the ZMQ wire codecs on data-layer shaped payloads.
+
+Measures encode + decode time and wire size for every codec in
+``envoxy.zeromq.codecs``, plus a binary blob sent either base64 encoded in
+the JSON body or as a raw attachment frame.
+
+    python scripts/benchmark_zmq_codecs.py --records 1000 --rounds 200
+"""
+
+import argparse
+import base64
+import datetime
+import functools
+import random
+import time
+import uuid
+
+from envoxy.zeromq.codecs import CODECS, decode_frames, encode_frames, get_codec
+
+
+def _record(i):
+    return {
+        "id": str(uuid.uuid4()),
+        "href": f"/v3/data-layer/products/{i}",
+        "name": f"product {i}",
+        "status": random.choice(["active", "inactive", "pending"]),
+        "price": round(random.uniform(0, 1000), 2),
+        "stock": random.randint(0, 10000),
+        "tags": [f"tag{random.randint(0, 50)}" for _ in range(5)],
+        "created": datetime.datetime.now().isoformat(),
+        "attributes": {f"attr{_j}": random.random() for _j in range(10)},
+        "readings": [random.random() for _ in range(50)],
+    }
+
+
+def _message(records):
+    return {
+        "resource": "/v3/data-layer/products",
+        "performative": 7,
+        "status": 200,
+        "headers": {"X-Cid": str(uuid.uuid4()), "Content-Type": "application/json"},
+        "payload": {"elements": records, "size": len(records)},
+    }
+
+
+def _bench(label, rounds, encode, decode):
+    _frames = encode()
+    _size = sum(len(_frame) for _frame in _frames)
+
+    _start = time.perf_counter()
+    for _ in range(rounds):
+        encode()
+    _encode = (time.perf_counter() - _start) / rounds
+
+    _start = time.perf_counter()
+    for _ in range(rounds):
+        decode(_frames)
+    _decode = (time.perf_counter() - _start) / rounds
+
+    print(
+        f"{label:<28} {_size / 1024:>10.1f} KiB {_encode * 1000:>10.3f} ms {_decode * 1000:>10.3f} ms"
+    )
+
+
+def main():
+    _parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    _parser.add_argument("--records", type=int, default=1000)
+    _parser.add_argument("--rounds", type=int, default=100)
+    _parser.add_argument("--blob-kib", type=int, default=1024)
+    _args = _parser.parse_args()
+
+    _message_obj = _message([_record(_i) for _i in range(_args.records)])
+    _blob = random.randbytes(_args.blob_kib * 1024)
+
+    print(f"{'codec':<28} {'size':>14} {'encode':>13} {'decode':>13}")
+
+    for _name in CODECS:
+        try:
+            _codec = get_codec(_name)
+        except ImportError as e:
+            print(f"{_name:<28} skipped: {e}")
+            continue
+
+        _bench(
+            f"{_name} records",
+            _args.rounds,
+            functools.partial(encode_frames, _codec, _message_obj),
+            decode_frames,
+        )
+
+        _with_b64 = dict(_message_obj, blob=base64.b64encode(_blob).decode())
+
+        _bench(
+            f"{_name} blob base64",
+            _args.rounds,
+            functools.partial(encode_frames, _codec, _with_b64),
+            lambda _frames: base64.b64decode(decode_frames(_frames)["blob"]),
+        )
+
+        _bench(
+            f"{_name} blob attachment",
+            _args.rounds,
+            functools.partial(encode_frames, _codec, _message_obj, [_blob]),
+            decode_frames,
+        )
+
+
+if __name__ == "__main__":
+    main()
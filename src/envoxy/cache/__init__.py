@@ -1,9 +1,19 @@
+import threading
+
 from ..utils.config import Config
-from ..constants import REDIS_BACKEND
+from ..constants import MEMORY_BACKEND, REDIS_BACKEND, TIERED_BACKEND
+from ..utils.encoders import envoxy_json_dumps
+from .memory import MemoryCache
 from .redis import RedisCache
+from .tiered import TieredCache
 
 
 class Cache:
+    # In-process backends are shared so every ``@cache`` view and the ZMQ
+    # cached routes read the same memory tier
+    _shared = {}
+    _lock = threading.Lock()
+
     def __init__(self):
         config = Config.get("cache")
         self.backend = config.get("backend")
@@ -11,6 +21,16 @@ class Cache:
         if self.backend == REDIS_BACKEND:
             self._redis = RedisCache(config)
 
+        elif self.backend in (MEMORY_BACKEND, TIERED_BACKEND):
+            _key = (self.backend, envoxy_json_dumps(config))
+
+            with self._lock:
+                if _key not in self._shared:
+                    _klass = MemoryCache if self.backend == MEMORY_BACKEND else TieredCache
+                    self._shared[_key] = _klass(config)
+
+            self._local = self._shared[_key]
+
     @property
     def redis(self):
         return self._redis
@@ -19,4 +39,7 @@ class Cache:
         if self.backend == REDIS_BACKEND:
             return self.redis
 
+        if self.backend in (MEMORY_BACKEND, TIERED_BACKEND):
+            return self._local
+
         raise NotImplementedError
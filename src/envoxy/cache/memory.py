@@ -0,0 +1,133 @@
+import collections
+import threading
+import time
+
+from ..constants import (
+    MEMORY_CACHE_DEFAULT_TTL,
+    MEMORY_CACHE_MAX_BYTES,
+    MEMORY_CACHE_MAX_ENTRIES,
+)
+from ..utils.encoders import envoxy_json_dumps, envoxy_json_loads
+
+
+class MemoryCache:
+    """In-process LRU cache with per-entry TTL.
+
+    Bounded by ``max_entries`` and by ``max_bytes`` of serialized values;
+    the least recently used entries are evicted first. Values are stored
+    serialized, so callers always get their own copy back.
+    """
+
+    def __init__(self, config):
+        self.ttl = config.get("ttl", MEMORY_CACHE_DEFAULT_TTL)
+        self.key_prefix = config.get("key_prefix")
+        self.max_entries = int(config.get("max_entries", MEMORY_CACHE_MAX_ENTRIES))
+        self.max_bytes = int(config.get("max_bytes", MEMORY_CACHE_MAX_BYTES))
+
+        self._lock = threading.Lock()
+        # key -> (data, expires_at, origin_expires_at)
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get_key(self, endpoint, method, params):
+        return f"{self.key_prefix}:{endpoint}:{method}:{envoxy_json_dumps(params).decode()}"
+
+    def _pop(self, key):
+        _entry = self._entries.pop(key)
+        self._bytes -= len(_entry[0])
+
+    def get_raw(self, key):
+        """Return ``(data, expires_at, origin_expires_at)`` for ``key``, or
+        ``None`` when it is missing or expired.
+        """
+        with self._lock:
+            _entry = self._entries.get(key)
+
+            if _entry is None:
+                self.misses += 1
+                return None
+
+            if _entry[1] <= time.monotonic():
+                self._pop(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return _entry
+
+    def set_raw(self, key, data, expires_at, origin_expires_at=None):
+        """Store serialized ``data`` until ``expires_at`` (monotonic clock).
+
+        ``origin_expires_at`` is kept alongside for tiers caching another
+        cache, to remember when the source entry expires.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+            if len(data) > self.max_bytes:
+                return False
+
+            self._entries[key] = (data, expires_at, origin_expires_at)
+            self._bytes += len(data)
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _entry = self._entries.popitem(last=False)[1]
+                self._bytes -= len(_entry[0])
+                self.evictions += 1
+
+        return True
+
+    def delete_raw(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get(self, endpoint, method, params):
+        _entry = self.get_raw(self._get_key(endpoint, method, params))
+        return envoxy_json_loads(_entry[0]) if _entry else {}
+
+    def get_with_ttl(self, endpoint, method, params):
+        _entry = self.get_raw(self._get_key(endpoint, method, params))
+
+        if not _entry:
+            return {}, None
+
+        return envoxy_json_loads(_entry[0]), int(_entry[1] - time.monotonic())
+
+    def set(self, endpoint, method, params, json_data, ttl=None):
+        ttl = ttl if ttl else self.ttl
+
+        return self.set_raw(
+            self._get_key(endpoint, method, params),
+            envoxy_json_dumps(json_data),
+            time.monotonic() + ttl,
+        )
+
+    def delete(self, endpoint, method, params):
+        self.delete_raw(self._get_key(endpoint, method, params))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -34,24 +34,49 @@ class RedisCache:
     def _decode_params(self, params):
         return envoxy_json_loads(base64.urlsafe_b64decode(params).decode())
 
-    def _get_key(self, endpoint, method, params):
+    def make_key(self, endpoint, method, params):
         _b64params = self._encode_params(params)
-        _key = f"{self.key_prefix}:{endpoint}:{method}:{_b64params}"
-        _data = self.r.get(_key)
+        return f"{self.key_prefix}:{endpoint}:{method}:{_b64params}"
+
+    def _get_key(self, endpoint, method, params):
+        _data = self.r.get(self.make_key(endpoint, method, params))
         return envoxy_json_loads(_data) if _data else {}
 
     def _set_key(self, endpoint, method, params, json_data, ttl=None):
-        _b64params = self._encode_params(params)
-        _key = f"{self.key_prefix}:{endpoint}:{method}:{_b64params}"
-        _data = envoxy_json_dumps(json_data)
-        self.r.set(_key, _data)
+        return self.set_raw(
+            self.make_key(endpoint, method, params), envoxy_json_dumps(json_data), ttl
+        )
+
+    def _get_key_with_ttl(self, endpoint, method, params):
+        _data, _ttl = self.get_raw_with_ttl(self.make_key(endpoint, method, params))
 
+        if not _data:
+            return {}, None
+
+        return envoxy_json_loads(_data), _ttl
+
+    def get_raw_with_ttl(self, key):
+        """Return the serialized value of ``key`` and its seconds left."""
+        _pipe = self.r.pipeline(transaction=False)
+        _pipe.get(key)
+        _pipe.ttl(key)
+        _data, _ttl = _pipe.execute()
+
+        return _data, _ttl if _ttl is not None and _ttl >= 0 else None
+
+    def set_raw(self, key, data, ttl=None):
         ttl = ttl if ttl else self.ttl
 
-        return self.r.expire(_key, ttl)
+        return bool(self.r.set(key, data, ex=ttl))
 
     def get(self, endpoint, method, params):
         return self._get_key(endpoint, method, params)
 
+    def get_with_ttl(self, endpoint, method, params):
+        """Return ``(value, seconds left)`` in one round trip; the ttl is
+        ``None`` for missing keys or keys without expiry.
+        """
+        return self._get_key_with_ttl(endpoint, method, params)
+
     def set(self, endpoint, method, params, json_data, ttl=None):
         return self._set_key(endpoint, method, params, json_data, ttl=ttl)
@@ -0,0 +1,143 @@
+import os
+import time
+import uuid
+
+from ..constants import TIERED_CACHE_L1_TTL
+from ..utils.encoders import envoxy_json_dumps, envoxy_json_loads
+from ..utils.logs import Log
+from .memory import MemoryCache
+from .redis import RedisCache
+
+
+class TieredCache:
+    """In-process :class:`MemoryCache` (L1) in front of :class:`RedisCache` (L2).
+
+    Reads are served from L1 when possible and fall back to Redis, filling
+    L1 for at most ``memory.ttl`` seconds (and never past the Redis expiry).
+    Writes go to both tiers. With ``invalidation`` enabled every write is
+    published on a Redis channel so the other processes drop their L1 copy;
+    without it L1 entries may lag Redis by up to ``memory.ttl`` seconds.
+    The subscriber thread does not survive a fork, forked workers start
+    their own on first use.
+
+    ``stats()`` reports the L1 hits, misses and evictions.
+    """
+
+    def __init__(self, config):
+        _memory_conf = dict(config.get("memory") or {})
+        _memory_conf.setdefault("ttl", TIERED_CACHE_L1_TTL)
+
+        self.l1 = MemoryCache(_memory_conf)
+        self.l2 = RedisCache(config)
+        self.ttl = self.l2.ttl
+
+        self._id = None
+        self._channel = None
+        self._subscriber = None
+        self._subscriber_pid = None
+
+        if config.get("invalidation"):
+            self._channel = f"{self.l2.key_prefix}:invalidate"
+            self._subscribe()
+
+    def _subscribe(self):
+        """Start the invalidation subscriber of this process, once per pid."""
+        if self._subscriber_pid == os.getpid():
+            return
+
+        if self._subscriber_pid is not None:
+            # forked: the L1 copied from the parent missed the invalidations
+            # since, and the workers must not share the parent's id
+            self.l1.clear()
+
+        self._subscriber_pid = os.getpid()
+        self._id = uuid.uuid4().hex
+
+        try:
+            _pubsub = self.l2.r.pubsub(ignore_subscribe_messages=True)
+            _pubsub.subscribe(**{self._channel: self._on_invalidate})
+
+            self._subscriber = _pubsub.run_in_thread(
+                sleep_time=1, daemon=True, exception_handler=self._on_subscriber_error
+            )
+        except Exception as e:
+            Log.error(f"TieredCache::subscribe::Error: {e}")
+
+    def _on_subscriber_error(self, e, pubsub, thread):
+        Log.error(f"TieredCache::invalidation::Error: {e}")
+
+        # Entries may have changed while we could not hear about it
+        self.l1.clear()
+
+        time.sleep(1)
+
+    def _on_invalidate(self, message):
+        _sender, _, _key = message["data"].decode().partition(" ")
+
+        if _sender != self._id:
+            self.l1.delete_raw(_key)
+
+    def _fill_l1(self, key, data, ttl):
+        _now = time.monotonic()
+        _l1_ttl = self.l1.ttl if ttl is None else min(self.l1.ttl, ttl)
+
+        if _l1_ttl > 0:
+            self.l1.set_raw(
+                key,
+                data,
+                _now + _l1_ttl,
+                origin_expires_at=None if ttl is None else _now + ttl,
+            )
+
+    def get_with_ttl(self, endpoint, method, params):
+        """Return ``(value, seconds left in Redis)``."""
+        if self._channel:
+            self._subscribe()
+
+        _key = self.l2.make_key(endpoint, method, params)
+
+        _entry = self.l1.get_raw(_key)
+
+        if _entry:
+            _data, _, _origin_expires_at = _entry
+            _ttl = (
+                None
+                if _origin_expires_at is None
+                else int(_origin_expires_at - time.monotonic())
+            )
+        else:
+            _data, _ttl = self.l2.get_raw_with_ttl(_key)
+
+            if not _data:
+                return {}, None
+
+            self._fill_l1(_key, _data, _ttl)
+
+        return envoxy_json_loads(_data), _ttl
+
+    def get(self, endpoint, method, params):
+        return self.get_with_ttl(endpoint, method, params)[0]
+
+    def set(self, endpoint, method, params, json_data, ttl=None):
+        if self._channel:
+            self._subscribe()
+
+        _key = self.l2.make_key(endpoint, method, params)
+        _data = envoxy_json_dumps(json_data)
+
+        ttl = ttl if ttl else self.ttl
+
+        _result = self.l2.set_raw(_key, _data, ttl)
+
+        self._fill_l1(_key, _data, ttl)
+
+        if self._channel:
+            try:
+                self.l2.r.publish(self._channel, f"{self._id} {_key}")
+            except Exception as e:
+                Log.error(f"TieredCache::publish::Error: {e}")
+
+        return _result
+
+    def stats(self):
+        return self.l1.stats()
@@ -11,10 +11,18 @@ SERVER_NAME = "Envoxy Server"
 
 ZEROMQ_POLLIN_TIMEOUT = 5 * 1000
 ZEROMQ_RETRY_TIMEOUT = 2
+ZEROMQ_RETRY_MAX_ATTEMPTS = 3
+ZEROMQ_RETRY_MAX_DELAY = 10
+ZEROMQ_RETRY_DEADLINE = 60
 ZEROMQ_POLLER_RETRIES = 5
 ZEROMQ_MAX_WORKERS = 50
+ZEROMQ_MIN_WORKERS = 1
+ZEROMQ_WORKER_IDLE_TIMEOUT = 60
+ZEROMQ_WORKER_TIMEOUT = 30
 ZEROMQ_MAX_WORKERS_PER_THREAD = 20
 ZEROMQ_CONTEXT = 1
+ZEROMQ_ASYNC_SOCKETS = 1
+ZEROMQ_DEADLINE_HEADER = "X-Deadline"
 
 
 class Performative(enum.IntEnum):
@@ -38,10 +46,28 @@ MAX_CONN = 20
 TIMEOUT_CONN = 5  # 5 seconds
 DEFAULT_CHUNK_SIZE = 10000
 DEFAULT_OFFSET_LIMIT = 0
+DEFAULT_ITERSIZE = 2000  # rows per round trip of the server-side cursors
+PG_PING_AFTER_IDLE = 30  # seconds idle before a pooled connection is pinged on checkout
+PG_VALIDATE_INTERVAL = 60  # seconds between pings of the idle pooled connections
+PG_MAX_LIFETIME = 3600  # seconds before a pooled connection is replaced
+PG_MAX_IDLE_TIME = 600  # seconds idle before a pooled connection beyond min_conn is closed
+PG_PREPARED_STATEMENTS = 0  # prepared statements cached per connection, 0 disables them
+PG_REPLICA_MAX_LAG = 10  # seconds a read replica may lag before it is ejected
+PG_REPLICA_CHECK_INTERVAL = 5  # seconds between replica lag checks
 
 # CACHE
 CACHE_DEFAULT_TTL = 60 * 60  # ttl in seconds (1hr)
 
+# MEMORY
+MEMORY_BACKEND = "memory"
+MEMORY_CACHE_DEFAULT_TTL = CACHE_DEFAULT_TTL
+MEMORY_CACHE_MAX_ENTRIES = 10000
+MEMORY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# TIERED (memory in front of redis)
+TIERED_BACKEND = "tiered"
+TIERED_CACHE_L1_TTL = 5  # seconds an entry may be served from memory
+
 # REDIS
 REDIS_BACKEND = "redis"
 REDIS_DEFAULT_DB = 1
@@ -49,6 +75,20 @@ REDIS_DEFAULT_TTL = CACHE_DEFAULT_TTL
 REDIS_DEFAULT_HOST = "127.0.0.1"
 REDIS_DEFAULT_PORT = "6379"
 
+# LOG SINK (asynchronous log writer)
+LOG_SINK_CAPACITY = 10000  # records queued before the overflow policy applies
+LOG_SINK_BATCH_SIZE = 256
+LOG_SINK_FLUSH_INTERVAL = 0.5  # seconds
+
+# TRACING
+TRACEPARENT_HEADER = "traceparent"
+TRACING_BUFFER_SIZE = 1000  # finished spans kept in memory
+TRACING_SAMPLE_RATE = 1.0
+TRACING_STATEMENT_LENGTH = 256  # SQL prefix recorded on the query spans
+
+# CONFIG
+CONFIG_CHECK_INTERVAL = 2  # seconds between checks of the config file for changes
+
 # ASSERTS
 
 HASH_LENGTH = 45
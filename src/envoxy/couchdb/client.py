@@ -3,6 +3,7 @@ import time
 
 from urllib.parse import quote
 
+from ..utils.circuit_breaker import CircuitBreaker
 from ..utils.logs import Log
 
 
@@ -13,7 +14,13 @@ class Client:
         self._instances = {}
 
         for _server_key, _conf in server_conf.items():
-            self._instances[_server_key] = {"server": _server_key, "conf": _conf}
+            self._instances[_server_key] = {
+                "server": _server_key,
+                "conf": _conf,
+                "circuit_breaker": CircuitBreaker.get(
+                    f"couchdb:{_server_key}", _conf.get("circuit_breaker")
+                ),
+            }
 
             self.connect(self._instances[_server_key])
 
@@ -84,8 +91,22 @@ class Client:
 
         return _query
 
-    def _execute_request(self, session, method, url, data, retries=3, backoff=1):
+    def _execute_request(
+        self, session, method, url, data, retries=3, backoff=1, server_key=None
+    ):
+        _breaker = (
+            self._instances[server_key]["circuit_breaker"]
+            if server_key in self._instances
+            else None
+        )
+
         for _attempt in range(retries):
+            if _breaker:
+                # raises CircuitOpenException while the server is known to be down
+                _breaker.check()
+
+            _succeeded = None
+
             try:
                 if Log.is_gte_log_level(Log.DEBUG):
                     Log.debug(
@@ -93,6 +114,7 @@ class Client:
                     )
 
                 _response = session.request(method, url, json=data)
+                _succeeded = _response.status_code < 500
 
                 if Log.is_gte_log_level(Log.DEBUG):
                     Log.debug(
@@ -104,19 +126,24 @@ class Client:
                 return _response
 
             except requests.RequestException as e:
+                _succeeded = False
                 Log.error("CouchDB Request failed: {}".format(e))
 
-                if _attempt < retries - 1:
-                    Log.warning(
-                        "CouchDB::execute_request - Retrying in {} seconds... Retries: {}/{}".format(
-                            backoff, _attempt + 1, retries
-                        )
-                    )
-                    time.sleep(backoff)
-                    backoff *= 2  # Exponential backoff
-                else:
+                if _attempt == retries - 1:
                     raise
 
+            finally:
+                if _breaker:
+                    _breaker.record(_succeeded)
+
+            Log.warning(
+                "CouchDB::execute_request - Retrying in {} seconds... Retries: {}/{}".format(
+                    backoff, _attempt + 1, retries
+                )
+            )
+            time.sleep(backoff)
+            backoff *= 2  # Exponential backoff
+
     def base_request(self, db, method, data=None, find=False, uri=None):
         _server_key, _database = db.split(".")
 
@@ -138,7 +165,11 @@ class Client:
                 )
             )
 
-        return self._execute_request(_session, method, _url, data) if _session else None
+        return (
+            self._execute_request(_session, method, _url, data, server_key=_server_key)
+            if _session
+            else None
+        )
 
     def find(self, db: str, fields: list, params: dict):
         _data = self._get_selector(params)
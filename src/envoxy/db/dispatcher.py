@@ -4,13 +4,24 @@ Provides access to configured database clients and SQLAlchemy session/transactio
 managers.
 """
 
+import asyncio
+
+from ..constants import DEFAULT_ITERSIZE
 from ..utils.singleton import Singleton
 from ..utils.config import Config
 
 from ..postgresql.client import Client as PgClient
+from ..postgresql.aio import AsyncClient as AsyncPgClient
 from ..couchdb.client import Client as CouchDBClient
 from ..redis.client import Client as RedisDBClient
-from ..db.orm import get_manager, session_scope, transactional, get_default_server_key
+from ..db.orm import (
+    get_manager,
+    get_async_manager,
+    session_scope,
+    async_session_scope,
+    transactional,
+    get_default_server_key,
+)
 
 
 class Connector(Singleton):
@@ -19,6 +30,7 @@ class Connector(Singleton):
 
     Attributes:
         postgres (PgClient): Property to access the PostgreSQL client instance.
+        apostgres (AsyncPgClient): Property to access the asyncio PostgreSQL client instance.
         couchdb (CouchDBClient): Property to access the CouchDB client instance.
         redis (RedisDBClient): Property to access the Redis client instance.
     """
@@ -35,6 +47,23 @@ class Connector(Singleton):
         """
         return self.pgsql_client
 
+    @property
+    def apostgres(self):
+        """
+        Returns the asyncio PostgreSQL client instance, created on first use.
+
+        The replica lag checks of the PostgreSQL client are started with it,
+        they route the reads of both clients.
+
+        Returns:
+            AsyncPgClient: The client instance for awaiting PostgreSQL queries.
+        """
+        if getattr(self, "apgsql_client", None) is None:
+            self.apgsql_client = AsyncPgClient(self._psql_confs)
+            self.pgsql_client._start_validator()
+
+        return self.apgsql_client
+
     @property
     def couchdb(self):
         """
@@ -159,7 +188,7 @@ class PgDispatcher:
     """
 
     @staticmethod
-    def query(server_key=None, sql=None, params=None):
+    def query(server_key=None, sql=None, params=None, keyset=None, primary=False):
         """
         Executes a SQL query on the specified PostgreSQL server.
 
@@ -167,6 +196,10 @@ class PgDispatcher:
             server_key (str, optional): Identifier for the target PostgreSQL server. Defaults to None.
             sql (str, optional): The SQL query to execute. Defaults to None.
             params (tuple or dict, optional): Parameters to pass with the SQL query. Defaults to None.
+            keyset (str or tuple, optional): Unique, ordered key column(s) to page the query by,
+                ``chunk_size`` rows at a time, instead of OFFSET chunks. Defaults to None.
+            primary (bool, optional): Read from the primary even when the server has
+                replicas, e.g. to see a write just made. Defaults to False.
 
         Returns:
             Any: The result of the executed SQL query, as returned by the PgConnector.
@@ -174,11 +207,156 @@ class PgDispatcher:
         Raises:
             Exception: If the query execution fails.
         """
-        return PgConnector.instance().postgres.query(server_key, sql, params)
+        return PgConnector.instance().postgres.query(
+            server_key, sql, params, keyset=keyset, primary=primary
+        )
+
+    @staticmethod
+    async def aquery(server_key=None, sql=None, params=None, primary=False):
+        """
+        Awaitable version of ``query`` running on the asyncpg client: the event
+        loop serves other tasks while the server works, so independent queries
+        can run concurrently with ``asyncio.gather``.
+
+        Args:
+            server_key (str, optional): Identifier for the target PostgreSQL server. Defaults to None.
+            sql (str, optional): The SQL query to execute, with ``%(name)s`` or ``%s`` placeholders.
+            params (tuple or dict, optional): Parameters to pass with the SQL query. Defaults to None.
+            primary (bool, optional): Read from the primary even when the server has
+                replicas. Defaults to False.
+
+        Returns:
+            list: The rows of the query, as dicts.
+
+        Raises:
+            DatabaseException: If the query is empty or no connection is available.
+        """
+        return await PgConnector.instance().apostgres.aquery(
+            server_key, sql, params, primary=primary
+        )
+
+    @staticmethod
+    def query_iter(
+        server_key=None,
+        sql=None,
+        params=None,
+        itersize=DEFAULT_ITERSIZE,
+        batches=False,
+        as_tuples=False,
+        primary=False,
+    ):
+        """
+        Executes a SQL query on a server-side cursor and yields the results lazily.
+
+        Args:
+            server_key (str, optional): Identifier for the target PostgreSQL server. Defaults to None.
+            sql (str, optional): The SQL query to execute. Defaults to None.
+            params (tuple or dict, optional): Parameters to pass with the SQL query. Defaults to None.
+            itersize (int, optional): Rows fetched per round trip. Defaults to DEFAULT_ITERSIZE.
+            batches (bool, optional): Yield lists of up to ``itersize`` rows instead of single rows.
+            as_tuples (bool, optional): Yield tuples instead of dicts, preceded by the tuple of column names.
+            primary (bool, optional): Read from the primary even when the server has replicas.
+
+        Returns:
+            Generator: The rows (or batches of rows) of the query.
+
+        Raises:
+            DatabaseException: If the query is empty or fails.
+        """
+        return PgConnector.instance().postgres.query_iter(
+            server_key,
+            sql,
+            params,
+            itersize=itersize,
+            batches=batches,
+            as_tuples=as_tuples,
+            primary=primary,
+        )
+
+    @staticmethod
+    async def aquery_iter(
+        server_key=None,
+        sql=None,
+        params=None,
+        itersize=DEFAULT_ITERSIZE,
+        batches=False,
+        as_tuples=False,
+        primary=False,
+    ):
+        """
+        Async generator version of ``query_iter``: every batch is fetched in the
+        loop's default executor so the event loop is not blocked. The query does
+        not join a ``transaction`` opened by the calling thread.
+
+        Args:
+            See ``query_iter``.
+
+        Yields:
+            The rows (or batches of rows) of the query.
+        """
+        _batches = PgDispatcher.query_iter(
+            server_key,
+            sql,
+            params,
+            itersize=itersize,
+            batches=True,
+            as_tuples=as_tuples,
+            primary=primary,
+        )
+        _loop = asyncio.get_running_loop()
+        _fetch = None
+
+        try:
+            while True:
+                _fetch = _loop.run_in_executor(None, next, _batches, None)
+                # shielded: cancelling the caller must not orphan the fetch
+                _batch = await asyncio.shield(_fetch)
+
+                if _batch is None:
+                    break
+
+                # the column names (as_tuples) come first, as a tuple
+                if batches or isinstance(_batch, tuple):
+                    yield _batch
+                else:
+                    for _row in _batch:
+                        yield _row
+        finally:
+            if _fetch is not None and not _fetch.done():
+                # cancelled or timed out mid-fetch: the executor thread is
+                # still inside the generator, close it once the fetch is over
+                await asyncio.wait([_fetch])
+
+            await _loop.run_in_executor(None, _batches.close)
 
     # Direct inserts are intentionally not exposed to encourage ORM usage.
     # Use SQLAlchemy models and sessions via sa_manager(), or raw query() if needed.
 
+    @staticmethod
+    def bulk_load(model, rows, server_key=None, upsert=False, conflict_columns=None):
+        """
+        Loads many rows of an ORM model at once with ``COPY``, for ingest jobs
+        where adding them one by one to a session is too slow.
+
+        Args:
+            model (type): The mapped ORM class of the target table.
+            rows (iterable): Dicts (attribute name -> value) or model instances;
+                they are streamed, not loaded in memory.
+            server_key (str, optional): The key identifying the PostgreSQL server.
+                If not provided, the default server key is used.
+            upsert (bool, optional): Update the rows that already exist instead
+                of failing on them. Defaults to False.
+            conflict_columns (str or tuple, optional): Unique column(s) identifying
+                the existing rows. Defaults to the primary key.
+
+        Returns:
+            int: The number of rows written.
+        """
+        key = server_key or get_default_server_key()
+        return PgConnector.instance().postgres.bulk_load(
+            key, model, rows, upsert=upsert, conflict_columns=conflict_columns
+        )
+
     @staticmethod
     def transaction(server_key):
         """
@@ -195,6 +373,35 @@ class PgDispatcher:
         """
         return PgConnector.instance().postgres.transaction(server_key)
 
+    @staticmethod
+    def atransaction(server_key):
+        """
+        Async context manager running the ``aquery`` calls of its block in one
+        PostgreSQL transaction, committed when the block exits normally.
+
+        Args:
+            server_key (str): The key identifying the PostgreSQL server.
+
+        Returns:
+            AsyncContextManager: The transaction scope.
+        """
+        return PgConnector.instance().apostgres.atransaction(server_key)
+
+    @staticmethod
+    def stats(server_key=None):
+        """
+        Reports the connection pool and prepared statement figures.
+
+        Args:
+            server_key (str, optional): The key identifying the PostgreSQL
+                server; every server when omitted.
+
+        Returns:
+            dict: Pool size, idle, in use and waiting connections, wait times
+            and prepared statement hits (per server key when omitted).
+        """
+        return PgConnector.instance().postgres.stats(server_key)
+
     @staticmethod
     def client():
         """
@@ -211,29 +418,63 @@ class PgDispatcher:
         return PgConnector.instance().postgres
 
     @staticmethod
-    def sa_manager(server_key=None):
+    def sa_manager(server_key=None, readonly=False):
         """
         Retrieves a SQLAlchemy manager instance for the specified server key.
         If no server key is provided, the default server key is used.
         Args:
             server_key (str, optional): The key identifying the server configuration. Defaults to None.
+            readonly (bool, optional): Return the manager of one of the server's read replicas,
+                if it has healthy ones. Defaults to False.
         Returns:
             Manager: The SQLAlchemy manager instance associated with the given server key.
         """
         key = server_key or get_default_server_key()
-        return get_manager(key)
+        return get_manager(key, readonly=readonly)
 
     @staticmethod
-    def sa_session(server_key=None):
+    def sa_session(server_key=None, readonly=False):
         """
         Creates and returns a SQLAlchemy session for the specified server key.
         Args:
             server_key (str, optional): The key identifying the database server. If not provided, the default server key is used.
+            readonly (bool, optional): Read from one of the server's replicas, if it has healthy ones.
+                The session must not write. Defaults to False.
         Returns:
             Session: A SQLAlchemy session scoped to the specified server.
         """
         key = server_key or get_default_server_key()
-        return session_scope(key)
+        return session_scope(key, readonly=readonly)
+
+    @staticmethod
+    def asa_manager(server_key=None, readonly=False):
+        """
+        Retrieves the asyncio SQLAlchemy manager of the specified server key for
+        the running event loop. Must be called from a coroutine.
+        Args:
+            server_key (str, optional): The key identifying the server configuration. Defaults to None.
+            readonly (bool, optional): Return the manager of one of the server's read replicas,
+                if it has healthy ones. Defaults to False.
+        Returns:
+            AsyncEnvoxySessionManager: The manager associated with the given server key.
+        """
+        key = server_key or get_default_server_key()
+        return get_async_manager(key, readonly=readonly)
+
+    @staticmethod
+    def asa_session(server_key=None, readonly=False):
+        """
+        Creates an asyncio SQLAlchemy session for the specified server key, to use
+        with ``async with``.
+        Args:
+            server_key (str, optional): The key identifying the database server. If not provided, the default server key is used.
+            readonly (bool, optional): Read from one of the server's replicas, if it has healthy ones.
+                The session must not write. Defaults to False.
+        Returns:
+            AsyncContextManager: An AsyncSession scoped to the specified server.
+        """
+        key = server_key or get_default_server_key()
+        return async_session_scope(key, readonly=readonly)
 
     @staticmethod
     def sa_transactional(server_key=None):
@@ -4,8 +4,16 @@
 from .base import EnvoxyBase
 from .mixin import EnvoxyMixin
 from .meta import EnvoxyMeta
-from .listeners import register_envoxy_listeners
-from .session import get_manager, session_scope, transactional, get_default_server_key
+from .listeners import register_envoxy_listeners, fill_audit_defaults
+from .bulk import bulk_insert
+from .session import (
+    get_manager,
+    get_async_manager,
+    session_scope,
+    async_session_scope,
+    transactional,
+    get_default_server_key,
+)
 from . import schema
 from . import sqltypes
 from .base import EnvoxyBase
@@ -18,8 +26,12 @@ __all__ = [
     "EnvoxyMixin",
     "EnvoxyMeta",
     "register_envoxy_listeners",
+    "fill_audit_defaults",
+    "bulk_insert",
     "get_manager",
+    "get_async_manager",
     "session_scope",
+    "async_session_scope",
     "transactional",
     "get_default_server_key",
     # organized convenience modules
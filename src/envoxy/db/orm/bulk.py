@@ -0,0 +1,49 @@
+"""Batched ORM inserts that keep the Envoxy audit fields.
+
+``session.add`` flushes objects one by one through the ORM listeners, and
+the bulk paths skip those listeners altogether. :func:`bulk_insert` fills
+the audit fields for the whole batch, then sends a single ORM bulk
+``INSERT`` that SQLAlchemy 2.x batches with ``insertmanyvalues``.
+"""
+
+from collections.abc import Iterable
+
+from sqlalchemy import insert
+
+from .listeners import fill_audit_defaults
+
+
+def bulk_insert(
+    session,
+    model,
+    rows: Iterable[dict],
+    page_size: int | None = None,
+) -> int:
+    """Insert ``rows`` (dicts keyed by attribute name) of ``model`` in
+    batches.
+
+    Args:
+        session: The SQLAlchemy session, e.g. from ``session_scope``; the
+            insert joins its transaction.
+        model: The mapped class.
+        rows: Mappings to insert. They are completed in place with
+            id/created/updated/href when ``model`` uses EnvoxyMixin.
+        page_size: Rows per ``INSERT ... VALUES`` statement; the engine's
+            ``insertmanyvalues_page_size`` (1000) by default.
+
+    Returns:
+        int: The number of rows inserted.
+    """
+    _rows = fill_audit_defaults(model, list(rows))
+
+    if not _rows:
+        return 0
+
+    _statement = insert(model)
+
+    if page_size:
+        _statement = _statement.execution_options(insertmanyvalues_page_size=page_size)
+
+    session.execute(_statement, _rows)
+
+    return len(_rows)
@@ -4,6 +4,7 @@ import datetime
 from sqlalchemy.orm.mapper import Mapper
 from sqlalchemy.orm.decl_api import registry
 from sqlalchemy import event
+from sqlalchemy import inspect as sa_inspect
 
 from .mixin import EnvoxyMixin
 from .base import EnvoxyBase
@@ -23,6 +24,17 @@ def _entity_from_mapper(mapper: Mapper, target) -> str:
     return _tbl.split(".")[-1]
 
 
+# mapper -> entity name used in href, resolved once per mapper
+_ENTITIES = {}
+
+
+def _entity_name(mapper: Mapper) -> str:
+    entity = _ENTITIES.get(mapper)
+    if entity is None:
+        entity = _ENTITIES[mapper] = _entity_from_mapper(mapper, mapper.class_)
+    return entity
+
+
 def _before_insert(mapper, connection, target):
     if not getattr(target, "id", None):
         target.id = str(uuid.uuid4())
@@ -31,10 +43,38 @@ def _before_insert(mapper, connection, target):
         target.created = now
     target.updated = now
     if not getattr(target, "href", None):
-        entity = _entity_from_mapper(mapper, target)
+        entity = _entity_name(mapper)
         target.href = f"/v3/data-layer/{entity}/{target.id}"
 
 
+def fill_audit_defaults(model, rows, now=None):
+    """Fill id/created/updated/href of a batch of insert mappings (dicts)
+    the way the ``before_insert`` listener fills objects.
+
+    Bulk paths (``insert(Model)`` with a list of dicts,
+    ``bulk_insert_mappings``) do not fire the ORM listeners. The whole
+    batch shares one timestamp and the entity name is resolved once.
+    Models without EnvoxyMixin are returned untouched.
+    """
+    if not issubclass(model, EnvoxyMixin):
+        return rows
+
+    now = now or _now_utc()
+    prefix = f"/v3/data-layer/{_entity_name(sa_inspect(model))}/"
+    new_id = uuid.uuid4
+
+    for row in rows:
+        if not row.get("id"):
+            row["id"] = str(new_id())
+        if not row.get("created"):
+            row["created"] = now
+        row["updated"] = now
+        if not row.get("href"):
+            row["href"] = prefix + row["id"]
+
+    return rows
+
+
 def _before_update(mapper, connection, target):
     target.updated = _now_utc()
 
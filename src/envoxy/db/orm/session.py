@@ -6,19 +6,31 @@ session context or decorator. The underlying Engine and SessionManager are
 cached per server_key.
 """
 
-from contextlib import contextmanager
+import asyncio
+import functools
+import weakref
+from contextlib import asynccontextmanager, contextmanager
 from typing import Dict
 
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+from ...constants import MAX_CONN, PG_MAX_LIFETIME, TIMEOUT_CONN
 from ...utils.config import Config
 from ...utils.logs import Log
 from ..exceptions import DatabaseException
-from ...postgresql.sqlalchemy.session import EnvoxySessionManager
+from ...postgresql.sqlalchemy.session import AsyncEnvoxySessionManager, EnvoxySessionManager
+from ...postgresql.replicas import expand as expand_replicas, router
+from ...postgresql.sqlalchemy.pool import SharedPool
 
 # Cache managers per server_key
 _MANAGERS: Dict[str, EnvoxySessionManager] = {}
+# event loop -> {server_key: AsyncEnvoxySessionManager}, the async engines
+# being bound to the loop that opened their connections
+_ASYNC_MANAGERS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
 
 
-def _build_url_from_conf(conf: dict) -> str:
+def _build_url_from_conf(conf: dict, driver: str = "psycopg2") -> str:
     # Expect the same keys used by the psycopg2 client
     _user = conf.get("user") or ""
     _passwd = conf.get("passwd") or ""
@@ -30,18 +42,58 @@ def _build_url_from_conf(conf: dict) -> str:
     # projects can pre-compose a DSN in the config instead.
     # URL-escaping is intentionally minimal here; for complex setups provide
     # a full engine via EnvoxySessionManager(engine=...)
-    return f"postgresql+psycopg2://{_user}:{_passwd}@{_host}:{_port}/{_dbname}"
+    return f"postgresql+{driver}://{_user}:{_passwd}@{_host}:{_port}/{_dbname}"
+
+
+def _outstanding(server_key: str) -> int:
+    _mgr = _MANAGERS.get(server_key)
+    return _mgr.engine.pool.checkedout() if _mgr else 0
+
+
+def _shared_engine(server_key: str, conf: dict):
+    """Engine borrowing its connections from the psycopg2 client's pool of
+    server_key, so both count against one `max_conn`."""
+    # imported here: the client imports this module
+    from ...postgresql.client import Client
 
+    _client = Client(Config.get("psql_servers"))
 
-def get_manager(server_key: str) -> EnvoxySessionManager:
+    # acquired like pgsqlc.query's: pinged after ping_after_idle seconds idle
+    return create_engine(
+        _build_url_from_conf(conf),
+        pool=SharedPool(
+            _client.connection_pool(server_key),
+            timeout=int(conf.get("conn_timeout", TIMEOUT_CONN)),
+            acquire=functools.partial(_client._get_conn, server_key),
+        ),
+    )
+
+
+def _read_key(server_key: str, readonly: bool, outstanding) -> str:
+    if readonly:
+        _conf = (Config.get("psql_servers") or {}).get(server_key)
+        if isinstance(_conf, dict) and _conf.get("replicas"):
+            return router.pick(server_key, _conf, load=outstanding)
+
+    return server_key
+
+
+def get_manager(server_key: str, readonly: bool = False) -> EnvoxySessionManager:
     """Return a cached EnvoxySessionManager for the given server_key.
 
     The function reads the `psql_servers` section from the global `Config`.
+    The engine shares the connection pool of `pgsqlc` for the server_key,
+    unless the entry sets a `dsn`/`url` or `shared_pool: false`; only then
+    do `pool_size`/`max_overflow`/`pool_timeout` apply. With `readonly` the
+    manager of one of the server's replicas is returned instead, when it has
+    healthy ones.
     """
+    server_key = _read_key(server_key, readonly, _outstanding)
+
     if server_key in _MANAGERS:
         return _MANAGERS[server_key]
 
-    _psql_confs = Config.get("psql_servers")
+    _psql_confs = expand_replicas(Config.get("psql_servers"))
     if not _psql_confs:
         raise DatabaseException("No psql_servers configuration found")
 
@@ -49,6 +101,14 @@ def get_manager(server_key: str) -> EnvoxySessionManager:
     if not _conf:
         raise DatabaseException(f"No psql server config for server_key: {server_key}")
 
+    if not (_conf.get("dsn") or _conf.get("url")) and _conf.get("shared_pool", True):
+        _mgr = EnvoxySessionManager(engine=_shared_engine(server_key, _conf))
+        _MANAGERS[server_key] = _mgr
+
+        Log.info(f"Created EnvoxySessionManager for server_key={server_key} (shared pool)")
+
+        return _mgr
+
     # If the consumer provided a full dsn/url in conf, use it
     _url = _conf.get("dsn") or _conf.get("url") or _build_url_from_conf(_conf)
 
@@ -72,6 +132,64 @@ def get_manager(server_key: str) -> EnvoxySessionManager:
     return _mgr
 
 
+def _async_engine_kwargs(conf: dict) -> dict:
+    """Engine options mirroring the psycopg2 pool settings of the entry;
+    `pool_size`/`max_overflow`/`pool_timeout` still override them."""
+    # imported here: the async client imports the client, which imports this module
+    from ...postgresql.aio import search_path
+
+    _connect_args = {"timeout": int(conf.get("timeout", TIMEOUT_CONN))}
+    if conf.get("schema"):
+        _connect_args["server_settings"] = {"search_path": search_path(conf["schema"])}
+
+    return {
+        "pool_size": int(conf.get("pool_size", conf.get("max_conn", MAX_CONN))),
+        "max_overflow": int(conf.get("max_overflow", 0)),
+        "pool_timeout": int(conf.get("pool_timeout", conf.get("conn_timeout", TIMEOUT_CONN))),
+        "pool_recycle": int(conf.get("max_lifetime", PG_MAX_LIFETIME)),
+        "connect_args": _connect_args,
+    }
+
+
+def _async_outstanding(server_key: str) -> int:
+    _mgr = _ASYNC_MANAGERS.get(asyncio.get_running_loop(), {}).get(server_key)
+    return _mgr.engine.pool.checkedout() if _mgr else 0
+
+
+def get_async_manager(server_key: str, readonly: bool = False) -> AsyncEnvoxySessionManager:
+    """Return the AsyncEnvoxySessionManager of server_key for the running
+    event loop, creating it on first use.
+
+    The engine connects with asyncpg using the `psql_servers` entry: its
+    `dsn`/`url` with the asyncpg driver, or the host/port/db settings. Its
+    pool holds up to `max_conn` connections of its own. With `readonly` the
+    manager of one of the server's healthy replicas is returned instead.
+    """
+    _loop = asyncio.get_running_loop()
+    server_key = _read_key(server_key, readonly, _async_outstanding)
+
+    _managers = _ASYNC_MANAGERS.setdefault(_loop, {})
+    if server_key in _managers:
+        return _managers[server_key]
+
+    _conf = expand_replicas(Config.get("psql_servers")).get(server_key)
+    if not _conf:
+        raise DatabaseException(f"No psql server config for server_key: {server_key}")
+
+    _url = _conf.get("dsn") or _conf.get("url")
+    if _url:
+        _url = make_url(_url).set(drivername="postgresql+asyncpg")
+    else:
+        _url = _build_url_from_conf(_conf, driver="asyncpg")
+
+    _mgr = AsyncEnvoxySessionManager(url=_url, engine_kwargs=_async_engine_kwargs(_conf))
+    _managers[server_key] = _mgr
+
+    Log.info(f"Created AsyncEnvoxySessionManager for server_key={server_key}")
+
+    return _mgr
+
+
 def get_default_server_key() -> str:
     """Return a sensible default server_key: env var or first configured key."""
 
@@ -94,8 +212,18 @@ def validate_server_key(server_key: str) -> bool:
     return server_key in _psql_confs
 
 
+def _dispose_async_managers(server_key: str) -> None:
+    for _loop, _managers in list(_ASYNC_MANAGERS.items()):
+        _mgr = _managers.pop(server_key, None)
+        # the engine is closed on its own loop; a stopped loop drops it
+        if _mgr is not None and _loop.is_running():
+            asyncio.run_coroutine_threadsafe(_mgr.dispose(), _loop)
+
+
 def dispose_manager(server_key: str) -> None:
-    """Dispose and remove the cached manager for server_key, if present."""
+    """Dispose and remove the cached managers for server_key, if present."""
+    _dispose_async_managers(server_key)
+
     _mgr = _MANAGERS.get(server_key)
     if not _mgr:
         return
@@ -111,24 +239,43 @@ def dispose_manager(server_key: str) -> None:
 
 def dispose_all() -> None:
     """Dispose all cached managers."""
-    _keys = list(_MANAGERS.keys())
+    _keys = set(_MANAGERS.keys())
+    for _managers in list(_ASYNC_MANAGERS.values()):
+        _keys.update(_managers)
     for _key in _keys:
         dispose_manager(_key)
 
 
 @contextmanager
-def session_scope(server_key: str):
+def session_scope(server_key: str, readonly: bool = False):
     """Context manager yielding a SQLAlchemy Session bound to the server_key.
 
+    With `readonly` the session reads from a replica of the server, if it
+    has any; do not write through it.
+
     Usage:
         with session_scope('primary') as session:
             session.add(obj)
     """
-    _mgr = get_manager(server_key)
+    _mgr = get_manager(server_key, readonly=readonly)
     with _mgr.session_scope() as _session:
         yield _session
 
 
+@asynccontextmanager
+async def async_session_scope(server_key: str, readonly: bool = False):
+    """Async context manager yielding a SQLAlchemy AsyncSession bound to the
+    server_key, see `session_scope`.
+
+    Usage:
+        async with async_session_scope('primary') as session:
+            session.add(obj)
+    """
+    _mgr = get_async_manager(server_key, readonly=readonly)
+    async with _mgr.session_scope() as _session:
+        yield _session
+
+
 def transactional(server_key: str):
     """Decorator that runs the wrapped function inside a transaction for
     the given server_key. The wrapped function will receive a `session`
@@ -140,10 +287,12 @@ def transactional(server_key: str):
 
 __all__ = [
     "get_manager",
+    "get_async_manager",
     "get_default_server_key",
     "validate_server_key",
     "dispose_manager",
     "dispose_all",
     "session_scope",
+    "async_session_scope",
     "transactional",
 ]
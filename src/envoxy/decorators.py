@@ -4,9 +4,17 @@ import requests
 
 from .auth.backends import AuthBackendMixin
 from .cache import Cache
-from .constants import CACHE_DEFAULT_TTL, GET
+from .constants import CACHE_DEFAULT_TTL, GET, TRACEPARENT_HEADER
 from .utils.encoders import envoxy_json_loads
 from .utils.logs import Log
+from .utils.metrics import metrics
+from .utils.tracing import tracer
+
+CACHE_LOOKUPS = metrics.counter(
+    "envoxy_cache_lookups_total",
+    "Cache lookups by source (zmq cached routes or @cache views) and result.",
+    ("source", "result"),
+)
 
 
 def on(**kwargs):
@@ -58,6 +66,8 @@ class cache(object):
 
             Log.verbose(f"cached method {_endpoint} {_method}")
 
+            CACHE_LOOKUPS.labels("view", "hit" if result else "miss").inc()
+
             if result:
                 return view.cached_response(result)
 
@@ -93,7 +103,14 @@ class log_event(object):
 
             Log.verbose(_message)
 
-        return self.func(self.func.__class__, _data)
+        # Continue the trace of the publisher, if it sent one
+        _headers = _data.get("headers") if isinstance(_data, dict) else None
+        _traceparent = _headers.get(TRACEPARENT_HEADER) if isinstance(_headers, dict) else None
+
+        with tracer.span(
+            "mqtt.message", traceparent=_traceparent, root=True, topic=msg.topic
+        ):
+            return self.func(self.func.__class__, _data)
 
 
 class auth_anonymous_allowed(object):
@@ -4,14 +4,23 @@ import uuid
 
 import paho.mqtt.client as paho
 
-from ..constants import SERVER_NAME
+from ..constants import SERVER_NAME, TRACEPARENT_HEADER
 from ..exceptions import ValidationException
+from ..utils.circuit_breaker import CircuitBreaker
 from ..utils.config import Config
 from ..utils.datetime import Now
 from ..utils.logs import Log
+from ..utils.metrics import metrics
 from ..utils.singleton import Singleton
+from ..utils.tracing import current_span, tracer
 from ..utils.encoders import envoxy_json_dumps
 
+PUBLISHES = metrics.counter(
+    "envoxy_mqtt_publishes_total",
+    "MQTT publishes by outcome: ok, circuit_open or error.",
+    ("server_key", "outcome"),
+)
+
 RC_LIST = {
     0: "Connection successful",
     1: "Connection refused - incorrect protocol version",
@@ -37,50 +46,91 @@ class MqttConnector(Singleton):
         _credentials = Config.get_credentials()
 
         for _server_key in self._server_confs.keys():
-            _conf = self._server_confs[_server_key]
+            self._instances[_server_key] = self._build_instance(
+                _server_key, self._server_confs[_server_key], _credentials
+            )
 
-            self._instances[_server_key] = {
-                "server_key": _server_key,
-                "conf": _conf,
-                "credentials": _credentials,
-                "username": None,
-                "password": None,
-                "host": None,
-                "port": None,
-                "schema": None,
-                "lock": threading.Lock(),
-                "mqtt_client": None,
-                "subscriptions": [],
-            }
+        Config.subscribe(self.reload_servers, node="mqtt_servers")
+
+    def _build_instance(self, server_key, conf, credentials):
+        _instance = {
+            "server_key": server_key,
+            "conf": conf,
+            "credentials": credentials,
+            "username": None,
+            "password": None,
+            "host": None,
+            "port": None,
+            "schema": None,
+            "lock": threading.Lock(),
+            "mqtt_client": None,
+            "subscriptions": [],
+            "circuit_breaker": CircuitBreaker.get(
+                f"mqtt:{server_key}", conf.get("circuit_breaker")
+            ),
+        }
 
-            _instance = self._instances[_server_key]
+        _bind = _instance["conf"].get("bind", None)
 
-            _bind = _instance["conf"].get("bind", None)
+        if not _bind:
+            raise Exception("bind must be provided")
 
-            if not _bind:
-                raise Exception("bind must be provided")
+        if not _instance["credentials"]:  # credentials are provided within bind uri
+            _parts = _bind.split(":")
 
-            if not _instance["credentials"]:  # credentials are provided within bind uri
-                _parts = _bind.split(":")
+            _instance["schema"] = _parts[0]
+            _instance["username"] = _parts[1].replace("//", "")
+            _instance["port"] = int(_parts[3])
 
-                _instance["schema"] = _parts[0]
-                _instance["username"] = _parts[1].replace("//", "")
-                _instance["port"] = int(_parts[3])
+            _parts = _parts[2].split("@")
 
-                _parts = _parts[2].split("@")
+            _instance["password"] = _parts[0]
+            _instance["host"] = _parts[1]
 
-                _instance["password"] = _parts[0]
-                _instance["host"] = _parts[1]
+        else:
+            _parts = _bind.split(":")
 
-            else:
-                _parts = _bind.split(":")
+            _instance["schema"] = _parts[0]
+            _instance["host"] = _parts[1].replace("//", "")
+            _instance["port"] = int(_parts[2])
+
+            _instance["username"] = _instance["credentials"]["client_id"]
+            _instance["password"] = _instance["credentials"]["access_token"]
+
+        return _instance
+
+    def reload_servers(self, server_confs):
+        """Apply a new ``mqtt_servers`` config node. The clients of the
+        servers that changed are disconnected; servers with subscriptions
+        reconnect right away to restore them, the others on the next
+        publish."""
+        _credentials = Config.get_credentials()
 
-                _instance["schema"] = _parts[0]
-                _instance["host"] = _parts[1].replace("//", "")
-                _instance["port"] = int(_parts[2])
+        # build everything first so an invalid entry changes nothing
+        _changed = {
+            _server_key: self._build_instance(_server_key, _conf, _credentials)
+            for _server_key, _conf in server_confs.items()
+            if _server_key not in self._instances
+            or self._instances[_server_key]["conf"] != _conf
+        }
+
+        for _server_key in set(self._instances) - set(server_confs):
+            self.disconnect(_server_key)
+            self._instances.pop(_server_key, None)
+
+        for _server_key, _instance in _changed.items():
+            if _server_key in self._instances:
+                _instance["subscriptions"] = self._instances[_server_key]["subscriptions"]
+                self.disconnect(_server_key)
+
+            self._instances[_server_key] = _instance
+
+            if _instance["subscriptions"]:
+                self.connect(_server_key)
 
-                _instance["username"] = _instance["credentials"]["client_id"]
-                _instance["password"] = _instance["credentials"]["access_token"]
+            Log.info(f"Mqtt - reloaded the configuration of {_server_key}")
+
+        self._server_confs = server_confs
 
     def is_connected(self, server_key):
         with self._instances[server_key]["lock"]:
@@ -255,16 +305,32 @@ class MqttConnector(Singleton):
 
     def publish(self, server_key, topic, message, no_envelope=False, headers=None):
         _instance = self._instances[server_key]
+        _breaker = _instance["circuit_breaker"]
 
-        if not self.is_connected(server_key):
-            if _instance["mqtt_client"] is None:
-                if not self.connect(server_key):
-                    return False
-            else:
-                if not self.reconnect(server_key):
-                    return False
+        if not _breaker.allow_request():
+            Log.warning(
+                f"Mqtt - Circuit breaker is {_breaker.state} for server key: {server_key}, not publishing to topic: {topic}"
+            )
+            PUBLISHES.labels(server_key, "circuit_open").inc()
+
+            return False
+
+        # False when the broker could not be reached or refused the message;
+        # a payload that does not serialize is not the broker's failure
+        _succeeded = None
 
         try:
+            if not self.is_connected(server_key):
+                if _instance["mqtt_client"] is None:
+                    _connected = self.connect(server_key)
+                else:
+                    _connected = self.reconnect(server_key)
+
+                if not _connected:
+                    _succeeded = False
+                    PUBLISHES.labels(server_key, "error").inc()
+                    return False
+
             _mqtt_client = _instance["mqtt_client"]
 
             if Log.is_gte_log_level(Log.TRACE):
@@ -281,18 +347,23 @@ class MqttConnector(Singleton):
 
             else:
                 _payload = envoxy_json_dumps(
-                    message.update({"headers": headers, "resource": topic})
+                    {**message, "headers": headers, "resource": topic}
                 ).decode("utf-8")
 
-            _message = "{} | Message{}"
+            Log.verbose("Mqtt - Publishing to topic: %s | Message: %s", topic, _payload)
 
-            if Log.is_gte_log_level(Log.VERBOSE):
-                Log.verbose(_message, _payload)
+            try:
+                with _instance["lock"]:
+                    (_rc, _mid) = _mqtt_client.publish(topic, _payload)
+            except Exception:
+                _succeeded = False
+                raise
 
-            with _instance["lock"]:
-                (_rc, _mid) = _mqtt_client.publish(topic, _payload)
+            _succeeded = _rc == 0
+
+            if _succeeded:
+                PUBLISHES.labels(server_key, "ok").inc()
 
-            if _rc == 0:
                 if Log.is_gte_log_level(Log.VERBOSE):
                     Log.verbose(
                         "Mqtt - Published successfully, result code({}) and mid({}) to topic: {} with payload:{}".format(
@@ -303,6 +374,8 @@ class MqttConnector(Singleton):
                 return True
 
             else:
+                PUBLISHES.labels(server_key, "error").inc()
+
                 raise ValidationException(
                     "Mqtt - Failed to publish, result code({}) and mid({}) to topic: {} with payload:{}".format(
                         _rc, _mid, topic, message
@@ -317,6 +390,9 @@ class MqttConnector(Singleton):
 
             return False
 
+        finally:
+            _breaker.record(_succeeded)
+
     def subscribe(self, server_key, topic, callback=None):
         _instance = self._instances[server_key]
 
@@ -386,17 +462,23 @@ class Dispatcher:
         else:
             _headers["X-Cid"] = str(uuid.uuid4())
 
+        _span = current_span()
+
+        if _span is not None:
+            _headers[TRACEPARENT_HEADER] = _span.traceparent
+
         return _headers
 
     @staticmethod
     def publish(server_key, topic, message, no_envelope=False):
-        return MqttConnector.instance().publish(
-            server_key,
-            topic,
-            message,
-            no_envelope=no_envelope,
-            headers=Dispatcher.generate_headers(),
-        )
+        with tracer.span("mqtt.publish", server_key=server_key, topic=topic):
+            return MqttConnector.instance().publish(
+                server_key,
+                topic,
+                message,
+                no_envelope=no_envelope,
+                headers=Dispatcher.generate_headers(),
+            )
 
     @staticmethod
     def subscribe(server_key, topic, callback=None):
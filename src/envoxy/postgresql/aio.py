@@ -0,0 +1,373 @@
+"""asyncio client for the ``psql_servers`` entries.
+
+:class:`AsyncClient` is the asyncpg sibling of
+:class:`~envoxy.postgresql.client.Client`. It takes the same server keys,
+settings and query syntax, but does not hold a thread while the server
+works, so an async view can run several queries on one thread with
+``asyncio.gather``.
+
+asyncpg connections belong to the event loop that opened them. Each loop
+therefore gets its own pool per server_key, opened by its first query and
+configured from the entry like the psycopg2 pool:
+
+- ``min_conn``/``max_conn``: the size of the pool;
+- ``timeout``: the seconds to open a connection;
+- ``conn_timeout``: the seconds to wait for a pooled connection;
+- ``max_idle_time``: the seconds an idle connection is kept;
+- ``schema``: the ``search_path`` of the connections;
+- ``replicas``: reads go to a healthy replica, see :mod:`.replicas`.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from time import perf_counter
+
+# Optional, only needed by the async client (pip install envoxy[async])
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+from ..constants import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_OFFSET_LIMIT,
+    MAX_CONN,
+    MIN_CONN,
+    PG_MAX_IDLE_TIME,
+    TIMEOUT_CONN,
+    TRACING_STATEMENT_LENGTH,
+)
+from ..db.exceptions import DatabaseException
+from ..utils.config import Config
+from ..utils.logs import Log
+from ..utils.tracing import tracer
+from .client import ACQUIRE_FAILURES, ACQUIRE_SECONDS, QUERY_ERRORS, QUERY_SECONDS
+from .replicas import expand as expand_replicas
+from .replicas import router
+from .statements import to_prepared
+
+# connection of the atransaction block the task runs in
+_transaction = contextvars.ContextVar("envoxy_pg_transaction", default=None)
+
+_prepared = functools.lru_cache(maxsize=256)(to_prepared)
+
+
+def search_path(schema):
+    """``schema`` quoted for the ``search_path`` startup setting."""
+    return '"{}"'.format(schema.replace('"', '""'))
+
+
+def to_arguments(sql_query, params):
+    """Return ``(text, args)``: ``sql_query``, written with the psycopg2
+    ``%(name)s`` or ``%s`` placeholders, in the ``$n`` form of asyncpg and
+    the arguments in ``$n`` order."""
+    try:
+        _text, _names, _positional = _prepared(sql_query)
+    except ValueError as e:
+        raise DatabaseException(str(e)) from e
+
+    if _names:
+        try:
+            return _text, [params[_name] for _name in _names]
+        except (KeyError, TypeError) as e:
+            raise DatabaseException(f"Missing query parameter: {e}") from e
+
+    if not _positional or params is None or isinstance(params, dict):
+        return _text, []
+
+    return _text, list(params)
+
+
+class AsyncClient:
+    """
+    asyncio client for PostgreSQL database.
+    """
+
+    _instance = None
+    _lock = threading.RLock()
+
+    def __new__(cls, *args, **kwargs):
+        with cls._lock:
+            if not cls._instance:
+                cls._instance = super().__new__(cls)
+
+        return cls._instance
+
+    def __init__(self, server_conf):
+        # make __init__ idempotent for singleton pattern
+        if getattr(self, "_initialized", False):
+            return
+
+        if asyncpg is None:
+            raise ImportError(
+                "The async PostgreSQL client requires the asyncpg package (pip install asyncpg)"
+            )
+
+        self._initialized = True
+
+        self._confs = expand_replicas(server_conf)
+        # event loop -> {server_key: task opening the pool}
+        self._pools = weakref.WeakKeyDictionary()
+
+        Config.subscribe(self.reload_config, node="psql_servers")
+
+    def _get_conf(self, server_key):
+        _conf = self._confs.get(server_key)
+
+        if not _conf:
+            raise DatabaseException(
+                f"No configuration found for server key: {server_key}"
+            )
+
+        return _conf
+
+    async def _create_pool(self, server_key, conf):
+        _settings = {}
+
+        if conf.get("schema"):
+            _settings["search_path"] = search_path(conf["schema"])
+
+        _kwargs = {}
+
+        if "prepared_statements" in conf:
+            _kwargs["statement_cache_size"] = int(conf["prepared_statements"])
+
+        _pool = await asyncpg.create_pool(
+            host=conf["host"],
+            port=conf["port"],
+            database=conf["db"],
+            user=conf["user"],
+            password=conf["passwd"],
+            min_size=int(conf.get("min_conn", MIN_CONN)),
+            max_size=int(conf.get("max_conn", MAX_CONN)),
+            max_inactive_connection_lifetime=float(
+                conf.get("max_idle_time", PG_MAX_IDLE_TIME)
+            ),
+            timeout=int(conf.get("timeout", TIMEOUT_CONN)),
+            server_settings=_settings,
+            **_kwargs,
+        )
+
+        Log.trace(
+            ">>> Successfully connected to POSTGRES (async): {}, {}:{}".format(
+                server_key, conf["host"], conf["port"]
+            )
+        )
+
+        return _pool
+
+    async def connection_pool(self, server_key):
+        """The asyncpg pool of ``server_key`` for the running event loop."""
+        _conf = self._get_conf(server_key)
+        _loop = asyncio.get_running_loop()
+
+        with self._lock:
+            _pools = self._pools.setdefault(_loop, {})
+            _task = _pools.get(server_key)
+
+            if _task is None:
+                _task = _pools[server_key] = _loop.create_task(
+                    self._create_pool(server_key, _conf)
+                )
+
+        try:
+            # shielded: the callers waiting for the same pool are not cancelled
+            return await asyncio.shield(_task)
+        except Exception:
+            with self._lock:
+                if _pools.get(server_key) is _task:
+                    del _pools[server_key]
+            raise
+
+    @asynccontextmanager
+    async def _connection(self, server_key):
+        _conn = _transaction.get()
+
+        if _conn is not None:
+            yield _conn
+            return
+
+        _pool = await self.connection_pool(server_key)
+        _conn_timeout = int(self._get_conf(server_key).get("conn_timeout", TIMEOUT_CONN))
+        _start = perf_counter()
+
+        try:
+            _conn = await _pool.acquire(timeout=_conn_timeout)
+        except Exception as e:
+            Log.error(f"[PSQL:{server_key}] Failed to get connection from pool: {e}")
+            ACQUIRE_FAILURES.labels(server_key).inc()
+            raise DatabaseException("Failed to get a healthy connection") from e
+
+        ACQUIRE_SECONDS.labels(server_key).observe(perf_counter() - _start)
+
+        try:
+            yield _conn
+        finally:
+            await _pool.release(_conn)
+
+    def _read_key(self, server_key, primary=False):
+        """The server to read ``server_key`` from: one of its replicas, or
+        itself for ``primary`` reads and inside a transaction."""
+        if primary or _transaction.get() is not None:
+            return server_key
+
+        _conf = self._confs.get(server_key)
+
+        if not isinstance(_conf, dict) or not _conf.get("replicas"):
+            return server_key
+
+        return router.pick(server_key, _conf, load=self._outstanding)
+
+    def _outstanding(self, server_key):
+        _task = self._pools.get(asyncio.get_running_loop(), {}).get(server_key)
+
+        if _task is None or not _task.done() or _task.cancelled() or _task.exception():
+            return 0
+
+        _pool = _task.result()
+
+        return _pool.get_size() - _pool.get_idle_size()
+
+    def reload_config(self, server_conf):
+        """Apply a new ``psql_servers`` config node: the pools of the
+        servers that changed are closed once their connections are released,
+        the next queries open pools with the new configuration."""
+        _confs = expand_replicas(server_conf)
+
+        with self._lock:
+            _changed = {
+                _key for _key, _conf in self._confs.items() if _confs.get(_key) != _conf
+            }
+            self._confs = _confs
+
+            for _loop, _pools in list(self._pools.items()):
+                for _server_key in _changed:
+                    _task = _pools.pop(_server_key, None)
+
+                    if _task is None:
+                        continue
+
+                    if _loop.is_running():
+                        asyncio.run_coroutine_threadsafe(self._retire(_task), _loop)
+                    elif _task.done() and not _task.cancelled() and not _task.exception():
+                        _task.result().terminate()
+
+    @staticmethod
+    async def _retire(task):
+        try:
+            _pool = await task
+        except Exception:
+            return
+
+        await _pool.close()
+
+    async def close(self):
+        """Close the pools of the running event loop, once their connections
+        are released."""
+        with self._lock:
+            _pools = self._pools.pop(asyncio.get_running_loop(), {})
+
+        await asyncio.gather(*(self._retire(_task) for _task in _pools.values()))
+
+    @asynccontextmanager
+    async def atransaction(self, server_key):
+        """
+        Async context manager for database transactions: the ``aquery``
+        calls of the block, and of the tasks it starts, share its
+        connection, so they must not run concurrently.
+
+        :param server_key: Identifier for the server configuration.
+        :return: None
+        """
+
+        if _transaction.get() is not None:
+            raise DatabaseException("Nested transactions are not supported")
+
+        async with self._connection(server_key) as _conn:
+            _token = _transaction.set(_conn)
+
+            try:
+                async with _conn.transaction():
+                    yield self
+            except Exception as e:
+                Log.error(f"Rolling back transaction due to error: {e}")
+                raise
+            finally:
+                _transaction.reset(_token)
+
+    async def aquery(self, server_key=None, sql_query=None, params=None, primary=False):
+        """
+        Executes the provided SQL query and returns the results, like
+        ``Client.query``.
+
+        Queries using ``%(offset_limit)s`` and ``%(chunk_size)s`` are run
+        again with the next offset until a chunk comes back short.
+
+        :param server_key: Identifier for the server configuration.
+        :param sql_query: SQL query string, with psycopg2 placeholders.
+        :param params: Parameters for the SQL query.
+        :param primary: Read from the primary even when the server has
+            replicas, e.g. right after a write.
+        :return: Query results as a list of dictionaries.
+        """
+
+        if params is None:
+            params = {}
+
+        if not sql_query:
+            raise DatabaseException("Sql cannot be empty")
+
+        server_key = self._read_key(server_key, primary)
+        _start = perf_counter()
+        _span = tracer.start_span(
+            "pg.query",
+            server_key=server_key,
+            statement=sql_query[:TRACING_STATEMENT_LENGTH],
+        )
+        _error = None
+
+        try:
+            async with self._connection(server_key) as _conn:
+                _data = await self._fetch_offset(_conn, sql_query, params)
+
+            QUERY_SECONDS.labels(server_key).observe(perf_counter() - _start)
+
+            return _data
+        except Exception as e:
+            QUERY_ERRORS.labels(server_key).inc()
+            _error = e
+            raise
+        finally:
+            if _span is not None:
+                tracer.finish(_span, _error)
+
+    @staticmethod
+    async def _fetch_offset(conn, sql_query, params):
+        if not isinstance(params, dict):
+            _text, _args = to_arguments(sql_query, params)
+            return [dict(_row) for _row in await conn.fetch(_text, *_args)]
+
+        # copy params to avoid mutating caller's dictionary
+        _local_params = dict(params)
+        _chunk_size = _local_params.setdefault("chunk_size", DEFAULT_CHUNK_SIZE)
+        _local_params.setdefault("offset_limit", DEFAULT_OFFSET_LIMIT)
+
+        _data = []
+
+        while True:
+            _text, _args = to_arguments(sql_query, _local_params)
+            _rows = await conn.fetch(_text, *_args)
+
+            _data.extend(dict(_row) for _row in _rows)
+
+            # only queries paged by offset_limit have a next chunk
+            if len(_rows) != _chunk_size or "%(offset_limit)s" not in sql_query:
+                break
+
+            _local_params["offset_limit"] += _chunk_size
+
+        return _data
@@ -0,0 +1,222 @@
+"""Bulk loads of ORM model rows through ``COPY ... FROM STDIN``.
+
+The rows are encoded to CSV a chunk at a time while psycopg2 reads them, so
+the load never holds more than one chunk in memory. Each column gets its
+encoder once, from its SQLAlchemy type, instead of per value. The
+:class:`~envoxy.db.orm.mixin.EnvoxyMixin` audit columns (id, created,
+updated, href), normally filled by the ORM listeners, are filled here with
+one timestamp for the whole load.
+"""
+
+import datetime
+import io
+import json
+import uuid
+
+from psycopg2 import sql
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.types import ARRAY, JSON, LargeBinary
+
+from ..db.exceptions import DatabaseException
+from ..db.orm.listeners import _entity_name
+from ..db.orm.mixin import EnvoxyMixin
+
+AUDIT_COLUMNS = ("id", "created", "updated", "href")
+# the audit columns an upsert leaves alone on the existing rows
+IMMUTABLE_COLUMNS = ("id", "created", "href")
+
+
+def _quote(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _encode_text(value):
+    if isinstance(value, bool):
+        return "t" if value else "f"
+
+    if isinstance(value, datetime.datetime):
+        return _quote(value.isoformat(" "))
+
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+
+    if isinstance(value, (dict, list, tuple)):
+        return _quote(json.dumps(value, default=str))
+
+    return _quote(str(value))
+
+
+def _encode_json(value):
+    return _quote(json.dumps(value, default=str))
+
+
+def _encode_bytes(value):
+    return "\\x" + bytes(value).hex()
+
+
+def _array_literal(value):
+    _items = []
+
+    for _item in value:
+        if _item is None:
+            _items.append("NULL")
+        elif isinstance(_item, (list, tuple)):
+            _items.append(_array_literal(_item))
+        else:
+            _text = str(_item).replace("\\", "\\\\").replace('"', '\\"')
+            _items.append(f'"{_text}"')
+
+    return "{" + ",".join(_items) + "}"
+
+
+def _encode_array(value):
+    return _quote(_array_literal(value))
+
+
+def _encoder(column):
+    if isinstance(column.type, JSON):
+        return _encode_json
+
+    if isinstance(column.type, ARRAY):
+        return _encode_array
+
+    if isinstance(column.type, LargeBinary):
+        return _encode_bytes
+
+    return _encode_text
+
+
+class CopyLoad:
+    """How ``rows`` of ``model`` map to the columns of a ``COPY``.
+
+    Rows are dicts keyed by attribute (or column) name, or model
+    instances. The columns copied are those of the first row, plus the
+    audit columns and the columns with a Python scalar default; a key
+    missing from a later row is loaded as that default, or NULL.
+    """
+
+    def __init__(self, model, rows):
+        try:
+            _mapper = sa_inspect(model)
+        except Exception as e:
+            raise DatabaseException(f"bulk_load needs a mapped model: {e}") from e
+
+        self.model = model
+        self.table = _mapper.local_table
+        self._rows = iter(rows)
+        self._first = next(self._rows, None)
+        self._audit = issubclass(model, EnvoxyMixin)
+        self._entity = _entity_name(_mapper)
+
+        _attributes = {_prop.columns[0].key: _prop.key for _prop in _mapper.column_attrs}
+        _given = set(self._keys(self._first)) if self._first is not None else set()
+
+        self.columns = []
+        self._specs = []
+
+        for _column in self.table.columns:
+            _attribute = _attributes.get(_column.key, _column.key)
+            _default = _column.default.arg if getattr(_column.default, "is_scalar", False) else None
+
+            if (
+                _attribute not in _given
+                and _column.key not in _given
+                and _default is None
+                and not (self._audit and _column.name in AUDIT_COLUMNS)
+            ):
+                continue
+
+            self.columns.append(_column)
+            self._specs.append((_column.name, _attribute, _column.key, _default, _encoder(_column)))
+
+    @staticmethod
+    def _keys(row):
+        if isinstance(row, dict):
+            return row.keys()
+
+        return getattr(row, "__dict__", {}).keys()
+
+    def target(self):
+        if self.table.schema:
+            return sql.Identifier(self.table.schema, self.table.name)
+
+        return sql.Identifier(self.table.name)
+
+    def column_list(self, columns=None):
+        return sql.SQL(", ").join(
+            sql.Identifier(_column.name) for _column in (columns or self.columns)
+        )
+
+    def lines(self):
+        """Yield the CSV lines of the rows, filling the audit columns."""
+        if self._first is None:
+            return
+
+        _now = datetime.datetime.now(datetime.UTC)
+        _prefix = f"/v3/data-layer/{self._entity}/"
+
+        for _row in _chain(self._first, self._rows):
+            _get = _row.get if isinstance(_row, dict) else _row.__dict__.get
+            _id = (_get("id") or str(uuid.uuid4())) if self._audit else None
+            _fields = []
+
+            for _name, _attribute, _key, _default, _encode in self._specs:
+                _value = _get(_attribute)
+
+                if _value is None:
+                    _value = _get(_key)
+
+                if self._audit and _name in AUDIT_COLUMNS:
+                    if _name == "id":
+                        _value = _id
+                    elif _name == "updated" or _value is None:
+                        _value = _now if _name != "href" else _prefix + str(_id)
+
+                if _value is None:
+                    _value = _default
+
+                _fields.append("" if _value is None else _encode(_value))
+
+            yield ",".join(_fields) + "\n"
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+class CopyStream(io.TextIOBase):
+    """File-like view of ``lines`` for ``cursor.copy_expert``, encoding
+    only what each ``read`` asks for."""
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = ""
+        self.rows = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        _parts = [self._buffer]
+        _length = len(self._buffer)
+
+        while size < 0 or _length < size:
+            _line = next(self._lines, None)
+
+            if _line is None:
+                break
+
+            self.rows += 1
+            _parts.append(_line)
+            _length += len(_line)
+
+        _data = "".join(_parts)
+
+        if size < 0:
+            self._buffer = ""
+            return _data
+
+        self._buffer = _data[size:]
+
+        return _data[:size]
@@ -1,80 +1,128 @@
 # ruff: noqa: F401
+import collections
+import functools
 import math
+import os
 import uuid
 import re
-from time import sleep
-from threading import BoundedSemaphore as _BoundedSemaphore, Lock, local
+from time import perf_counter, sleep
+from threading import RLock, Thread, local
 from datetime import datetime, timezone
-from contextlib import contextmanager
+from contextlib import contextmanager, suppress
 
-from psycopg2.pool import ThreadedConnectionPool
 from psycopg2 import OperationalError, DatabaseError, InterfaceError
+import psycopg2.extensions
 import psycopg2.extras
 import psycopg2.sql as sql
 
 from ..db.orm.session import dispose_manager
 from ..db.exceptions import DatabaseException
+from ..utils.config import Config
 from ..utils.logs import Log
+from ..utils.metrics import metrics
+from ..utils.tracing import tracer
+from .bulk import IMMUTABLE_COLUMNS, CopyLoad, CopyStream
+from .pool import ConnectionPool, budget
+from .replicas import LAG_QUERY, expand as expand_replicas, replica_keys, router
+from .statements import StatementCache, execute_statement, to_prepared
 from ..constants import (
     MIN_CONN,
     MAX_CONN,
     TIMEOUT_CONN,
     DEFAULT_OFFSET_LIMIT,
     DEFAULT_CHUNK_SIZE,
+    DEFAULT_ITERSIZE,
+    PG_MAX_IDLE_TIME,
+    PG_MAX_LIFETIME,
+    PG_PING_AFTER_IDLE,
+    PG_PREPARED_STATEMENTS,
+    PG_REPLICA_CHECK_INTERVAL,
+    PG_REPLICA_MAX_LAG,
+    PG_VALIDATE_INTERVAL,
+    TRACING_STATEMENT_LENGTH,
 )
 
+ACQUIRE_SECONDS = metrics.histogram(
+    "envoxy_pg_pool_acquire_duration_seconds",
+    "Time to get a healthy connection from the PostgreSQL pool.",
+    ("server_key",),
+)
+ACQUIRE_FAILURES = metrics.counter(
+    "envoxy_pg_pool_acquire_failures_total",
+    "Failed attempts to get a connection from the PostgreSQL pool.",
+    ("server_key",),
+)
+QUERY_SECONDS = metrics.histogram(
+    "envoxy_pg_query_duration_seconds",
+    "Duration of the PostgreSQL queries, including the chunked fetches.",
+    ("server_key",),
+)
+PINGS = metrics.counter(
+    "envoxy_pg_pings_total",
+    "SELECT 1 liveness checks of pooled PostgreSQL connections, by where they ran.",
+    ("server_key", "source"),
+)
+PREPARED = metrics.counter(
+    "envoxy_pg_prepared_statements_total",
+    "Prepared statement cache lookups by result: hit, miss (prepared now) or refused.",
+    ("server_key", "result"),
+)
+REPLICA_LAG = metrics.gauge(
+    "envoxy_pg_replica_lag_seconds",
+    "Replay lag of the PostgreSQL read replicas, -1 when unreachable.",
+    ("server_key",),
+)
+QUERY_ERRORS = metrics.counter(
+    "envoxy_pg_query_errors_total",
+    "PostgreSQL queries that raised.",
+    ("server_key",),
+)
 
-class SemaphoreThreadedConnectionPool(ThreadedConnectionPool):
-    def __init__(self, minconn, maxconn, *args, **kwargs):
-        # use BoundedSemaphore to detect excessive releases
-        self._semaphore = _BoundedSemaphore(maxconn)
-        super().__init__(minconn, maxconn, *args, **kwargs)
 
-    def getconn(self, *args, timeout=None, **kwargs):
-        """
-        Acquire the semaphore with an optional timeout before getting a connection
-        from the underlying pool. If acquire fails within the timeout, raise a
-        DatabaseException to avoid indefinite blocking.
-        """
-        acquired = self._semaphore.acquire(timeout=timeout)
-        if not acquired:
-            raise DatabaseException("Timeout waiting for DB connection")
+def keyset_query(sql_query, key, after=False):
+    """
+    Rewrites ``sql_query`` into one page of a keyset (seek) pagination:
+    the query is wrapped, not parsed, so it must not have its own
+    ``ORDER BY``/``LIMIT``. Pages are ordered by the ``key`` column (or
+    tuple of columns, compared as a row) and hold ``%(chunk_size)s`` rows.
+    With ``after`` the page starts after the ``%(keyset_last_<n>)s`` values,
+    the keys of the last row of the previous page.
+
+    :param sql_query: SQL query string, with named parameters if any.
+    :param key: Unique, ordered column name or tuple of column names.
+    :param after: Whether this is a page after the first one.
+    :return: psycopg2.sql.Composed query.
+    """
 
-        try:
-            return super().getconn(*args, **kwargs)
-        except Exception:
-            # If obtaining the connection from the underlying pool failed,
-            # release the semaphore to avoid leaks and re-raise.
-            try:
-                self._semaphore.release()
-            except Exception:
-                pass
-            raise
+    _keys = (key,) if isinstance(key, str) else tuple(key)
+
+    if not _keys:
+        raise DatabaseException("keyset needs at least one key column")
+
+    _columns = sql.SQL(", ").join(sql.Identifier(_key) for _key in _keys)
+    _parts = [
+        sql.SQL("SELECT * FROM ({}) AS _envoxy_keyset").format(
+            sql.SQL(sql_query.strip().rstrip(";"))
+        )
+    ]
+
+    if after:
+        _parts.append(
+            sql.SQL("WHERE ({}) > ({})").format(
+                _columns,
+                sql.SQL(", ").join(
+                    sql.Placeholder(f"keyset_last_{_n}") for _n in range(len(_keys))
+                ),
+            )
+        )
+
+    _parts.append(sql.SQL("ORDER BY {} LIMIT %(chunk_size)s").format(_columns))
+
+    return sql.SQL(" ").join(_parts)
 
-    def putconn(self, *args, **kwargs):
-        # Ensure we always attempt to return the connection to the pool and
-        # release the semaphore. If super().putconn raises, we still attempt
-        # to release the semaphore to avoid deadlock. Use a best-effort
-        # pattern because releasing an un-acquired semaphore will raise, so
-        # guard it in a try/except.
-        try:
-            super().putconn(*args, **kwargs)
-        except Exception as e:
-            Log.error(f"Connection pool putconn() raised: {e}")
-            # still attempt to release the semaphore to avoid deadlock
-            try:
-                self._semaphore.release()
-            except Exception as release_exc:
-                Log.error(
-                    f"Failed to release semaphore after putconn error: {release_exc}"
-                )
-            raise
-        else:
-            try:
-                self._semaphore.release()
-            except Exception as release_exc:
-                # BoundedSemaphore raises ValueError on excessive release
-                Log.error(f"Semaphore release error: {release_exc}")
+
+# former name of the pool
+SemaphoreThreadedConnectionPool = ConnectionPool
 
 
 class Client:
@@ -83,8 +131,10 @@ class Client:
     """
 
     _instance = None
-    _lock = Lock()
+    # reentrant: reload_config connects while holding it
+    _lock = RLock()
     _thread_local_data = local()  # Used for thread-local storage
+    _validator_pid = None
 
     def __new__(cls, *args, **kwargs):
         with cls._lock:
@@ -100,8 +150,13 @@ class Client:
         self._initialized = True
 
         self._instances = {}
+        # pools replaced by reload_config, until their connections are back
+        self._retired_pools = []
+
+        self._resize_budget(Config.get("psql_pool"))
+        Config.subscribe(self._resize_budget, node="psql_pool")
 
-        for _server_key, _conf in server_conf.items():
+        for _server_key, _conf in expand_replicas(server_conf).items():
             with self._lock:
                 self._instances[_server_key] = {
                     "server": _server_key,
@@ -110,6 +165,31 @@ class Client:
 
             self.connect(self._instances[_server_key])
 
+        Config.subscribe(self.reload_config, node="psql_servers")
+
+    @staticmethod
+    def _resize_budget(pool_conf):
+        """Connections all the servers of this process may open together,
+        ``max_connections`` of the ``psql_pool`` config node."""
+        budget.resize((pool_conf or {}).get("max_connections"))
+
+    def connection_pool(self, server_key):
+        """The pool of ``server_key``, also lent to its SQLAlchemy engine."""
+        _instance = self._instances.get(server_key)
+
+        if not _instance:
+            raise DatabaseException(
+                f"No configuration found for server key: {server_key}"
+            )
+
+        if "conn_pool" not in _instance:
+            self.connect(_instance)
+
+        if self._validator_pid != os.getpid():
+            self._start_validator()
+
+        return _instance["conn_pool"]
+
     def _retry_on_failure(self, func, retries=3, delay=1):
         """
         Retry a function in case of exceptions.
@@ -142,30 +222,35 @@ class Client:
         :return: Database connection.
         """
 
-        _instance = self._instances.get(server_key)
-
-        if not _instance:
-            raise DatabaseException(
-                f"No configuration found for server key: {server_key}"
-            )
-
-        if "conn_pool" not in _instance:
-            self.connect(_instance)
+        self.connection_pool(server_key)
+        _instance = self._instances[server_key]
 
         # Determine per-connection acquire timeout from config (seconds)
         _conn_timeout = int(_instance["conf"].get("conn_timeout", TIMEOUT_CONN))
+        _ping_after = float(_instance["conf"].get("ping_after_idle", PG_PING_AFTER_IDLE))
+        _start = perf_counter()
 
         for _attempt in range(max_retries):
+            _pool = _instance["conn_pool"]
+
             try:
-                _conn = _instance["conn_pool"].getconn(timeout=_conn_timeout)
+                _conn = _pool.getconn(timeout=_conn_timeout)
             except Exception as e:
                 Log.error(
                     f"[PSQL:{server_key}] Failed to get connection from pool: {e}"
                 )
+                ACQUIRE_FAILURES.labels(server_key).inc()
                 sleep(delay * (math.pow(2, _attempt)))
                 continue
 
-            if self._is_connection_healthy(_conn):
+            # recently used connections skip the SELECT 1 round trip
+            _ping = not hasattr(_pool, "idle_for") or _pool.idle_for(_conn) >= _ping_after
+
+            if _ping:
+                PINGS.labels(server_key, "checkout").inc()
+
+            if self._is_connection_healthy(_conn, ping=_ping):
+                ACQUIRE_SECONDS.labels(server_key).observe(perf_counter() - _start)
                 return _conn
 
             # Return/close broken connection to the pool
@@ -184,17 +269,173 @@ class Client:
         # If we reach here, it means we failed to get a healthy connection after max_retries
         raise DatabaseException("Failed to get a healthy connection")
 
-    def _is_connection_healthy(self, conn):
-        if not conn:
+    def _is_connection_healthy(self, conn, ping=True):
+        """Cheap liveness checks first (closed flag, lost server), then a
+        ``SELECT 1`` round trip when ``ping`` is set. The transaction the
+        ping opens on an idle connection is rolled back: the connection must
+        not sit idle in transaction, e.g. back in the pool after the
+        validator checked it."""
+        if not conn or getattr(conn, "closed", 0):
+            return False
+
+        _info = getattr(conn, "info", None)
+        _status = _info.transaction_status if _info is not None else None
+
+        if _status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
             return False
 
+        if not ping:
+            return True
+
         try:
             with conn.cursor() as _cursor:
                 _cursor.execute("SELECT 1")
+
+            if (
+                _status == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+                and _info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+            ):
+                conn.rollback()
+
             return True
         except (InterfaceError, DatabaseError):
             return False
 
+    def _start_validator(self):
+        """Start the thread pinging the idle pooled connections of this
+        process, see ``validate_interval``."""
+        with self._lock:
+            if self._validator_pid == os.getpid():
+                return
+
+            self._validator_pid = os.getpid()
+
+        Thread(target=self._validate_idle, name="envoxy-pg-validator", daemon=True).start()
+        Thread(target=self._watch_replicas, name="envoxy-pg-replicas", daemon=True).start()
+
+    def _validate_idle(self):
+        while True:
+            _intervals = [
+                float(_instance["conf"].get("validate_interval", PG_VALIDATE_INTERVAL))
+                for _instance in list(self._instances.values())
+            ]
+            _intervals = [_interval for _interval in _intervals if _interval > 0]
+
+            sleep(min(_intervals) if _intervals else PG_VALIDATE_INTERVAL)
+
+            with self._lock:
+                # the SQLAlchemy engines return theirs without release_conn
+                self._retired_pools = [
+                    _pool for _pool in self._retired_pools if _pool.stats()["size"]
+                ]
+
+            if not _intervals:
+                continue
+
+            for _server_key, _instance in list(self._instances.items()):
+                _pool = _instance.get("conn_pool")
+
+                if _pool is None or not hasattr(_pool, "validate_idle"):
+                    continue
+
+                _ping_after = float(
+                    _instance["conf"].get("ping_after_idle", PG_PING_AFTER_IDLE)
+                )
+
+                def _check(conn, server_key=_server_key):
+                    PINGS.labels(server_key, "validator").inc()
+                    return self._is_connection_healthy(conn)
+
+                try:
+                    _pool.reap()
+                    _closed = _pool.validate_idle(_ping_after, _check)
+                except Exception as e:
+                    Log.error(f"[PSQL:{_server_key}] Idle connections validation failed: {e}")
+                    continue
+
+                if _closed:
+                    Log.warning(
+                        f"[PSQL:{_server_key}] Closed {_closed} broken idle connections"
+                    )
+
+    def _watch_replicas(self):
+        """Measure the lag of the read replicas of this process's servers,
+        ejecting those behind by more than ``max_replica_lag`` seconds."""
+        while True:
+            _replicas = [
+                (_server_key, _instance["conf"])
+                for _server_key, _instance in list(self._instances.items())
+                if isinstance(_instance["conf"], dict) and _instance["conf"].get("primary")
+            ]
+
+            sleep(
+                min(
+                    (
+                        float(_conf.get("replica_check_interval", PG_REPLICA_CHECK_INTERVAL))
+                        for _, _conf in _replicas
+                    ),
+                    default=PG_REPLICA_CHECK_INTERVAL,
+                )
+            )
+
+            for _server_key, _conf in _replicas:
+                if _server_key not in self._instances:
+                    continue
+
+                _lag = self._replica_lag(_server_key)
+                _max_lag = float(_conf.get("max_replica_lag", PG_REPLICA_MAX_LAG))
+
+                REPLICA_LAG.labels(_server_key).set(-1 if _lag is None else _lag)
+
+                if router.report(_server_key, _lag, _max_lag):
+                    if router.is_ejected(_server_key):
+                        Log.warning(
+                            f"[PSQL:{_server_key}] Replica ejected, lag: "
+                            f"{'unreachable' if _lag is None else f'{_lag:.1f}s'}"
+                        )
+                    else:
+                        Log.warning(f"[PSQL:{_server_key}] Replica back in rotation")
+
+    def _replica_lag(self, server_key):
+        """Seconds ``server_key`` replays behind its primary, ``None`` when it
+        cannot tell."""
+        try:
+            _conn = self._get_conn(server_key, max_retries=1, delay=0)
+        except Exception as e:
+            Log.error(f"[PSQL:{server_key}] Replica lag check failed: {e}")
+            return None
+
+        try:
+            with _conn.cursor() as _cursor:
+                _cursor.execute(LAG_QUERY)
+                _lag = _cursor.fetchone()[0]
+
+            return None if _lag is None else float(_lag)
+        except Exception as e:
+            Log.error(f"[PSQL:{server_key}] Replica lag check failed: {e}")
+            return None
+        finally:
+            self.release_conn(server_key, _conn)
+
+    def _read_key(self, server_key, primary=False):
+        """The server to read ``server_key`` from: one of its replicas, or
+        itself for ``primary`` reads and inside a transaction."""
+        if primary or getattr(self._thread_local_data, "conn", None):
+            return server_key
+
+        _instance = self._instances.get(server_key)
+
+        if not _instance or not _instance["conf"].get("replicas"):
+            return server_key
+
+        return router.pick(server_key, _instance["conf"], load=self._outstanding)
+
+    def _outstanding(self, server_key):
+        _instance = self._instances.get(server_key)
+        _pool = _instance.get("conn_pool") if _instance else None
+
+        return _pool.stats()["in_use"] if hasattr(_pool, "stats") else 0
+
     def reload_config(self, server_conf):
         """Reload the client configuration safely.
 
@@ -202,6 +443,8 @@ class Client:
         not tear down existing pools for servers that remain unchanged.
         """
 
+        server_conf = expand_replicas(server_conf)
+
         with self._lock:
             # find removed keys
             existing_keys = set(self._instances.keys())
@@ -214,16 +457,11 @@ class Client:
                     dispose_manager(rk)
                 except Exception:
                     Log.error(f"Failed to dispose manager for removed server {rk}")
-                # attempt to close pool if present
-                try:
-                    inst = self._instances.pop(rk, None)
-                    if inst and inst.get("conn_pool"):
-                        try:
-                            inst["conn_pool"].closeall()
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
+                # connections in use are closed when they are released
+                inst = self._instances.pop(rk, None)
+                if inst and inst.get("conn_pool"):
+                    self._retire_pool(inst["conn_pool"])
+                router.forget(rk)
 
             for _server_key, _conf in server_conf.items():
                 if _server_key in self._instances:
@@ -233,6 +471,9 @@ class Client:
                     if old != _conf:
                         # replace conf and reconnect pool
                         self._instances[_server_key]["conf"] = _conf
+                        _old_pool = self._instances[_server_key].pop("conn_pool", None)
+                        if _old_pool is not None:
+                            self._retire_pool(_old_pool)
                         try:
                             # dispose SQLAlchemy manager so callers get a fresh Engine
                             dispose_manager(_server_key)
@@ -254,6 +495,152 @@ class Client:
                     except Exception as e:
                         Log.error(f"Failed to connect new server {_server_key}: {e}")
 
+    def _retire_pool(self, pool):
+        """Close a pool replaced or removed by a reload: its idle
+        connections now, the busy ones when they are released."""
+        pool.closeall()
+
+        if pool.stats()["size"]:
+            self._retired_pools.append(pool)
+
+    def _owning_retired_pool(self, conn):
+        for _pool in self._retired_pools:
+            if _pool.owns(conn):
+                return _pool
+
+        return None
+
+    def _configure_conn(self, conf, conn, state):
+        """Set up a new pooled connection: the schema ``search_path`` is
+        applied once here instead of before every query."""
+        _schema = conf.get("schema")
+
+        if _schema:
+            with conn.cursor() as _cursor:
+                _cursor.execute(
+                    sql.SQL("SET search_path TO {}").format(sql.Identifier(_schema))
+                )
+
+            # committed: the rollbacks on release do not undo it
+            conn.commit()
+            state.search_path = _schema
+
+        _capacity = int(conf.get("prepared_statements", PG_PREPARED_STATEMENTS))
+
+        if _capacity > 0:
+            state.statements = StatementCache(_capacity)
+
+    def _conn_state(self, server_key, conn):
+        _instance = self._instances.get(server_key)
+        _pool = _instance.get("conn_pool") if _instance else None
+
+        return _pool.state(conn) if hasattr(_pool, "state") else None
+
+    def _apply_schema(self, server_key, conn, cursor):
+        _schema = self._get_conf(server_key, "schema")
+
+        if not _schema:
+            return
+
+        _state = self._conn_state(server_key, conn)
+
+        if _state is not None and _state.search_path == _schema:
+            return
+
+        # Safely quote the schema identifier
+        cursor.execute(sql.SQL("SET search_path TO {}").format(sql.Identifier(_schema)))
+
+    def _execute(self, server_key, conn, cursor, sql_query, params):
+        """Execute ``sql_query``, through a prepared statement of the
+        connection when its ``prepared_statements`` cache is enabled."""
+        _state = self._conn_state(server_key, conn) if isinstance(sql_query, str) else None
+        _cache = _state.statements if _state is not None else None
+
+        if _cache is None:
+            cursor.execute(sql_query, params)
+            return
+
+        _stats = self._instances[server_key].setdefault("statements", collections.Counter())
+
+        if sql_query in _cache:
+            _statement = _cache.get(sql_query)
+            _result = "hit" if _statement is not None else "refused"
+        else:
+            _statement = self._prepare(conn, cursor, _cache, sql_query)
+            _result = "miss" if _statement is not None else "refused"
+
+        _stats[_result] += 1
+        PREPARED.labels(server_key, _result).inc()
+
+        if _statement is None:
+            cursor.execute(sql_query, params)
+        else:
+            cursor.execute(_statement[1], params)
+
+    def _prepare(self, conn, cursor, cache, sql_query):
+        """``PREPARE`` ``sql_query`` on ``conn`` and cache it; returns
+        ``(name, execute)`` or ``None`` when the server refuses it, e.g. when
+        it cannot infer a parameter type."""
+        try:
+            _text, _names, _positional = to_prepared(sql_query)
+        except ValueError:
+            cache.add(sql_query, None)
+            return None
+
+        _name = StatementCache.next_name()
+        # a failed PREPARE must not abort the caller's transaction
+        _savepoint = not conn.autocommit
+
+        try:
+            if _savepoint:
+                cursor.execute("SAVEPOINT envoxy_prepare")
+
+            cursor.execute(f"PREPARE {_name} AS {_text}")
+
+            if _savepoint:
+                cursor.execute("RELEASE SAVEPOINT envoxy_prepare")
+        except DatabaseError as e:
+            if _savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT envoxy_prepare")
+
+            Log.verbose("PSQL - Not preparing the query: %s", e)
+            cache.add(sql_query, None)
+            return None
+
+        _statement = (_name, execute_statement(_name, _names, _positional))
+        _evicted = cache.add(sql_query, _statement)
+
+        if _evicted is not None:
+            cursor.execute(f"DEALLOCATE {_evicted}")
+
+        return _statement
+
+    def stats(self, server_key=None):
+        """Pool metrics (size, idle, in_use, waiters, wait time, ...) and
+        prepared statement cache counts per server_key, plus the connection
+        ``budget`` of the process when no server_key is given."""
+        if server_key is None:
+            _stats = {_key: self.stats(_key) for _key in list(self._instances)}
+            _stats["budget"] = budget.stats()
+
+            return _stats
+
+        _instance = self._instances[server_key]
+        _pool = _instance.get("conn_pool")
+        _stats = dict(_pool.stats()) if hasattr(_pool, "stats") else {}
+
+        _statements = _instance.get("statements") or collections.Counter()
+        _lookups = _statements["hit"] + _statements["miss"]
+
+        _stats["statements"] = {
+            "hit": _statements["hit"],
+            "miss": _statements["miss"],
+            "refused": _statements["refused"],
+            "hit_rate": _statements["hit"] / _lookups if _lookups else 0.0,
+        }
+
+        return _stats
+
     def _get_conf(self, server_key, key):
         """
         Returns a configuration value for the server.
@@ -281,9 +668,13 @@ class Client:
         _timeout = int(_conf.get("timeout", TIMEOUT_CONN))
 
         _conn_pool = self._retry_on_failure(
-            lambda: SemaphoreThreadedConnectionPool(
-                MIN_CONN,
+            lambda: ConnectionPool(
+                int(_conf.get("min_conn", MIN_CONN)),
                 _max_conn,
+                max_lifetime=_conf.get("max_lifetime", PG_MAX_LIFETIME),
+                max_idle_time=_conf.get("max_idle_time", PG_MAX_IDLE_TIME),
+                configure=functools.partial(self._configure_conn, _conf),
+                budget=budget,
                 host=_conf["host"],
                 port=_conf["port"],
                 dbname=_conf["db"],
@@ -313,6 +704,19 @@ class Client:
         :return: None
         """
 
+        _retired = self._owning_retired_pool(conn)
+        if _retired is not None:
+            # taken before a reload changed the server: the closed pool
+            # closes it
+            with suppress(Exception):
+                _retired.putconn(conn)
+
+            if not _retired.stats()["size"]:
+                with self._lock:
+                    if _retired in self._retired_pools:
+                        self._retired_pools.remove(_retired)
+            return
+
         # Check and handle broken connections upon release
         _instance = self._instances.get(server_key)
         if not _instance:
@@ -325,14 +729,18 @@ class Client:
 
         pool = _instance.get("conn_pool")
 
-        # consult per-instance config whether to run health checks on release
-        health_check = True
+        # consult per-instance config whether to ping on release; the cheap
+        # checks always run
+        health_check = False
         try:
-            health_check = bool(_instance["conf"].get("health_check_on_release", True))
+            health_check = bool(_instance["conf"].get("health_check_on_release", False))
         except Exception:
-            health_check = True
+            health_check = False
+
+        if health_check:
+            PINGS.labels(server_key, "release").inc()
 
-        if health_check and not self._is_connection_healthy(conn):
+        if not self._is_connection_healthy(conn, ping=health_check):
             # Return the broken connection to the pool and mark it closed.
             try:
                 if pool is not None:
@@ -394,13 +802,22 @@ class Client:
             except Exception:
                 pass
 
-    def query(self, server_key=None, sql_query=None, params=None):
+    def query(self, server_key=None, sql_query=None, params=None, keyset=None, primary=False):
         """
         Executes the provided SQL query and returns the results.
 
+        Queries using ``%(offset_limit)s`` and ``%(chunk_size)s`` are run
+        again with the next offset until a chunk comes back short. With
+        ``keyset`` the query is instead paged by its key column(s), see
+        :func:`keyset_query`, which stays linear on deep pages.
+
         :param server_key: Identifier for the server configuration.
         :param sql_query: SQL query string to be executed.
         :param params: Parameters for the SQL query.
+        :param keyset: Unique, ordered key column (or tuple of columns) to
+            page the query by.
+        :param primary: Read from the primary even when the server has
+            replicas, e.g. right after a write.
         :return: Query results as a list of dictionaries.
         """
 
@@ -410,51 +827,377 @@ class Client:
         if not sql_query:
             raise DatabaseException("Sql cannot be empty")
 
+        if keyset is not None and not isinstance(params, dict):
+            raise DatabaseException("keyset pagination needs named (dict) params")
+
+        server_key = self._read_key(server_key, primary)
         _conn = getattr(self._thread_local_data, "conn", None) or self._get_conn(
             server_key
         )
+        _start = perf_counter()
+        _span = tracer.start_span(
+            "pg.query",
+            server_key=server_key,
+            statement=sql_query[:TRACING_STATEMENT_LENGTH],
+        )
+        _error = None
 
         try:
             with _conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as _cursor:
-                _schema = self._get_conf(server_key, "schema")
-                if _schema:
-                    # Safely quote the schema identifier
-                    _cursor.execute(
-                        sql.SQL("SET search_path TO {}").format(sql.Identifier(_schema))
+                self._apply_schema(server_key, _conn, _cursor)
+
+                if keyset is not None:
+                    _data = self._fetch_keyset(_cursor, sql_query, params, keyset)
+                else:
+                    _data = self._fetch_offset(
+                        _cursor,
+                        sql_query,
+                        params,
+                        functools.partial(self._execute, server_key, _conn, _cursor),
                     )
 
-                _data = []
+                QUERY_SECONDS.labels(server_key).observe(perf_counter() - _start)
+
+                return _data
+        except Exception as e:
+            QUERY_ERRORS.labels(server_key).inc()
+            _error = e
+            raise
+        finally:
+            if _span is not None:
+                tracer.finish(_span, _error)
+
+            if not getattr(self._thread_local_data, "conn", None):
+                # query is not using transaction, release connection
+                self.release_conn(server_key, _conn)
+
+    def _fetch_offset(self, cursor, sql_query, params, execute=None):
+        _data = []
+        _execute = execute or cursor.execute
+
+        # copy params to avoid mutating caller's dictionary
+        _local_params = dict(params)
+
+        _chunk_size = _local_params.get("chunk_size", DEFAULT_CHUNK_SIZE)
+        _offset_limit = _local_params.get("offset_limit", DEFAULT_OFFSET_LIMIT)
+
+        _local_params.update({"chunk_size": _chunk_size, "offset_limit": _offset_limit})
+
+        while True:
+            _execute(sql_query, _local_params)
+
+            _rowcount = cursor.rowcount
+            _rows = cursor.fetchall()
+
+            _data.extend(list(map(dict, _rows)))
+
+            _offset_limit += _chunk_size
+            _local_params.update({"offset_limit": _offset_limit})
+
+            # only queries paged by offset_limit have a next chunk
+            if _rowcount != _chunk_size or "%(offset_limit)s" not in sql_query:
+                break
+
+        return _data
+
+    def _fetch_keyset(self, cursor, sql_query, params, keyset):
+        _keys = (keyset,) if isinstance(keyset, str) else tuple(keyset)
+
+        _local_params = dict(params)
+        _chunk_size = _local_params.setdefault("chunk_size", DEFAULT_CHUNK_SIZE)
+
+        _first_page = keyset_query(sql_query, _keys)
+        _next_page = keyset_query(sql_query, _keys, after=True)
+
+        _data = []
+        _page = _first_page
 
-                # copy params to avoid mutating caller's dictionary
-                _local_params = dict(params)
+        while True:
+            cursor.execute(_page, _local_params)
 
-                _chunk_size = _local_params.get("chunk_size", DEFAULT_CHUNK_SIZE)
-                _offset_limit = _local_params.get("offset_limit", DEFAULT_OFFSET_LIMIT)
+            _rows = cursor.fetchall()
 
+            _data.extend(list(map(dict, _rows)))
+
+            if len(_rows) < _chunk_size:
+                break
+
+            try:
                 _local_params.update(
-                    {"chunk_size": _chunk_size, "offset_limit": _offset_limit}
+                    {
+                        f"keyset_last_{_n}": _rows[-1][_key]
+                        for _n, _key in enumerate(_keys)
+                    }
                 )
+            except KeyError as e:
+                raise DatabaseException(
+                    f"Keyset column {e} is not in the query results"
+                ) from e
+
+            _page = _next_page
+
+        return _data
+
+    def query_iter(
+        self,
+        server_key=None,
+        sql_query=None,
+        params=None,
+        itersize=DEFAULT_ITERSIZE,
+        batches=False,
+        as_tuples=False,
+        primary=False,
+    ):
+        """
+        Executes the provided SQL query on a server-side cursor and yields
+        the results lazily, ``itersize`` rows per round trip, so large reads
+        do not hold the whole result set in memory.
 
-                while True:
-                    _cursor.execute(sql_query, _local_params)
+        :param server_key: Identifier for the server configuration.
+        :param sql_query: SQL query string to be executed.
+        :param params: Parameters for the SQL query.
+        :param itersize: Rows fetched from the server at a time.
+        :param batches: Yield lists of up to ``itersize`` rows instead of rows.
+        :param as_tuples: Yield tuples instead of dicts; the first item yielded
+            is then the tuple of column names, shared by every row.
+        :param primary: Read from the primary even when the server has
+            replicas.
+        :return: Generator of rows (or batches of rows).
+        """
 
-                    _rowcount = _cursor.rowcount
-                    _rows = _cursor.fetchall()
+        if not sql_query:
+            raise DatabaseException("Sql cannot be empty")
 
-                    _data.extend(list(map(dict, _rows)))
+        _itersize = int(itersize)
 
-                    _offset_limit += _chunk_size
-                    _local_params.update({"offset_limit": _offset_limit})
+        if _itersize < 1:
+            raise DatabaseException("itersize must be a positive integer")
 
-                    if _rowcount != _chunk_size or "limit" not in sql_query.lower():
-                        break
+        # the connection is only taken once the caller starts iterating
+        return self._iter_rows(
+            server_key, sql_query, params, _itersize, batches, as_tuples, primary
+        )
 
-                return _data
+    def _iter_rows(
+        self, server_key, sql_query, params, itersize, batches, as_tuples, primary=False
+    ):
+        _transaction_conn = getattr(self._thread_local_data, "conn", None)
+        server_key = self._read_key(server_key, primary)
+        _conn = _transaction_conn or self._get_conn(server_key)
+        _prev_autocommit = getattr(_conn, "autocommit", True)
+        _start = perf_counter()
+        _span = tracer.start_span(
+            "pg.query",
+            server_key=server_key,
+            statement=sql_query[:TRACING_STATEMENT_LENGTH],
+            cursor="server-side",
+        )
+        _error = None
+        _cursor = None
+
+        try:
+            if _transaction_conn is None:
+                # named cursors only live inside a transaction
+                _conn.autocommit = False
+
+            with _conn.cursor() as _schema_cursor:
+                self._apply_schema(server_key, _conn, _schema_cursor)
+
+            _cursor = _conn.cursor(name=f"envoxy_iter_{uuid.uuid4().hex}")
+            _cursor.itersize = itersize
+            _cursor.execute(sql_query, params)
+
+            _columns = None
+
+            while True:
+                _rows = _cursor.fetchmany(itersize)
+
+                if _columns is None:
+                    _columns = tuple(_column[0] for _column in _cursor.description)
+
+                    if as_tuples:
+                        yield _columns
+
+                if not _rows:
+                    break
+
+                if not as_tuples:
+                    _rows = [dict(zip(_columns, _row, strict=True)) for _row in _rows]
+
+                if batches:
+                    yield _rows
+                else:
+                    yield from _rows
+
+                if len(_rows) < itersize:
+                    break
+
+            QUERY_SECONDS.labels(server_key).observe(perf_counter() - _start)
+        except Exception as e:
+            QUERY_ERRORS.labels(server_key).inc()
+            _error = e
+            raise
         finally:
-            if not getattr(self._thread_local_data, "conn", None):
-                # query is not using transaction, release connection
+            # also reached when the caller stops iterating early
+            if _cursor is not None:
+                with suppress(Exception):
+                    _cursor.close()
+
+            if _span is not None:
+                tracer.finish(_span, _error)
+
+            if _transaction_conn is None:
+                try:
+                    if _error is None:
+                        _conn.commit()
+                    else:
+                        _conn.rollback()
+                except Exception as e:
+                    Log.error(f"[PSQL:{server_key}] Failed to end the cursor transaction: {e}")
+
+                with suppress(Exception):
+                    _conn.autocommit = _prev_autocommit
+
+                self.release_conn(server_key, _conn)
+
+    def bulk_load(self, server_key, model, rows, upsert=False, conflict_columns=None):
+        """
+        Loads ``rows`` of an ORM ``model`` with ``COPY ... FROM STDIN``.
+
+        The rows are streamed, see :class:`~envoxy.postgresql.bulk.CopyLoad`,
+        and the ``EnvoxyMixin`` audit columns are filled as the ORM listeners
+        would. With ``upsert`` the rows are copied into a temporary table and
+        merged with ``INSERT ... ON CONFLICT DO UPDATE``, which leaves the
+        id, created and href of the existing rows alone.
+
+        :param server_key: Identifier for the server configuration.
+        :param model: Mapped ORM class of the target table.
+        :param rows: Iterable of dicts (attribute name -> value) or model
+            instances.
+        :param upsert: Update the rows that already exist.
+        :param conflict_columns: Unique column(s) identifying the existing
+            rows; the primary key by default.
+        :return: Number of rows written.
+        """
+        _load = CopyLoad(model, rows)
+
+        if not _load.columns:
+            return 0
+
+        _transaction_conn = getattr(self._thread_local_data, "conn", None)
+        _conn = _transaction_conn or self._get_conn(server_key)
+        _start = perf_counter()
+        _span = tracer.start_span(
+            "pg.bulk_load", server_key=server_key, table=_load.table.name
+        )
+        _error = None
+
+        try:
+            with _conn.cursor() as _cursor:
+                self._apply_schema(server_key, _conn, _cursor)
+
+                if upsert:
+                    _count = self._copy_upsert(_cursor, _load, conflict_columns)
+                else:
+                    _count = self._copy(_cursor, _load, _load.target())
+
+            if _transaction_conn is None:
+                _conn.commit()
+
+            QUERY_SECONDS.labels(server_key).observe(perf_counter() - _start)
+
+            return _count
+        except Exception as e:
+            QUERY_ERRORS.labels(server_key).inc()
+            _error = e
+
+            if _transaction_conn is None:
+                try:
+                    _conn.rollback()
+                except Exception as rollback_exc:
+                    Log.error(f"Rollback failed: {rollback_exc}")
+            raise
+        finally:
+            if _span is not None:
+                tracer.finish(_span, _error)
+
+            if _transaction_conn is None:
                 self.release_conn(server_key, _conn)
 
+    @staticmethod
+    def _copy(cursor, load, target):
+        _stream = CopyStream(load.lines())
+
+        cursor.copy_expert(
+            sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+                target, load.column_list()
+            ),
+            _stream,
+        )
+
+        return _stream.rows
+
+    def _copy_upsert(self, cursor, load, conflict_columns):
+        if isinstance(conflict_columns, str):
+            conflict_columns = (conflict_columns,)
+
+        _keys = tuple(
+            conflict_columns or (_column.name for _column in load.table.primary_key.columns)
+        )
+
+        if not _keys:
+            raise DatabaseException(
+                f"upsert into {load.table.name} needs conflict_columns (no primary key)"
+            )
+
+        _names = [_column.name for _column in load.columns]
+
+        if any(_key not in _names for _key in _keys):
+            raise DatabaseException(
+                f"upsert conflict columns {_keys} are not all loaded: {_names}"
+            )
+
+        _staging = sql.Identifier(f"envoxy_bulk_{uuid.uuid4().hex}")
+
+        cursor.execute(
+            sql.SQL(
+                "CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP"
+            ).format(_staging, load.target())
+        )
+        self._copy(cursor, load, _staging)
+
+        _updates = [
+            _name for _name in _names if _name not in _keys and _name not in IMMUTABLE_COLUMNS
+        ]
+
+        if _updates:
+            _action = sql.SQL("DO UPDATE SET {}").format(
+                sql.SQL(", ").join(
+                    sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(_name))
+                    for _name in _updates
+                )
+            )
+        else:
+            _action = sql.SQL("DO NOTHING")
+
+        cursor.execute(
+            sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} ON CONFLICT ({}) {}").format(
+                load.target(),
+                load.column_list(),
+                load.column_list(),
+                _staging,
+                sql.SQL(", ").join(sql.Identifier(_key) for _key in _keys),
+                _action,
+            )
+        )
+        _count = cursor.rowcount
+
+        # ON COMMIT DROP only fires at commit, inside a longer transaction
+        # the staging table would linger until then
+        cursor.execute(sql.SQL("DROP TABLE {}").format(_staging))
+
+        return _count
+
     def insert(self, db_table: str, data: dict, returning=None):
         """Direct inserts are disabled: use the ORM.
 
@@ -0,0 +1,485 @@
+"""Connection pool of the psycopg2 client.
+
+Idle connections are handed out LIFO so the hot ones stay warm and the cold
+ones age out. When every connection is busy and the pool is full, callers
+queue up and are served in arrival order: a returned connection goes
+straight to the oldest waiter, newcomers cannot barge in. Waiters give up
+after ``timeout`` seconds with :class:`DatabaseException`.
+
+``min_idle`` connections are opened up front and kept after bursts.
+Connections older than ``max_lifetime`` seconds, or idle for longer than
+``max_idle_time`` seconds beyond ``min_idle``, are closed and replaced on
+demand.
+
+Each connection has a :class:`ConnectionState` holding what the client
+memoizes per connection (applied ``search_path``, prepared statements).
+
+The pools of a process can share a :class:`ConnectionBudget`: a pool only
+opens a connection when the budget has room, so ``limit`` bounds the
+connections of the process whatever the number of servers.
+"""
+
+import collections
+import threading
+from contextlib import suppress
+from time import monotonic
+
+import psycopg2
+import psycopg2.extensions
+
+from ..db.exceptions import DatabaseException
+
+# seconds between the checks for budget freed by the other pools
+BUDGET_POLL_INTERVAL = 0.05
+
+
+class ConnectionBudget:
+    """Connections the pools sharing it may open together; ``limit``
+    ``None`` is unlimited."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def resize(self, limit):
+        """Change ``limit``; connections over a lowered one are not
+        closed, new ones wait until enough are."""
+        self.limit = int(limit) if limit else None
+
+    def try_acquire(self):
+        with self._lock:
+            if self.limit is not None and self.used >= self.limit:
+                return False
+
+            self.used += 1
+
+            return True
+
+    def release(self):
+        with self._lock:
+            self.used -= 1
+
+    def stats(self):
+        return {"limit": self.limit, "used": self.used}
+
+
+# shared by the pools of the process, see the ``psql_pool`` config node
+budget = ConnectionBudget()
+
+
+class ConnectionState:
+    __slots__ = ("created", "released", "search_path", "statements")
+
+    def __init__(self, now):
+        self.created = now
+        self.released = None
+        self.search_path = None
+        self.statements = None
+
+
+class _Waiter:
+    __slots__ = ("conn", "event", "may_connect")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.conn = None
+        self.may_connect = False
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        minconn,
+        maxconn,
+        *args,
+        max_lifetime=None,
+        max_idle_time=None,
+        configure=None,
+        budget=None,
+        **kwargs,
+    ):
+        """``args`` and ``kwargs`` go to :func:`psycopg2.connect`;
+        ``configure(conn, state)`` runs once on every new connection;
+        connections are only opened within ``budget``, when given."""
+        self.min_idle = max(int(minconn), 0)
+        self.max_size = max(int(maxconn), 1, self.min_idle)
+        self.max_lifetime = float(max_lifetime) if max_lifetime else None
+        self.max_idle_time = float(max_idle_time) if max_idle_time else None
+        self.closed = False
+
+        self._args = args
+        self._kwargs = kwargs
+        self._configure = configure
+        self._budget = budget
+
+        self._lock = threading.Lock()
+        self._idle = collections.deque()  # newest last
+        self._states = {}  # id(conn) -> ConnectionState, every open conn
+        self._waiters = collections.deque()  # oldest first
+        self._size = 0  # open connections plus the ones being opened
+
+        self.created = 0
+        self.recycled = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+        for _ in range(self.min_idle):
+            with self._lock:
+                if not self._grow():
+                    break
+
+            _conn = self._open()
+
+            with self._lock:
+                self._states[id(_conn)].released = monotonic()
+                self._idle.append(_conn)
+
+    def _connect(self):
+        return psycopg2.connect(*self._args, **self._kwargs)
+
+    def _open(self):
+        """Open a connection for a slot already counted in ``_size``."""
+        _conn = None
+
+        try:
+            _conn = self._connect()
+            _state = ConnectionState(monotonic())
+
+            if self._configure is not None:
+                self._configure(_conn, _state)
+        except Exception:
+            if _conn is not None:
+                _close(_conn)
+
+            with self._lock:
+                self._shrink()
+            raise
+
+        with self._lock:
+            self._states[id(_conn)] = _state
+            self.created += 1
+
+        return _conn
+
+    def _grow(self):
+        """Count a connection about to be opened, if the pool and the budget
+        have room; called with the lock held."""
+        if self._size >= self.max_size:
+            return False
+
+        if self._budget is not None and not self._budget.try_acquire():
+            return False
+
+        self._size += 1
+
+        return True
+
+    def _shrink(self):
+        self._size -= 1
+
+        if self._budget is not None:
+            self._budget.release()
+
+        self._wake_to_connect()
+
+    def _wake_to_connect(self):
+        # a slot got free: the oldest waiter may open a connection in it
+        if self._waiters and self._grow():
+            _waiter = self._waiters.popleft()
+            _waiter.may_connect = True
+            _waiter.event.set()
+
+    def _expired(self, state, now):
+        return (
+            self.max_lifetime is not None and now - state.created >= self.max_lifetime
+        ) or (
+            self.max_idle_time is not None
+            and state.released is not None
+            and now - state.released >= self.max_idle_time
+        )
+
+    def _discard(self, conn):
+        """Forget ``conn``; called with the lock held, close it after."""
+        self._states.pop(id(conn), None)
+        self._shrink()
+
+    def getconn(self, timeout=None):
+        """Return a connection, opening one if the pool may grow.
+
+        :raises DatabaseException: no connection got free within ``timeout``.
+        """
+        _expired = []
+        _waiter = None
+
+        with self._lock:
+            if self.closed:
+                raise DatabaseException("Connection pool is closed")
+
+            _now = monotonic()
+
+            while self._idle and not self._waiters:
+                _conn = self._idle.pop()
+
+                if self._expired(self._states[id(_conn)], _now):
+                    self.recycled += 1
+                    self._discard(_conn)
+                    _expired.append(_conn)
+                    continue
+
+                break
+            else:
+                _conn = None
+
+                if self._waiters or not self._grow():
+                    _waiter = _Waiter()
+                    self._waiters.append(_waiter)
+
+        for _old in _expired:
+            _close(_old)
+
+        if _conn is not None:
+            return _conn
+
+        if _waiter is None:
+            return self._open()
+
+        return self._wait(_waiter, timeout)
+
+    def _wait(self, waiter, timeout):
+        _start = monotonic()
+        _deadline = None if timeout is None else _start + timeout
+
+        while True:
+            _remaining = None if _deadline is None else max(_deadline - monotonic(), 0)
+
+            if self._budget is not None:
+                # budget freed by another pool does not wake this one
+                _remaining = (
+                    BUDGET_POLL_INTERVAL
+                    if _remaining is None
+                    else min(_remaining, BUDGET_POLL_INTERVAL)
+                )
+
+            waiter.event.wait(_remaining)
+
+            with self._lock:
+                if (
+                    not waiter.event.is_set()
+                    and self._waiters
+                    and self._waiters[0] is waiter
+                    and self._grow()
+                ):
+                    self._waiters.popleft()
+                    waiter.may_connect = True
+                    waiter.event.set()
+
+                _now = monotonic()
+
+                if not waiter.event.is_set() and (_deadline is None or _now < _deadline):
+                    continue
+
+                _waited = _now - _start
+                self.waits += 1
+                self.wait_seconds += _waited
+                self.max_wait_seconds = max(self.max_wait_seconds, _waited)
+
+                if not waiter.event.is_set():
+                    self._waiters.remove(waiter)
+                    self.timeouts += 1
+
+                    raise DatabaseException(
+                        f"Timeout waiting for DB connection ({self._size} open, "
+                        f"{len(self._waiters)} waiting)"
+                    )
+
+                break
+
+        if waiter.may_connect:
+            return self._open()
+
+        if waiter.conn is None:
+            raise DatabaseException("Connection pool is closed")
+
+        return waiter.conn
+
+    def putconn(self, conn, close=False):
+        """Return ``conn``; it is closed instead when ``close`` is set, when
+        it is broken or when it outlived ``max_lifetime``."""
+        _state = self._states.get(id(conn))
+
+        if _state is None:
+            raise DatabaseException("Trying to put a connection from another pool")
+
+        if not close and not conn.closed:
+            try:
+                _status = conn.info.transaction_status
+
+                if _status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    # server connection lost
+                    close = True
+                elif _status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                close = True
+
+        with self._lock:
+            _now = monotonic()
+
+            if (
+                close
+                or conn.closed
+                or self.closed
+                or (self.max_lifetime is not None and _now - _state.created >= self.max_lifetime)
+            ):
+                if not close and not conn.closed and not self.closed:
+                    self.recycled += 1
+
+                self._discard(conn)
+            else:
+                _state.released = _now
+
+                if self._waiters:
+                    _waiter = self._waiters.popleft()
+                    _waiter.conn = conn
+                    _waiter.event.set()
+                else:
+                    self._idle.append(conn)
+
+                return
+
+        _close(conn)
+
+    def state(self, conn):
+        """The :class:`ConnectionState` of ``conn``, ``None`` when it is not
+        from this pool."""
+        return self._states.get(id(conn))
+
+    def owns(self, conn):
+        return id(conn) in self._states
+
+    def idle_for(self, conn):
+        """Seconds since ``conn`` was last returned, 0 for new connections."""
+        _state = self._states.get(id(conn))
+
+        if _state is None or _state.released is None:
+            return 0.0
+
+        return monotonic() - _state.released
+
+    def reap(self):
+        """Close the connections idle for longer than ``max_idle_time``,
+        keeping ``min_idle``. Returns the number of closed connections."""
+        if self.max_idle_time is None:
+            return 0
+
+        _expired = []
+
+        with self._lock:
+            _limit = monotonic() - self.max_idle_time
+
+            # oldest releases sit at the left of the deque
+            while (
+                self._idle
+                and len(self._idle) > self.min_idle
+                and self._states[id(self._idle[0])].released < _limit
+            ):
+                _conn = self._idle.popleft()
+                self.recycled += 1
+                self._discard(_conn)
+                _expired.append(_conn)
+
+        for _conn in _expired:
+            _close(_conn)
+
+        return len(_expired)
+
+    def validate_idle(self, older_than, check):
+        """Run ``check(conn)`` on the idle connections unused for at least
+        ``older_than`` seconds, closing those that fail it. They are taken
+        out of the pool meanwhile so nobody gets them mid-check. Returns the
+        number of closed connections.
+        """
+        with self._lock:
+            _now = monotonic()
+            _stale = [
+                _conn
+                for _conn in self._idle
+                if _now - self._states[id(_conn)].released >= older_than
+            ]
+
+            for _conn in _stale:
+                self._idle.remove(_conn)
+
+        _closed = 0
+
+        for _conn in _stale:
+            _healthy = check(_conn)
+
+            with self._lock:
+                if _healthy and not self.closed:
+                    self._states[id(_conn)].released = monotonic()
+
+                    if self._waiters:
+                        _waiter = self._waiters.popleft()
+                        _waiter.conn = _conn
+                        _waiter.event.set()
+                    else:
+                        # LIFO: just checked, so hand it out first
+                        self._idle.append(_conn)
+                    continue
+
+                self._discard(_conn)
+
+            _closed += 1
+            _close(_conn)
+
+        return _closed
+
+    def close_idle(self):
+        """Close the idle connections, e.g. of a pool replaced by a reload."""
+        with self._lock:
+            _idle = list(self._idle)
+            self._idle.clear()
+
+            for _conn in _idle:
+                self._discard(_conn)
+
+        for _conn in _idle:
+            _close(_conn)
+
+    def closeall(self):
+        """Close the pool: idle connections now, busy ones when returned."""
+        with self._lock:
+            self.closed = True
+
+            while self._waiters:
+                self._waiters.popleft().event.set()
+
+        self.close_idle()
+
+    def stats(self):
+        with self._lock:
+            _idle = len(self._idle)
+
+            return {
+                "size": self._size,
+                "idle": _idle,
+                "in_use": self._size - _idle,
+                "waiters": len(self._waiters),
+                "min": self.min_idle,
+                "max": self.max_size,
+                "created": self.created,
+                "recycled": self.recycled,
+                "timeouts": self.timeouts,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+
+def _close(conn):
+    with suppress(Exception):
+        conn.close()
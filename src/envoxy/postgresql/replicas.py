@@ -0,0 +1,114 @@
+"""Read replicas of the ``psql_servers`` entries.
+
+An entry lists its replicas under ``replicas``, each a host name or a dict
+overriding the primary's settings (host, port, ...)::
+
+    "main": {
+        "host": "db-primary", "db": "app", "user": "app", "passwd": "...",
+        "replicas": ["db-replica-1", {"host": "db-replica-2", "port": 5433}],
+        "replica_balance": "least_outstanding",
+        "max_replica_lag": 10
+    }
+
+:func:`expand` turns each replica into an entry of its own, named by
+:func:`replica_key`, so the clients pool and monitor it like any server.
+:data:`router` picks the replica a read goes to, skipping the replicas
+ejected for lagging behind the primary.
+"""
+
+import itertools
+import threading
+
+# seconds the replica is behind the primary; 0 when it replayed everything
+# it received (an idle primary does not make it lag) or is not in recovery
+LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+
+def replica_key(server_key, index):
+    return f"{server_key}.replica{index}"
+
+
+def replica_keys(server_key, conf):
+    return [replica_key(server_key, _n) for _n in range(len(conf.get("replicas") or ()))]
+
+
+def expand(server_conf):
+    """``psql_servers`` plus one entry per replica, inheriting the settings
+    of its primary, whose key it holds in ``primary``."""
+    _expanded = {}
+
+    for _server_key, _conf in (server_conf or {}).items():
+        _expanded[_server_key] = _conf
+
+        if not isinstance(_conf, dict):
+            continue
+
+        for _n, _replica in enumerate(_conf.get("replicas") or ()):
+            if isinstance(_replica, str):
+                _replica = {"host": _replica}
+
+            _replica_conf = {_k: _v for _k, _v in _conf.items() if _k != "replicas"}
+            _replica_conf.update(_replica)
+            _replica_conf["primary"] = _server_key
+
+            _expanded[replica_key(_server_key, _n)] = _replica_conf
+
+    return _expanded
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ejected = set()
+        self._turns = {}
+
+    def report(self, key, lag, max_lag):
+        """Record the lag of replica ``key`` (``None``: unreachable) and
+        eject or restore it. Returns ``True`` when that changed."""
+        _eject = lag is None or lag > max_lag
+
+        with self._lock:
+            if _eject == (key in self._ejected):
+                return False
+
+            if _eject:
+                self._ejected.add(key)
+            else:
+                self._ejected.discard(key)
+
+        return True
+
+    def is_ejected(self, key):
+        return key in self._ejected
+
+    def forget(self, key):
+        with self._lock:
+            self._ejected.discard(key)
+
+    def pick(self, server_key, conf, load=None):
+        """The key to read ``server_key`` from: a healthy replica, balanced
+        round-robin or, with ``replica_balance: least_outstanding``, by
+        ``load(key)``; ``server_key`` itself when no replica is healthy."""
+        _healthy = [_key for _key in replica_keys(server_key, conf) if _key not in self._ejected]
+
+        if not _healthy:
+            return server_key
+
+        if load is not None and conf.get("replica_balance") == "least_outstanding":
+            return min(_healthy, key=load)
+
+        _turns = self._turns.get(server_key)
+
+        if _turns is None:
+            _turns = self._turns.setdefault(server_key, itertools.count())
+
+        return _healthy[next(_turns) % len(_healthy)]
+
+
+router = ReplicaRouter()
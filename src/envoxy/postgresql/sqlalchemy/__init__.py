@@ -5,6 +5,6 @@ session manager via `from envoxy.postgresql.sqlalchemy.session import EnvoxySess
 or directly from this package.
 """
 
-from .session import EnvoxySessionManager
+from .session import AsyncEnvoxySessionManager, EnvoxySessionManager
 
-__all__ = ["EnvoxySessionManager"]
+__all__ = ["AsyncEnvoxySessionManager", "EnvoxySessionManager"]
@@ -0,0 +1,78 @@
+"""SQLAlchemy pool lending the connections of the psycopg2 client's pool.
+
+With :class:`SharedPool` the engine of a ``server_key`` keeps no
+connections of its own: each checkout borrows one from the
+:class:`~envoxy.postgresql.pool.ConnectionPool` that also serves
+``pgsqlc.query``, and the checkin gives it back. The server_key then has a
+single pool, sized by ``max_conn`` and bounded by the process budget.
+
+Every checkout makes a new SQLAlchemy record, for which ``pool_pre_ping``
+never runs: pass the client's health-checked acquire as ``acquire`` so the
+borrowed connections are pinged when they sat idle, like those of
+``pgsqlc.query``.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy.pool import NullPool
+
+
+class SharedPool(NullPool):
+    def __init__(self, shared, timeout=None, acquire=None, **kwargs):
+        self._shared = shared
+        self._timeout = timeout
+        self._acquire = acquire
+        # record -> the borrowed connection, also once SQLAlchemy invalidated it
+        self._lent = {}
+
+        kwargs.pop("creator", None)
+        super().__init__(self._borrow, **kwargs)
+
+    def _borrow(self):
+        if self._acquire is not None:
+            return self._acquire()
+
+        return self._shared.getconn(timeout=self._timeout)
+
+    def _create_connection(self):
+        _record = super()._create_connection()
+        self._lent[_record] = _record.dbapi_connection
+
+        return _record
+
+    def _do_return_conn(self, record):
+        _conn = self._lent.pop(record, None)
+        _invalidated = record.dbapi_connection is None
+
+        # detach: the connection belongs to the shared pool
+        record.dbapi_connection = None
+
+        if _conn is not None:
+            self._shared.putconn(_conn, close=_invalidated)
+
+    def recreate(self):
+        self.logger.info("Pool recreating")
+
+        return self.__class__(
+            self._shared,
+            self._timeout,
+            self._acquire,
+            recycle=self._recycle,
+            echo=self.echo,
+            logging_name=self._orig_logging_name,
+            reset_on_return=self._reset_on_return,
+            pre_ping=self._pre_ping,
+            _dispatch=self.dispatch,
+            dialect=self._dialect,
+        )
+
+    def status(self):
+        _stats = self._shared.stats()
+
+        return (
+            f"SharedPool size: {_stats['size']} idle: {_stats['idle']} "
+            f"in use: {_stats['in_use']} waiters: {_stats['waiters']}"
+        )
+
+    def checkedout(self):
+        return len(self._lent)
@@ -10,18 +10,30 @@ Design goals:
   session parameter named `session`.
 - Reasonable engine defaults (pool_pre_ping=True, future=True) but accepts
   a pre-built Engine for advanced setups.
+- `AsyncEnvoxySessionManager`, the same API on SQLAlchemy's asyncio
+  extension, awaited in async views.
 """
 
 from __future__ import annotations
 
 import logging
-
-from contextlib import contextmanager
-from typing import Optional, Callable, Any, Dict
+from collections.abc import Callable
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
 
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import Session, sessionmaker
+
+# Optional, the asyncio extension needs greenlet (pip install sqlalchemy[asyncio])
+try:
+    from sqlalchemy.ext.asyncio import (
+        AsyncSession,
+        async_sessionmaker,
+        create_async_engine,
+    )
+except ImportError:
+    AsyncSession = async_sessionmaker = create_async_engine = None
 
 logger = logging.getLogger(__name__)
 
@@ -42,10 +54,10 @@ class EnvoxySessionManager:
 
     def __init__(
         self,
-        url: Optional[str] = None,
-        engine: Optional[Engine] = None,
-        engine_kwargs: Optional[Dict[str, Any]] = None,
-        session_kwargs: Optional[Dict[str, Any]] = None,
+        url: str | None = None,
+        engine: Engine | None = None,
+        engine_kwargs: dict[str, Any] | None = None,
+        session_kwargs: dict[str, Any] | None = None,
     ) -> None:
         if engine is not None:
             self.engine = engine
@@ -129,3 +141,98 @@ class EnvoxySessionManager:
             self.engine.dispose()
         except Exception:
             logger.exception("Error while disposing engine")
+
+
+class AsyncEnvoxySessionManager:
+    """Manage an SQLAlchemy AsyncEngine + AsyncSession factory, the asyncio
+    counterpart of :class:`EnvoxySessionManager`.
+
+    The engine's connections belong to the event loop that opened them, so
+    a manager must only be used from one loop.
+
+    Example:
+        mgr = AsyncEnvoxySessionManager(url="postgresql+asyncpg://user@/db")
+        async with mgr.session_scope() as session:
+            session.add(obj)
+
+        @mgr.transactional()
+        async def create_product(sku, session: AsyncSession):
+            ...
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        engine: Any | None = None,
+        engine_kwargs: dict[str, Any] | None = None,
+        session_kwargs: dict[str, Any] | None = None,
+    ) -> None:
+        if create_async_engine is None:
+            raise ImportError(
+                "AsyncEnvoxySessionManager requires the greenlet package "
+                "(pip install sqlalchemy[asyncio])"
+            )
+
+        if engine is not None:
+            self.engine = engine
+        elif url:
+            engine_kwargs = engine_kwargs or {}
+            engine_kwargs.setdefault("pool_pre_ping", True)
+            engine_kwargs.setdefault("pool_size", 20)
+            engine_kwargs.setdefault("max_overflow", 10)
+            engine_kwargs.setdefault("pool_timeout", 30)
+            engine_kwargs.setdefault("pool_recycle", 1800)
+            self.engine = create_async_engine(url, **engine_kwargs)
+        else:
+            raise ValueError("AsyncEnvoxySessionManager requires an engine or a url")
+
+        session_kwargs = session_kwargs or {}
+        session_kwargs.setdefault("expire_on_commit", False)
+        self._Session = async_sessionmaker(
+            bind=self.engine, class_=AsyncSession, **session_kwargs
+        )
+
+    @asynccontextmanager
+    async def session_scope(self):
+        """Provide a transactional scope around a series of operations.
+
+        Commits if the block finishes normally, rolls back and re-raises on
+        exception, and always closes the session.
+        """
+        session = self._Session()
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            logger.debug("Session rolled back due to exception", exc_info=True)
+            raise
+        finally:
+            await session.close()
+
+    def transactional(self) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Decorator factory that runs the wrapped coroutine function inside
+        a session, passed as the ``session`` keyword argument unless the
+        caller provides one."""
+
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if "session" in kwargs and isinstance(kwargs["session"], AsyncSession):
+                    return await func(*args, **kwargs)
+
+                async with self.session_scope() as session:
+                    kwargs.setdefault("session", session)
+                    return await func(*args, **kwargs)
+
+            wrapper.__name__ = getattr(func, "__name__", "wrapper")
+            wrapper.__doc__ = func.__doc__
+            return wrapper
+
+        return decorator
+
+    async def dispose(self) -> None:
+        """Dispose the underlying AsyncEngine's pool and release resources."""
+        try:
+            await self.engine.dispose()
+        except Exception:
+            logger.exception("Error while disposing engine")
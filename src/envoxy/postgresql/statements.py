@@ -0,0 +1,105 @@
+"""Server-side prepared statements of the psycopg2 client.
+
+psycopg2 interpolates the parameters client-side, so the server parses and
+plans every query again. :func:`to_prepared` turns a query with ``%(name)s``
+or ``%s`` placeholders into the ``$n`` form of ``PREPARE``, and each pooled
+connection keeps a :class:`StatementCache`, an LRU of the statements it
+prepared, keyed by query text.
+"""
+
+import collections
+import itertools
+import re
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+
+# names are unique per process, the statements are per connection
+_names = itertools.count()
+
+
+def to_prepared(sql_query):
+    """Return ``(text, names, count)``: the query with ``$n`` placeholders,
+    the parameter names in ``$n`` order (named placeholders) and the number
+    of positional ``%s`` placeholders.
+
+    :raises ValueError: when the query mixes named and positional
+        placeholders.
+    """
+    _names_order = []
+    _positional = 0
+
+    def _replace(match):
+        nonlocal _positional
+
+        if match.group(0) == "%%":
+            return "%"
+
+        if match.group(1) is None:
+            _positional += 1
+            return f"${_positional}"
+
+        if match.group(1) not in _names_order:
+            _names_order.append(match.group(1))
+
+        return f"${_names_order.index(match.group(1)) + 1}"
+
+    _text = _PLACEHOLDER.sub(_replace, sql_query)
+
+    if _names_order and _positional:
+        raise ValueError("named and positional placeholders cannot be mixed")
+
+    return _text, tuple(_names_order), _positional
+
+
+def execute_statement(name, names, positional):
+    """The ``EXECUTE`` statement running ``name``, with psycopg2
+    placeholders for its arguments."""
+    if names:
+        return f"EXECUTE {name} ({', '.join(f'%({_name})s' for _name in names)})"
+
+    if positional:
+        return f"EXECUTE {name} ({', '.join(['%s'] * positional)})"
+
+    return f"EXECUTE {name}"
+
+
+class StatementCache:
+    """LRU of the statements prepared on one connection. Queries the server
+    refused to prepare are remembered too, as ``None``, so they are not
+    tried again."""
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._statements = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._statements)
+
+    def __contains__(self, sql_query):
+        return sql_query in self._statements
+
+    def get(self, sql_query):
+        _statement = self._statements.get(sql_query)
+
+        if _statement is not None:
+            self._statements.move_to_end(sql_query)
+
+        return _statement
+
+    def add(self, sql_query, statement):
+        """Remember ``statement`` (``(name, execute)`` or ``None``); returns
+        the name of the evicted statement, to ``DEALLOCATE``, if any."""
+        self._statements[sql_query] = statement
+        self._statements.move_to_end(sql_query)
+
+        while len(self._statements) > self.capacity:
+            _, _evicted = self._statements.popitem(last=False)
+
+            if _evicted is not None:
+                return _evicted[0]
+
+        return None
+
+    @staticmethod
+    def next_name():
+        return f"envoxy_stmt_{next(_names)}"
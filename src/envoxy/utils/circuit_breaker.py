@@ -0,0 +1,209 @@
+"""Per-backend circuit breaker.
+
+A breaker tracks the outcome of recent calls to one backend (a ZMQ, MQTT or
+CouchDB ``server_key``). When the failure rate over the sliding ``window``
+reaches ``failure_rate`` the breaker opens and calls fail immediately with
+:class:`CircuitOpenException` instead of tying up a thread on a dead server.
+After ``reset_timeout`` seconds it lets ``half_open_calls`` trial calls
+through: a success closes it again, a failure re-opens it. A trial that
+reports no outcome within ``reset_timeout`` gives its slot back.
+
+Every call let through must report its outcome with :meth:`record`, from a
+``finally`` block, so that half-open trial slots are never leaked.
+
+Breakers are shared per name through :meth:`CircuitBreaker.get` and are
+configured from the ``circuit_breaker`` node of the server entry::
+
+    "zmq_servers": {
+        "backend": {
+            "host": "127.0.0.1", "port": 51997,
+            "circuit_breaker": {"failure_rate": 0.5, "minimum_calls": 10,
+                                "window": 30, "reset_timeout": 15}
+        }
+    }
+
+Set ``"enabled": false`` to disable it for a server.
+"""
+
+import collections
+import threading
+import time
+
+from .logs import Log
+
+
+class CircuitOpenException(Exception):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    _breakers = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        name,
+        failure_rate=0.5,
+        minimum_calls=10,
+        window=30,
+        reset_timeout=15,
+        half_open_calls=1,
+        enabled=True,
+    ):
+        self.name = name
+        self.failure_rate = float(failure_rate)
+        self.minimum_calls = max(int(minimum_calls), 1)
+        self.window = float(window)
+        self.reset_timeout = float(reset_timeout)
+        self.half_open_calls = max(int(half_open_calls), 1)
+        self.enabled = bool(enabled)
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self._trial_started = 0.0
+        self._outcomes = collections.deque()
+        self._failures = 0
+
+    @classmethod
+    def get(cls, name, conf=None):
+        """Return the shared breaker for ``name``, creating it from ``conf``."""
+        _breaker = cls._breakers.get(name)
+
+        if _breaker is None:
+            with cls._registry_lock:
+                _breaker = cls._breakers.get(name)
+
+                if _breaker is None:
+                    _breaker = cls(name, **(conf or {}))
+                    cls._breakers[name] = _breaker
+
+        return _breaker
+
+    @classmethod
+    def reset_all(cls):
+        with cls._registry_lock:
+            cls._breakers.clear()
+
+    @property
+    def state(self):
+        with self._lock:
+            self._update_state(time.monotonic())
+            return self._state
+
+    def _update_state(self, now):
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_calls = 0
+        elif (
+            self._state == self.HALF_OPEN
+            and self._trial_calls
+            and now - self._trial_started >= self.reset_timeout
+        ):
+            # the trials never reported back, let new ones through
+            self._trial_calls = 0
+
+    def _evict(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            _, _failed = self._outcomes.popleft()
+
+            if _failed:
+                self._failures -= 1
+
+    def _open(self, now):
+        if self._state != self.OPEN:
+            Log.warning(f"CircuitBreaker::{self.name} : opened")
+
+        self._state = self.OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self._failures = 0
+
+    def allow_request(self):
+        if not self.enabled:
+            return True
+
+        with self._lock:
+            self._update_state(time.monotonic())
+
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.HALF_OPEN and self._trial_calls < self.half_open_calls:
+                if not self._trial_calls:
+                    self._trial_started = time.monotonic()
+
+                self._trial_calls += 1
+                return True
+
+            return False
+
+    def check(self):
+        """Raise :class:`CircuitOpenException` if the call must not be made."""
+        if not self.allow_request():
+            raise CircuitOpenException(
+                f"Circuit breaker for {self.name} is {self._state}, failing fast"
+            )
+
+    def record(self, success):
+        """Record the outcome of a call let through: ``True`` for a success,
+        ``False`` for a failure, ``None`` when it ended without one (e.g.
+        cancelled), which only gives its trial slot back."""
+        if success is None:
+            self.release()
+        elif success:
+            self.record_success()
+        else:
+            self.record_failure()
+
+    def release(self):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._trial_calls:
+                self._trial_calls -= 1
+
+    def record_success(self):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            _now = time.monotonic()
+
+            if self._state == self.HALF_OPEN:
+                Log.notice(f"CircuitBreaker::{self.name} : closed")
+
+                self._state = self.CLOSED
+                self._outcomes.clear()
+                self._failures = 0
+                return
+
+            self._outcomes.append((_now, False))
+            self._evict(_now)
+
+    def record_failure(self):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            _now = time.monotonic()
+
+            if self._state == self.HALF_OPEN:
+                self._open(_now)
+                return
+
+            self._outcomes.append((_now, True))
+            self._failures += 1
+            self._evict(_now)
+
+            if (
+                len(self._outcomes) >= self.minimum_calls
+                and self._failures / len(self._outcomes) >= self.failure_rate
+            ):
+                self._open(_now)
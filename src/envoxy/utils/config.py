@@ -1,52 +1,242 @@
-"""Configuration helpers for runtime and non-uwsgi environments."""
+"""Configuration helpers for runtime and non-uwsgi environments.
 
-# ruff: noqa: E722
+The configuration file (``--set conf=...`` under uwsgi, or
+:meth:`Config.set_file_path`) is parsed once into a snapshot shared by every
+:meth:`Config.get` call. Snapshots are replaced, never changed in place, so
+treat the returned nodes as read-only.
+
+The file is checked for changes (mtime and size) at most every
+``Config.check_interval`` seconds while it is being read, or periodically
+by :meth:`Config.watch`. A new snapshot is handed to the subscribers of the
+nodes that changed, see :meth:`Config.subscribe`, so connectors can apply
+it without a restart.
+"""
+
+import inspect
 import json
+import os
+import threading
+import time
+import weakref
+
+from ..constants import CONFIG_CHECK_INTERVAL
 
 try:
     import uwsgi
+except ImportError:
+    uwsgi = None
 
-    class Config:
-        @staticmethod
-        def get(node):
-            return uwsgi.opt.get("conf_content", {}).get(node, {})
 
-        @staticmethod
-        def get_credentials():
-            return uwsgi.opt.get("credentials", {})
+def _stamp(path):
+    try:
+        _stat = os.stat(path)
+    except OSError:
+        return None
+
+    return _stat.st_mtime_ns, _stat.st_size
 
-        @staticmethod
-        def plugins():
-            return uwsgi.opt.get("plugins", {})
 
-except:
+class Config:
+    file_path = None
+    check_interval = CONFIG_CHECK_INTERVAL
 
-    class Config:
-        file_path = None
+    # {"path", "stamp", "content"} of the last parsed file
+    _snapshot = None
+    _checked_at = 0.0
+    _lock = threading.RLock()
+    _subscribers = []
+    _watcher = None
 
-        @staticmethod
-        def set_file_path(file_path):
+    @staticmethod
+    def set_file_path(file_path):
+        with Config._lock:
             Config.file_path = file_path
+            Config._snapshot = None
+
+    @staticmethod
+    def path():
+        if Config.file_path:
+            return Config.file_path
+
+        if uwsgi is not None and uwsgi.opt.get("conf"):
+            _conf = uwsgi.opt["conf"]
+            return _conf.decode("utf-8") if isinstance(_conf, bytes) else _conf
+
+        return None
+
+    @staticmethod
+    def content():
+        """The parsed configuration file."""
+        _snapshot = Config._snapshot
+
+        if (
+            _snapshot is not None
+            and time.monotonic() - Config._checked_at < Config.check_interval
+            and _snapshot["path"] == Config.path()
+        ):
+            return _snapshot["content"]
+
+        return Config.check()
+
+    @staticmethod
+    def get(node):
+        return Config.content().get(node, {})
+
+    @staticmethod
+    def check():
+        """Reload the file if it changed and notify the subscribers; returns
+        the current content."""
+        with Config._lock:
+            Config._checked_at = time.monotonic()
+
+            _previous = Config._snapshot
+            _path = Config.path()
+
+            if _path is None:
+                _content = uwsgi.opt.get("conf_content", {}) if uwsgi is not None else {}
+                Config._snapshot = {"path": None, "stamp": None, "content": _content}
+                return _content
+
+            _stamp_now = _stamp(_path)
+
+            if (
+                _previous is not None
+                and _previous["path"] == _path
+                and (_previous["stamp"] == _stamp_now or _stamp_now is None)
+            ):
+                return _previous["content"]
+
+            if (
+                _previous is None
+                and not Config.file_path
+                and "conf_content" in uwsgi.opt
+            ):
+                # parsed by the uwsgi bootstrap already
+                _content = uwsgi.opt["conf_content"]
+            else:
+                try:
+                    with open(_path, encoding="utf-8") as _conf_file:
+                        _content = json.loads(_conf_file.read())
+                except ValueError:
+                    if _previous is None or _previous["path"] != _path:
+                        raise
+
+                    # a half-written file: keep the current snapshot and
+                    # look again on the next check
+                    return _previous["content"]
+
+            Config._snapshot = {"path": _path, "stamp": _stamp_now, "content": _content}
+
+            if uwsgi is not None and not Config.file_path:
+                uwsgi.opt["conf_content"] = _content
 
-        @staticmethod
-        def get(node):
-            _conf_content = {}
+        if _previous is not None and _previous["path"] == _path:
+            Config._notify(_previous["content"], _content)
 
-            if Config.file_path:
-                _conf_file = open(Config.file_path, encoding="utf-8")
-                _conf_content = json.loads(_conf_file.read())
+        return _content
 
-            return _conf_content.get(node, {})
+    @staticmethod
+    def reload():
+        """Check the file now, regardless of ``check_interval``."""
+        Config._checked_at = 0.0
+
+        return Config.check()
+
+    @staticmethod
+    def subscribe(callback, node=None):
+        """Call ``callback(value)`` with the new value of ``node`` (the whole
+        content when ``None``) every time it changes.
+
+        Bound methods are held weakly: subscribing does not keep their
+        object alive.
+        """
+        if inspect.ismethod(callback):
+            _ref = weakref.WeakMethod(callback)
+        else:
+
+            def _ref():
+                return callback
+
+        with Config._lock:
+            Config._subscribers.append((node, _ref))
+
+    @staticmethod
+    def unsubscribe(callback):
+        with Config._lock:
+            Config._subscribers = [
+                (_node, _ref)
+                for _node, _ref in Config._subscribers
+                if _ref() not in (None, callback)
+            ]
+
+    @staticmethod
+    def _notify(previous, content):
+        from .logs import Log
+
+        with Config._lock:
+            _subscribers = list(Config._subscribers)
+
+        for _node, _ref in _subscribers:
+            _callback = _ref()
+
+            if _callback is None:
+                Config.unsubscribe(None)
+                continue
+
+            if _node is None:
+                if previous == content:
+                    continue
+                _value = content
+            elif previous.get(_node) == content.get(_node):
+                continue
+            else:
+                _value = content.get(_node, {})
+
+            try:
+                _callback(_value)
+            except Exception as e:
+                Log.error(f"Config::reload::{_node or '*'}::Error: {e}")
+
+    @staticmethod
+    def watch(interval=None):
+        """Check the file every ``interval`` seconds from a daemon thread,
+        so subscribers hear about changes even when nothing reads the
+        config. Call it again in forked workers."""
+        interval = float(interval or Config.check_interval)
+
+        if Config._watcher is not None and Config._watcher.is_alive():
+            return Config._watcher
+
+        def _watch():
+            from .logs import Log
+
+            while True:
+                time.sleep(interval)
+
+                try:
+                    Config.reload()
+                except Exception as e:
+                    Log.error(f"Config::watch::Error: {e}")
+
+        Config._watcher = threading.Thread(
+            target=_watch, name="envoxy-config-watcher", daemon=True
+        )
+        Config._watcher.start()
+
+        return Config._watcher
+
+    @staticmethod
+    def get_credentials():
+        if uwsgi is not None:
+            return uwsgi.opt.get("credentials", {})
 
-        @staticmethod
-        def get_credentials():
-            from ..auth.backends import authenticate_container as authenticate
+        from ..auth.backends import authenticate_container as authenticate
 
-            _auth_conf = Config.get("credentials")
-            _credentials = authenticate(_auth_conf)
+        _auth_conf = Config.get("credentials")
+        _credentials = authenticate(_auth_conf)
 
-            return _credentials
+        return _credentials
 
-        @staticmethod
-        def plugins():
-            return uwsgi.opt.get("plugins", {})
+    @staticmethod
+    def plugins():
+        return uwsgi.opt.get("plugins", {}) if uwsgi is not None else {}
@@ -0,0 +1,47 @@
+"""Helpers for absolute request deadlines.
+
+Deadlines are absolute epoch timestamps in seconds (``time.time()`` based)
+so they can be sent to other processes, e.g. in the ``X-Deadline`` header
+of ZMQ messages, and compared there.
+"""
+
+import time
+
+
+def resolve_deadline(timeout=None, deadline=None):
+    """Combine a relative ``timeout`` (seconds) and an absolute ``deadline``
+    (epoch seconds) into one absolute deadline; the earliest wins. Returns
+    ``None`` when neither is given.
+    """
+    _candidates = []
+
+    if timeout is not None:
+        _candidates.append(time.time() + float(timeout))
+
+    if deadline is not None:
+        _candidates.append(float(deadline))
+
+    return min(_candidates) if _candidates else None
+
+
+def remaining(deadline, default=None):
+    """Seconds left until ``deadline`` (never negative), or ``default``
+    when there is no deadline.
+    """
+    if deadline is None:
+        return default
+
+    return max(deadline - time.time(), 0.0)
+
+
+def to_header(deadline):
+    """Header representation of a deadline: epoch milliseconds."""
+    return str(int(deadline * 1000))
+
+
+def from_header(value):
+    """Parse a deadline header value, returning ``None`` if it is invalid."""
+    try:
+        return int(value) / 1000
+    except (TypeError, ValueError):
+        return None
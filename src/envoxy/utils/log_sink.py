@@ -0,0 +1,242 @@
+"""Asynchronous log sink.
+
+With a sink installed (:meth:`Log.set_sink`) log calls only format their
+record and append it to a bounded in-memory queue; a background thread
+writes the records in batches to the uwsgi log, a file or a GELF UDP
+endpoint. Configured from the ``log`` node::
+
+    "log": {
+        "level": 6,
+        "sink": {
+            "target": "uwsgi",      # or "file" (with "path"),
+                                    # or "gelf_udp" (with "host", "port")
+            "capacity": 10000,
+            "batch_size": 256,
+            "flush_interval": 0.5,
+            "policy": "drop"        # or "block"
+        }
+    }
+
+When the queue is full the ``drop`` policy discards the record and counts
+it in ``envoxy_log_records_dropped_total`` while ``block`` makes the caller
+wait for room.
+"""
+
+import atexit
+import collections
+import contextlib
+import os
+import socket
+import threading
+import time
+
+from ..constants import (
+    LOG_SINK_BATCH_SIZE,
+    LOG_SINK_CAPACITY,
+    LOG_SINK_FLUSH_INTERVAL,
+)
+from .metrics import metrics
+
+DROP = "drop"
+BLOCK = "block"
+
+DROPPED = metrics.counter(
+    "envoxy_log_records_dropped_total",
+    "Log records dropped because the async log queue was full.",
+)
+
+
+class UwsgiWriter:
+    def __init__(self, uwsgi):
+        self._uwsgi = uwsgi
+
+    def write(self, records):
+        self._uwsgi.log("\n".join(records))
+
+    def close(self):
+        pass
+
+
+class FileWriter:
+    def __init__(self, path):
+        # kept open for the writer's lifetime, closed by close()
+        self._file = open(path, "a", encoding="utf-8")  # noqa: SIM115
+
+    def write(self, records):
+        self._file.write("\n".join(records) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class GelfUdpWriter:
+    """One datagram per record, as GELF over UDP expects."""
+
+    def __init__(self, host, port):
+        self._address = (host, int(port))
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def write(self, records):
+        for _record in records:
+            # nobody to report a failure to: the log is what failed
+            with contextlib.suppress(OSError):
+                self._socket.sendto(_record.encode(), self._address)
+
+    def close(self):
+        self._socket.close()
+
+
+class AsyncLogSink:
+    def __init__(
+        self,
+        writer,
+        capacity=LOG_SINK_CAPACITY,
+        batch_size=LOG_SINK_BATCH_SIZE,
+        flush_interval=LOG_SINK_FLUSH_INTERVAL,
+        policy=DROP,
+    ):
+        if policy not in (DROP, BLOCK):
+            raise ValueError(f'Unknown log sink policy "{policy}", expected drop or block')
+
+        self.writer = writer
+        self.capacity = int(capacity)
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+        self.policy = policy
+
+        self.written = 0
+        self.dropped = 0
+
+        self._pid = None
+        self._writing = 0
+        self._closed = False
+        self._thread = None
+
+        self.start()
+
+    def start(self):
+        """Start the writer thread of this process. Forked workers call it
+        again to get their own thread, the parent's one is not copied."""
+        if self._pid == os.getpid() or self._closed:
+            return
+
+        self._pid = os.getpid()
+        # deque appends and pops are atomic, the producers never lock
+        self._queue = collections.deque()
+        self._wakeup = threading.Event()
+        self._not_full = threading.Condition()
+
+        self._thread = threading.Thread(
+            target=self._run, name="envoxy-log-sink", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, record):
+        """Queue ``record``; returns ``False`` when it was dropped."""
+        if len(self._queue) >= self.capacity:
+            if self.policy == DROP or self._closed:
+                self.dropped += 1
+                DROPPED.inc()
+                return False
+
+            with self._not_full:
+                while len(self._queue) >= self.capacity and not self._closed:
+                    self._wakeup.set()
+                    self._not_full.wait(self.flush_interval)
+
+        self._queue.append(record)
+
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+        return True
+
+    def _drain(self):
+        while self._queue:
+            _batch = []
+
+            try:
+                while len(_batch) < self.batch_size:
+                    _batch.append(self._queue.popleft())
+            except IndexError:
+                pass
+
+            self._writing = len(_batch)
+
+            try:
+                self.writer.write(_batch)
+                self.written += len(_batch)
+            except Exception:
+                self.dropped += len(_batch)
+                DROPPED.inc(len(_batch))
+            finally:
+                self._writing = 0
+
+            if self.policy == BLOCK:
+                with self._not_full:
+                    self._not_full.notify_all()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+
+            self._drain()
+
+    def flush(self, timeout=None):
+        """Wait until the queued records are written."""
+        self._wakeup.set()
+
+        _deadline = None if timeout is None else time.monotonic() + timeout
+
+        while (self._queue or self._writing) and (
+            _deadline is None or time.monotonic() < _deadline
+        ):
+            time.sleep(0.01)
+
+    def close(self):
+        """Write what is left and stop the writer thread."""
+        if self._closed:
+            return
+
+        self._closed = True
+        self._wakeup.set()
+
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=max(self.flush_interval, 1.0) * 2)
+
+        # records queued while the thread was stopping
+        self._drain()
+        self.writer.close()
+
+        with self._not_full:
+            self._not_full.notify_all()
+
+    @staticmethod
+    def from_conf(conf, uwsgi):
+        """Build the sink described by the ``log.sink`` config node."""
+        _target = conf.get("target", "uwsgi")
+
+        if _target == "uwsgi":
+            _writer = UwsgiWriter(uwsgi)
+        elif _target == "file":
+            _writer = FileWriter(conf["path"])
+        elif _target == "gelf_udp":
+            _writer = GelfUdpWriter(conf.get("host", "127.0.0.1"), conf.get("port", 12201))
+        else:
+            raise ValueError(
+                f'Unknown log sink target "{_target}", expected uwsgi, file or gelf_udp'
+            )
+
+        _sink = AsyncLogSink(
+            _writer,
+            capacity=conf.get("capacity", LOG_SINK_CAPACITY),
+            batch_size=conf.get("batch_size", LOG_SINK_BATCH_SIZE),
+            flush_interval=conf.get("flush_interval", LOG_SINK_FLUSH_INTERVAL),
+            policy=conf.get("policy", DROP),
+        )
+
+        atexit.register(_sink.close)
+
+        return _sink
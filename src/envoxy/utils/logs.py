@@ -15,15 +15,28 @@ except ImportError:
 
     uwsgi = DefaultLog()
 
-from .datetime import Now
-import socket
-import os
 import multiprocessing
-from inspect import getframeinfo, stack
+import os
+import socket
+import sys
+
+import orjson
+
 from .config import Config
+from .datetime import Now
+from .log_sink import AsyncLogSink
 
 _host = socket.gethostname()
 
+# (config file, name) of the running service, see Log.exec_name()
+_exec_name = None
+
+# caller file name -> "package.module.py" as shown in the records
+_files = {}
+
+# AsyncLogSink writing the records off the request thread, see Log.set_sink()
+_sink = None
+
 
 class LogStyle:
     # Reset
@@ -159,117 +172,165 @@ class Log:
         return uwsgi.opt.get("log-format", Log.FORMAT) == "pretty"
 
     @staticmethod
-    def emergency(text, max_lines=None):
+    def emergency(text, *args, max_lines=None):
         if Log.is_gte_log_level(Log.EMERGENCY):
-            caller = getframeinfo(stack()[1][0])
-            uwsgi.log(
-                Log.format_log(
-                    "{} | {} | {}".format(
-                        LogStyle.apply(
-                            " emergency ", [LogStyle.RED_BG, LogStyle.WHITE_FG]
-                        ),
-                        LogStyle.apply(Now.log_format(), LogStyle.BOLD),
-                        Log.truncate_text(text, max_lines),
-                    ),
-                    Log.EMERGENCY,
-                    caller,
-                )
+            Log._write(
+                Log.EMERGENCY,
+                "{} | {} | {}".format(
+                    LogStyle.apply(" emergency ", [LogStyle.RED_BG, LogStyle.WHITE_FG]),
+                    LogStyle.apply(Now.log_format(), LogStyle.BOLD),
+                    Log.truncate_text(Log._interpolate(text, args), max_lines),
+                ),
+                (),
+                None,
             )
 
     @staticmethod
-    def alert(text, max_lines=None):
+    def alert(text, *args, max_lines=None):
         if Log.is_gte_log_level(Log.ALERT):
-            caller = getframeinfo(stack()[1][0])
-            uwsgi.log(
-                Log.format_log(Log.truncate_text(text, max_lines), Log.ALERT, caller)
-            )
+            Log._write(Log.ALERT, text, args, max_lines)
 
     @staticmethod
-    def critical(text, max_lines=None):
+    def critical(text, *args, max_lines=None):
         if Log.is_gte_log_level(Log.CRITICAL):
-            caller = getframeinfo(stack()[1][0])
-            uwsgi.log(
-                Log.format_log(Log.truncate_text(text, max_lines), Log.CRITICAL, caller)
-            )
+            Log._write(Log.CRITICAL, text, args, max_lines)
 
     @staticmethod
-    def error(text, max_lines=None):
+    def error(text, *args, max_lines=None):
         if Log.is_gte_log_level(Log.ERROR):
-            caller = getframeinfo(stack()[1][0])
-            uwsgi.log(
-                Log.format_log(Log.truncate_text(text, max_lines), Log.ERROR, caller)
-            )
+            Log._write(Log.ERROR, text, args, max_lines)
 
     @staticmethod
-    def warning(text, max_lines=None):
-        caller = getframeinfo(stack()[1][0])
+    def warning(text, *args, max_lines=None):
         if Log.is_gte_log_level(Log.WARNING):
-            uwsgi.log(
-                Log.format_log(Log.truncate_text(text, max_lines), Log.WARNING, caller)
-            )
+            Log._write(Log.WARNING, text, args, max_lines)
 
     @staticmethod
-    def notice(text, max_lines=100):
+    def notice(text, *args, max_lines=100):
         if Log.is_gte_log_level(Log.NOTICE):
-            caller = getframeinfo(stack()[1][0])
-            uwsgi.log(
-                Log.format_log(Log.truncate_text(text, max_lines), Log.NOTICE, caller)
-            )
+            Log._write(Log.NOTICE, text, args, max_lines)
 
     @staticmethod
-    def info(text, max_lines=100):
+    def info(text, *args, max_lines=100):
         if Log.is_gte_log_level(Log.INFO):
-            caller = getframeinfo(stack()[1][0])
-            uwsgi.log(
-                Log.format_log(Log.truncate_text(text, max_lines), Log.INFO, caller)
-            )
+            Log._write(Log.INFO, text, args, max_lines)
 
     @staticmethod
-    def debug(text, max_lines=100):
+    def debug(text, *args, max_lines=100):
         if Log.is_gte_log_level(Log.DEBUG):
-            caller = getframeinfo(stack()[1][0])
-            uwsgi.log(
-                Log.format_log(Log.truncate_text(text, max_lines), Log.DEBUG, caller)
-            )
+            Log._write(Log.DEBUG, text, args, max_lines)
 
     @staticmethod
-    def trace(text, max_lines=100):
+    def trace(text, *args, max_lines=100):
         if Log.is_gte_log_level(Log.TRACE):
-            caller = getframeinfo(stack()[1][0])
-            uwsgi.log(
-                Log.format_log(Log.truncate_text(text, max_lines), Log.TRACE, caller)
-            )
+            Log._write(Log.TRACE, text, args, max_lines)
 
     @staticmethod
-    def verbose(text, prefix=True, max_lines=None):
+    def verbose(text, *args, prefix=True, max_lines=None):
         if Log.is_gte_log_level(Log.VERBOSE):
-            caller = getframeinfo(stack()[1][0])
-            if prefix:
-                uwsgi.log(
-                    Log.format_log(
-                        Log.truncate_text(text, max_lines), Log.VERBOSE, caller
-                    )
-                )
-            else:
-                uwsgi.log(
-                    Log.format_log(
-                        str(Log.truncate_text(text, max_lines)), Log.VERBOSE, caller
-                    )
-                )
+            Log._write(Log.VERBOSE, text, args, max_lines)
 
     @staticmethod
     def system(text, max_lines=None):
         uwsgi.log(Log.truncate_text(text, max_lines))
 
     @staticmethod
-    def format_log(text, log_level, caller):
-        _level = int.from_bytes(log_level, "little")
-        _file = ".".join(caller.filename.split("/")[-3:])
-        text = str(text).replace('"', '\\"').replace("\n", "\\n")
-        _exec_name = (
-            Config.get("boot")[0]["name"]
-            if Config and len(Config.get("boot"))
-            else multiprocessing.current_process().name
+    def _interpolate(text, args):
+        """``%``-format ``text`` with the lazy ``args`` of a log call."""
+        if not args:
+            return text
+
+        try:
+            return str(text) % args
+        except (TypeError, ValueError, KeyError):
+            # a broken log call must not break the caller
+            return " ".join([str(text), *map(str, args)])
+
+    @staticmethod
+    def _write(log_level, text, args, max_lines):
+        # frame of the code calling Log.<level>()
+        _frame = sys._getframe(2)
+
+        _record = Log.format_log(
+            Log.truncate_text(Log._interpolate(text, args), max_lines),
+            log_level,
+            _frame.f_code.co_filename,
+            _frame.f_lineno,
         )
 
-        return f'{{ "version": "1.1", "host": "{_host}", "source": "{_host}", "short_message": "{text}" , "timestamp": {Now.timestamp()}, "level": {_level}, "pid": {os.getpid()}, "exec": "{_exec_name}", "file": "{_file}", "line": {caller.lineno}}}'
+        if _sink is not None:
+            _sink.write(_record)
+        else:
+            uwsgi.log(_record)
+
+    @staticmethod
+    def set_sink(sink):
+        """Hand the records to ``sink`` (an
+        :class:`~envoxy.utils.log_sink.AsyncLogSink`) instead of writing them
+        synchronously; ``None`` restores the synchronous writes."""
+        global _sink
+
+        _previous, _sink = _sink, sink
+
+        if _previous is not None and _previous is not sink:
+            _previous.close()
+
+    @staticmethod
+    def configure_sink(conf):
+        """Install the sink described by the ``log.sink`` config node."""
+        Log.set_sink(AsyncLogSink.from_conf(conf, uwsgi) if conf else None)
+
+    @staticmethod
+    def sink():
+        return _sink
+
+    @staticmethod
+    def exec_name():
+        """Service name from the ``boot`` config, resolved once per config
+        file (the config is not read again for every log line)."""
+        global _exec_name
+
+        _source = getattr(Config, "file_path", None)
+
+        if _exec_name is None or _exec_name[0] != _source:
+            _boot = Config.get("boot")
+
+            _exec_name = (
+                _source,
+                _boot[0]["name"] if _boot else multiprocessing.current_process().name,
+            )
+
+        return _exec_name[1]
+
+    @staticmethod
+    def format_log(text, log_level, filename, lineno):
+        """GELF 1.1 JSON record of a log line."""
+        _file = _files.get(filename)
+
+        if _file is None:
+            _file = _files[filename] = ".".join(filename.split("/")[-3:])
+
+        return orjson.dumps(
+            {
+                "version": "1.1",
+                "host": _host,
+                "source": _host,
+                "short_message": str(text),
+                "timestamp": Now.timestamp(),
+                "level": log_level[0],
+                "pid": os.getpid(),
+                "exec": Log.exec_name(),
+                "file": _file,
+                "line": lineno,
+            }
+        ).decode()
+
+
+def _restart_sink():
+    # Threads do not survive a fork: give the worker its own writer thread
+    if _sink is not None:
+        _sink.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_sink)
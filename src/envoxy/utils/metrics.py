@@ -0,0 +1,473 @@
+"""Low overhead metrics registry with a Prometheus text exposition.
+
+Metrics are declared once at module level and updated from the hot paths::
+
+    from envoxy.utils.metrics import metrics
+
+    _REQUESTS = metrics.counter(
+        "envoxy_zmq_requests_total", "ZMQ requests", ("server_key", "outcome")
+    )
+
+    _REQUESTS.labels("backend", "ok").inc()
+
+Declaring a metric twice returns the same object, so modules may share them.
+Histograms preallocate their bucket samples: an observation is a bisect plus
+three additions under one lock.
+
+By default values live in the process memory, which is enough for a single
+worker. Under uWSGI every worker is a separate process, so configure a
+directory (``"metrics": {"directory": ...}`` in the envoxyd conf or the
+``ENVOXY_METRICS_DIR`` environment variable): each process then mirrors its
+values into its own mmap file ``<directory>/metrics_<pid>.db`` and
+:meth:`Registry.render` sums the files of all workers. Gauges of workers
+that are gone are dropped, counters and histograms are kept. Empty the
+directory when the service starts (a tmpfs is a good fit).
+"""
+
+import bisect
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# mmap file layout: a header with the used size, then entries made of the
+# key length, the utf-8 key padded to 8 bytes and the value as a double
+_HEADER = struct.Struct("<I4x")
+_KEY_LENGTH = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+_INITIAL_SIZE = 64 * 1024
+
+
+def _entry_size(key_length):
+    return _KEY_LENGTH.size + key_length + (-(_KEY_LENGTH.size + key_length) % 8)
+
+
+class _MmapFile:
+    """Values of the current process, mirrored into ``path``."""
+
+    def __init__(self, path):
+        self.path = path
+        # kept open for the mapping's lifetime, closed by close()
+        self._file = open(path, "w+b")  # noqa: SIM115
+        self._size = _INITIAL_SIZE
+        self._file.truncate(self._size)
+        self._map = mmap.mmap(self._file.fileno(), self._size)
+        self._used = _HEADER.size
+        self._positions = {}
+
+        _HEADER.pack_into(self._map, 0, self._used)
+
+    def _append(self, key):
+        _key = key.encode()
+        _value_pos = self._used + _entry_size(len(_key))
+        _end = _value_pos + _VALUE.size
+
+        if _end > self._size:
+            while _end > self._size:
+                self._size *= 2
+
+            self._map.close()
+            self._file.truncate(self._size)
+            self._map = mmap.mmap(self._file.fileno(), self._size)
+
+        _KEY_LENGTH.pack_into(self._map, self._used, len(_key))
+        self._map[self._used + _KEY_LENGTH.size : self._used + _KEY_LENGTH.size + len(_key)] = _key
+
+        # The value is written before the header so readers never see an
+        # entry without it
+        _VALUE.pack_into(self._map, _value_pos, 0.0)
+
+        self._used = _end
+        _HEADER.pack_into(self._map, 0, self._used)
+
+        self._positions[key] = _value_pos
+
+        return _value_pos
+
+    def write(self, key, value):
+        _pos = self._positions.get(key)
+
+        if _pos is None:
+            _pos = self._append(key)
+
+        _VALUE.pack_into(self._map, _pos, value)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def read_values(path):
+    """Return the ``{key: value}`` entries of a metrics file."""
+    with open(path, "rb") as _file:
+        _data = _file.read()
+
+    if len(_data) < _HEADER.size:
+        return {}
+
+    _used = min(_HEADER.unpack_from(_data, 0)[0], len(_data))
+    _pos = _HEADER.size
+    _values = {}
+
+    while _pos + _KEY_LENGTH.size <= _used:
+        (_length,) = _KEY_LENGTH.unpack_from(_data, _pos)
+        _value_pos = _pos + _entry_size(_length)
+
+        if _value_pos + _VALUE.size > _used:
+            break
+
+        _key = _data[_pos + _KEY_LENGTH.size : _pos + _KEY_LENGTH.size + _length]
+        _values[_key.decode()] = _VALUE.unpack_from(_data, _value_pos)[0]
+
+        _pos = _value_pos + _VALUE.size
+
+    return _values
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+class _Child:
+    __slots__ = ("_key", "_store")
+
+    def __init__(self, store, key):
+        self._store = store
+        self._key = key
+
+
+class _CounterChild(_Child):
+    __slots__ = ()
+
+    def inc(self, amount=1):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+
+        self._store.add(((self._key, amount),))
+
+
+class _GaugeChild(_Child):
+    __slots__ = ()
+
+    def inc(self, amount=1):
+        self._store.add(((self._key, amount),))
+
+    def dec(self, amount=1):
+        self._store.add(((self._key, -amount),))
+
+    def set(self, value):
+        self._store.set(self._key, value)
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_buckets", "_count", "_store", "_sum")
+
+    def __init__(self, store, bounds, buckets, sum_key, count_key):
+        self._store = store
+        self._bounds = bounds
+        self._buckets = buckets
+        self._sum = sum_key
+        self._count = count_key
+
+    def observe(self, value):
+        self._store.add(
+            (
+                (self._buckets[bisect.bisect_left(self._bounds, value)], 1),
+                (self._sum, value),
+                (self._count, 1),
+            )
+        )
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def _key(self, suffix, labelvalues):
+        return json.dumps([self.name, suffix, labelvalues], separators=(",", ":"))
+
+    def labels(self, *labelvalues):
+        _child = self._children.get(labelvalues)
+
+        if _child is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} expects the labels {', '.join(self.labelnames) or '(none)'}"
+                )
+
+            with self._lock:
+                _child = self._children.get(labelvalues)
+
+                if _child is None:
+                    _child = self._children[labelvalues] = self._child(
+                        [str(_value) for _value in labelvalues]
+                    )
+
+        return _child
+
+    def _child(self, labelvalues):
+        return self.child_class(self._registry, self._key("", labelvalues))
+
+    def samples(self, values):
+        """Yield ``(suffix, labels, value)`` from the aggregated ``values``
+        of this metric (``{(suffix, labelvalues): value}``)."""
+        for (_suffix, _labelvalues), _value in sorted(values.items()):
+            yield _suffix, dict(zip(self.labelnames, _labelvalues, strict=True)), _value
+
+
+class Counter(_Metric):
+    kind = "counter"
+    child_class = _CounterChild
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    child_class = _GaugeChild
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames, buckets=None):
+        super().__init__(registry, name, documentation, labelnames)
+
+        self.buckets = tuple(sorted(float(_b) for _b in buckets or DEFAULT_BUCKETS))
+
+        if "le" in self.labelnames:
+            raise ValueError('"le" is reserved for the histogram buckets')
+
+    def _child(self, labelvalues):
+        _bounds = [*self.buckets, math.inf]
+
+        return _HistogramChild(
+            self._registry,
+            _bounds,
+            [self._key("_bucket", [*labelvalues, _format(_b)]) for _b in _bounds],
+            self._key("_sum", labelvalues),
+            self._key("_count", labelvalues),
+        )
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self, values):
+        _series = {}
+
+        for (_suffix, _labelvalues), _value in values.items():
+            if _suffix == "_bucket":
+                _labelvalues, _le = _labelvalues[:-1], _labelvalues[-1]
+                _series.setdefault(_labelvalues, {}).setdefault("_bucket", {})[_le] = _value
+            else:
+                _series.setdefault(_labelvalues, {})[_suffix] = _value
+
+        for _labelvalues, _values in sorted(_series.items()):
+            _labels = dict(zip(self.labelnames, _labelvalues, strict=True))
+            _buckets = _values.get("_bucket", {})
+            _total = 0.0
+
+            # Buckets are stored per interval and exposed cumulatively
+            for _bound in (*self.buckets, math.inf):
+                _le = _format(_bound)
+                _total += _buckets.get(_le, 0.0)
+                yield "_bucket", {**_labels, "le": _le}, _total
+
+            yield "_sum", _labels, _values.get("_sum", 0.0)
+            yield "_count", _labels, _values.get("_count", 0.0)
+
+
+def _format(value):
+    if value == math.inf:
+        return "+Inf"
+
+    if value == -math.inf:
+        return "-Inf"
+
+    if float(value).is_integer():
+        return f"{value:.1f}"
+
+    return repr(float(value))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    def __init__(self, directory=None):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._values = {}
+        self._file = None
+        self._directory = None
+        self._pid = os.getpid()
+
+        self.configure(directory)
+
+    def configure(self, directory=None):
+        """Keep the values in memory only (``directory`` is ``None``) or
+        share them with the other processes through ``directory``."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+            self._directory = directory
+
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+                self._open()
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def _open(self):
+        self._file = _MmapFile(
+            os.path.join(self._directory, f"metrics_{os.getpid()}.db")
+        )
+
+        for _key, _value in self._values.items():
+            self._file.write(_key, _value)
+
+    def after_fork(self):
+        """Start the values of a forked worker from zero in its own file."""
+        if self._pid == os.getpid():
+            return
+
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._values = {}
+
+        if self._file is not None:
+            # The parent keeps writing to the inherited mapping
+            self._file = None
+            self._open()
+
+    def _register(self, klass, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            _metric = self._metrics.get(name)
+
+            if _metric is None:
+                _metric = self._metrics[name] = klass(
+                    self, name, documentation, labelnames, **kwargs
+                )
+            elif not isinstance(_metric, klass) or _metric.labelnames != tuple(
+                labelnames
+            ):
+                raise ValueError(f'Metric "{name}" is already registered differently')
+
+        return _metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=None):
+        return self._register(
+            Histogram, name, documentation, labelnames, buckets=buckets
+        )
+
+    def add(self, increments):
+        with self._lock:
+            for _key, _amount in increments:
+                _value = self._values[_key] = self._values.get(_key, 0.0) + _amount
+
+                if self._file is not None:
+                    self._file.write(_key, _value)
+
+    def set(self, key, value):
+        with self._lock:
+            self._values[key] = float(value)
+
+            if self._file is not None:
+                self._file.write(key, float(value))
+
+    def collect(self):
+        """Return ``{name: {(suffix, labelvalues): value}}`` summed over all
+        the processes sharing the directory."""
+        if self._directory is None:
+            with self._lock:
+                _sources = [(True, dict(self._values))]
+        else:
+            _sources = []
+
+            for _path in glob.glob(os.path.join(self._directory, "metrics_*.db")):
+                try:
+                    _pid = int(os.path.basename(_path)[8:-3])
+                    _sources.append((_pid_alive(_pid), read_values(_path)))
+                except (ValueError, OSError):
+                    continue
+
+        _collected = {}
+
+        for _alive, _values in _sources:
+            for _key, _value in _values.items():
+                _name, _suffix, _labelvalues = json.loads(_key)
+                _metric = self._metrics.get(_name)
+
+                if _metric is None or (not _alive and _metric.kind == "gauge"):
+                    continue
+
+                _samples = _collected.setdefault(_name, {})
+                _sample = (_suffix, tuple(_labelvalues))
+                _samples[_sample] = _samples.get(_sample, 0.0) + _value
+
+        return _collected
+
+    def render(self):
+        """Prometheus text exposition (version 0.0.4) of every metric."""
+        _collected = self.collect()
+        _lines = []
+
+        for _name, _metric in sorted(self._metrics.items()):
+            _lines.append(f"# HELP {_name} {_escape(_metric.documentation)}")
+            _lines.append(f"# TYPE {_name} {_metric.kind}")
+
+            for _suffix, _labels, _value in _metric.samples(_collected.get(_name, {})):
+                _pairs = ",".join(f'{_k}="{_escape(_v)}"' for _k, _v in _labels.items())
+                _series = f"{_name}{_suffix}{{{_pairs}}}" if _pairs else f"{_name}{_suffix}"
+
+                _lines.append(f"{_series} {_format(_value)}")
+
+        return "\n".join(_lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics = Registry(os.environ.get("ENVOXY_METRICS_DIR") or None)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=metrics.after_fork)
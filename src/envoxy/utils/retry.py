@@ -0,0 +1,137 @@
+"""Bounded retry policy with exponential backoff, jitter and deadline.
+
+A :class:`RetryPolicy` is immutable configuration; each operation calls
+:meth:`RetryPolicy.start` to get a :class:`RetryState` and asks it for the
+next delay after every failure::
+
+    _retry = policy.start()
+
+    while True:
+        try:
+            return do_work()
+        except IOError:
+            _delay = _retry.next_delay()
+            if _delay is None:
+                raise
+            time.sleep(_delay)
+"""
+
+import random
+import time
+
+
+class RetryPolicy:
+    """Retry configuration.
+
+    :param max_attempts: total attempts, including the first one.
+    :param base_delay: delay in seconds before the first retry.
+    :param max_delay: upper bound for a single delay.
+    :param multiplier: backoff growth factor between attempts.
+    :param jitter: fraction (0..1) of every delay that is randomized, so
+        callers failing together do not retry in lockstep.
+    :param deadline: overall budget in seconds measured from ``start()``;
+        no retry is scheduled past it. ``None`` disables the deadline.
+    """
+
+    def __init__(
+        self,
+        max_attempts=3,
+        base_delay=0.5,
+        max_delay=5.0,
+        multiplier=2.0,
+        jitter=0.5,
+        deadline=None,
+    ):
+        self.max_attempts = max(int(max_attempts), 1)
+        self.base_delay = max(float(base_delay), 0.0)
+        self.max_delay = max(float(max_delay), self.base_delay)
+        self.multiplier = max(float(multiplier), 1.0)
+        self.jitter = min(max(float(jitter), 0.0), 1.0)
+        self.deadline = float(deadline) if deadline is not None else None
+
+    @classmethod
+    def from_conf(cls, conf, **defaults):
+        """Build a policy from a config dict, e.g. a ``zmq_servers`` entry's
+        ``retry`` node. Keys missing from ``conf`` fall back to ``defaults``.
+        """
+        _params = dict(defaults)
+
+        for _key in (
+            "max_attempts",
+            "base_delay",
+            "max_delay",
+            "multiplier",
+            "jitter",
+            "deadline",
+        ):
+            if conf and conf.get(_key) is not None:
+                _params[_key] = conf[_key]
+
+        return cls(**_params)
+
+    def backoff(self, retry_number):
+        """Delay before retry ``retry_number`` (1-based), jitter included."""
+        _delay = min(
+            self.base_delay * (self.multiplier ** (retry_number - 1)), self.max_delay
+        )
+
+        if self.jitter:
+            _delay -= _delay * self.jitter * random.random()  # nosec B311
+
+        return _delay
+
+    def start(self, deadline=None):
+        """Begin an operation. ``deadline`` (seconds from now) tightens the
+        policy deadline for this operation only.
+        """
+        return RetryState(self, deadline=deadline)
+
+    def __repr__(self):
+        return (
+            f"RetryPolicy(max_attempts={self.max_attempts}, base_delay={self.base_delay}, "
+            f"max_delay={self.max_delay}, multiplier={self.multiplier}, "
+            f"jitter={self.jitter}, deadline={self.deadline})"
+        )
+
+
+class RetryState:
+    """Progress of one operation under a :class:`RetryPolicy`."""
+
+    def __init__(self, policy, deadline=None):
+        self.policy = policy
+        self.attempts = 1
+        self.started = time.monotonic()
+        self.deadline = policy.deadline
+
+        if deadline is not None:
+            self.deadline = (
+                deadline if self.deadline is None else min(self.deadline, deadline)
+            )
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        """Seconds left before the deadline, or ``None`` without one."""
+        if self.deadline is None:
+            return None
+
+        return max(self.deadline - self.elapsed(), 0.0)
+
+    def next_delay(self):
+        """Register a failed attempt and return the delay before the next
+        one, or ``None`` once the policy is exhausted.
+        """
+        if self.attempts >= self.policy.max_attempts:
+            return None
+
+        _delay = self.policy.backoff(self.attempts)
+
+        _remaining = self.remaining()
+
+        if _remaining is not None and _delay >= _remaining:
+            return None
+
+        self.attempts += 1
+
+        return _delay
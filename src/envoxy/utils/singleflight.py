@@ -0,0 +1,130 @@
+"""Single-flight call coalescing.
+
+Concurrent callers asking for the same ``key`` share one execution of the
+work instead of each running it: the first caller (the leader) runs it and
+the others wait for its result or exception. Used for ``cached_routes`` so an
+expired hot entry triggers one backend request instead of a thundering herd::
+
+    _flights = SingleFlight()
+    _response = _flights.do(_key, fetch, server_key, message)
+
+Every caller gets its own copy of the result: it is snapshotted before the
+waiters are woken, so callers can mutate what they get back safely.
+"""
+
+import asyncio
+import copy
+import functools
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "error", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread based coalescing, the leader runs the work on its own thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def in_flight(self, key):
+        return key in self._calls
+
+    def do(self, key, fn, *args, timeout=None, **kwargs):
+        """Run ``fn(*args, **kwargs)`` once per ``key`` among concurrent callers.
+
+        :param timeout: how long a waiter waits for the leader, in seconds.
+        :raises TimeoutError: the leader did not finish within ``timeout``.
+        """
+        with self._lock:
+            _call = self._calls.get(key)
+
+            if _call is None:
+                _call = self._calls[key] = _Call()
+                _leader = True
+            else:
+                _leader = False
+
+        if not _leader:
+            if not _call.done.wait(timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight call {key}")
+
+            if _call.error is not None:
+                raise _call.error
+
+            return copy.deepcopy(_call.result)
+
+        try:
+            _result = fn(*args, **kwargs)
+            # snapshot before waking the waiters, the leader's caller may
+            # already be mutating _result while they copy it
+            _call.result = copy.deepcopy(_result)
+            return _result
+        except BaseException as e:
+            _call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+            _call.done.set()
+
+
+class AsyncSingleFlight:
+    """asyncio coalescing for one event loop.
+
+    The work runs in its own task, so a caller that is cancelled or times out
+    does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    def in_flight(self, key):
+        return key in self._tasks
+
+    def _finished(self, key, task):
+        self._tasks.pop(key, None)
+
+        # Every caller may have given up already, retrieve the exception so
+        # asyncio does not report it as never retrieved
+        if not task.cancelled():
+            task.exception()
+
+    @staticmethod
+    async def _snapshot(coro):
+        # the task result is never handed out, callers copy it
+        return copy.deepcopy(await coro)
+
+    def start(self, key, coro_fn, *args, **kwargs):
+        """Return the task running ``key``, starting ``coro_fn`` if there is none."""
+        _task = self._tasks.get(key)
+
+        if _task is None:
+            _task = asyncio.get_running_loop().create_task(
+                self._snapshot(coro_fn(*args, **kwargs))
+            )
+            self._tasks[key] = _task
+            _task.add_done_callback(functools.partial(self._finished, key))
+
+            return _task, True
+
+        return _task, False
+
+    async def do(self, key, coro_fn, *args, timeout=None, **kwargs):
+        """Await the shared result of ``coro_fn(*args, **kwargs)`` for ``key``.
+
+        :raises asyncio.TimeoutError: no result within ``timeout`` seconds.
+        """
+        _task, _ = self.start(key, coro_fn, *args, **kwargs)
+
+        _result = await asyncio.wait_for(asyncio.shield(_task), timeout)
+
+        return copy.deepcopy(_result)
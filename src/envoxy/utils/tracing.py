@@ -0,0 +1,263 @@
+"""Request-scoped tracing compatible with the W3C Trace Context.
+
+envoxyd opens a root span for every HTTP request, continuing the trace of
+the caller when it sends a ``traceparent`` header. The span is kept in a
+:mod:`contextvars` variable, so the ``zmqc``, ``mqttc`` and ``pgsqlc`` calls
+made while handling the request record child spans and forward the trace to
+the backends in their ``traceparent`` header::
+
+    00-<trace id: 32 hex>-<span id: 16 hex>-<flags: 01 sampled, 00 not>
+
+Calls made outside of a traced request record nothing.
+
+Finished spans of sampled traces are kept in a ring buffer
+(:meth:`Tracer.spans`) and handed to the exporters, e.g. a
+:class:`JsonLinesExporter`. Configured from the ``tracing`` node::
+
+    "tracing": {
+        "enabled": true,
+        "sample_rate": 0.1,
+        "buffer_size": 1000,
+        "exporter": {"path": "/var/log/envoxy/spans.jsonl"}
+    }
+"""
+
+import collections
+import contextlib
+import contextvars
+import random
+import re
+import threading
+import time
+
+from ..constants import TRACING_BUFFER_SIZE, TRACING_SAMPLE_RATE
+from .encoders import envoxy_json_dumps
+from .logs import Log
+
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current = contextvars.ContextVar("envoxy_span", default=None)
+
+
+def _new_id(bits):
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def parse_traceparent(value):
+    """Return ``(trace_id, parent_id, sampled)`` from a ``traceparent``
+    header, or ``None`` when it is missing or invalid."""
+    if not value:
+        return None
+
+    _match = _TRACEPARENT.match(value.strip().lower())
+
+    if _match is None:
+        return None
+
+    _version, _trace_id, _parent_id, _flags = _match.groups()
+
+    if _version == "ff" or _trace_id == "0" * 32 or _parent_id == "0" * 16:
+        return None
+
+    return _trace_id, _parent_id, bool(int(_flags, 16) & 1)
+
+
+class Span:
+    __slots__ = (
+        "_started",
+        "attributes",
+        "duration",
+        "error",
+        "name",
+        "parent_id",
+        "sampled",
+        "span_id",
+        "start",
+        "trace_id",
+    )
+
+    def __init__(self, name, trace_id, parent_id, sampled, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = attributes
+        self.error = None
+        self.duration = None
+        self.start = time.time()
+        self._started = time.perf_counter()
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+def current_span():
+    """The span of the running request or call, if any."""
+    return _current.get()
+
+
+def activate(span):
+    """Make ``span`` the current one; returns the token for :func:`deactivate`."""
+    return _current.set(span)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+class JsonLinesExporter:
+    """Append every finished span to ``path``, one JSON object per line.
+
+    Lines are buffered and written every ``flush_every`` spans and on
+    :meth:`close`.
+    """
+
+    def __init__(self, path, flush_every=100):
+        self.path = path
+        self.flush_every = max(int(flush_every), 1)
+        # kept open for the exporter's lifetime, closed by close()
+        self._file = open(path, "ab")  # noqa: SIM115
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        _line = envoxy_json_dumps(span.to_dict()) + b"\n"
+
+        with self._lock:
+            self._file.write(_line)
+            self._pending += 1
+
+            if self._pending >= self.flush_every:
+                self._file.flush()
+                self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = True
+        self.sample_rate = TRACING_SAMPLE_RATE
+        self._spans = collections.deque(maxlen=TRACING_BUFFER_SIZE)
+        self._exporters = []
+
+    def configure(self, conf=None):
+        """Apply the ``tracing`` config node, see the module docstring."""
+        conf = conf or {}
+
+        self.enabled = bool(conf.get("enabled", True))
+        self.sample_rate = float(conf.get("sample_rate", TRACING_SAMPLE_RATE))
+        self._spans = collections.deque(
+            self._spans, maxlen=int(conf.get("buffer_size", TRACING_BUFFER_SIZE))
+        )
+
+        _exporter = conf.get("exporter")
+
+        if _exporter and _exporter.get("path"):
+            self.add_exporter(
+                JsonLinesExporter(
+                    _exporter["path"], flush_every=_exporter.get("flush_every", 100)
+                )
+            )
+
+    def add_exporter(self, exporter):
+        """Register an object whose ``export(span)`` gets every finished
+        span of a sampled trace."""
+        self._exporters.append(exporter)
+
+    def remove_exporter(self, exporter):
+        self._exporters.remove(exporter)
+
+    def start_span(self, name, traceparent=None, root=False, **attributes):
+        """Start a span as a child of the current one.
+
+        With ``root`` a new trace is started when there is no current span,
+        continuing the remote ``traceparent`` if valid. Otherwise ``None``
+        is returned when there is nothing to trace.
+        """
+        if not self.enabled:
+            return None
+
+        _parent = _current.get()
+
+        if _parent is not None:
+            return Span(name, _parent.trace_id, _parent.span_id, _parent.sampled, attributes)
+
+        if not root:
+            return None
+
+        _remote = parse_traceparent(traceparent)
+
+        if _remote is not None:
+            return Span(name, _remote[0], _remote[1], _remote[2], attributes)
+
+        return Span(
+            name, _new_id(128), None, random.random() < self.sample_rate, attributes
+        )
+
+    def finish(self, span, error=None):
+        span.duration = time.perf_counter() - span._started
+
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+
+        if not span.sampled:
+            return
+
+        self._spans.append(span)
+
+        for _exporter in self._exporters:
+            try:
+                _exporter.export(span)
+            except Exception as e:
+                Log.error(f"Tracer::export::Error: {e}")
+
+    @contextlib.contextmanager
+    def span(self, name, traceparent=None, root=False, **attributes):
+        """Run the block in a span, see :meth:`start_span`. Yields ``None``
+        when nothing is traced."""
+        _span = self.start_span(name, traceparent=traceparent, root=root, **attributes)
+
+        if _span is None:
+            yield None
+            return
+
+        _token = _current.set(_span)
+        _error = None
+
+        try:
+            yield _span
+        except BaseException as e:
+            _error = e
+            raise
+        finally:
+            _current.reset(_token)
+            self.finish(_span, _error)
+
+    def spans(self, trace_id=None):
+        """Finished spans kept in the ring buffer, oldest first."""
+        return [
+            _span for _span in list(self._spans) if trace_id is None or _span.trace_id == trace_id
+        ]
+
+
+tracer = Tracer()
@@ -4,6 +4,7 @@ from flask import Response as FlaskResponse
 
 from ..constants import SERVER_NAME
 from ..utils.encoders import envoxy_json_dumps
+from ..zeromq.passthrough import RawReply
 
 
 class Response(FlaskResponse):
@@ -13,7 +14,19 @@ class Response(FlaskResponse):
         _response_headers = dict()
         _response_cookies = []
 
-        if args:
+        if args and isinstance(args[0], RawReply):
+            # backend reply proxied without re-encoding its payload
+            _reply = args[0]
+
+            if isinstance(_reply.status, int):
+                kwargs["status"] = _reply.status
+
+            _response_headers = _reply.headers
+            _response_cookies = _reply.cookies
+
+            args = [_reply.body()] + list(args[1:])
+
+        elif args:
             _arg_zero = args[0]
 
             # payload is defined in original body
@@ -0,0 +1,401 @@
+"""asyncio ZMQ client multiplexing requests over DEALER sockets.
+
+Where :class:`~envoxy.zeromq.dispatcher.ZMQ` blocks one REQ socket and one
+pool thread per in-flight request, :class:`AsyncZMQ` sends every request for
+a ``server_key`` over a small set of DEALER sockets. Each request carries its
+``X-Cid`` header as correlation id and the reply is routed back to the
+awaiting future by a reader task, so thousands of concurrent requests only
+cost coroutines.
+
+The number of DEALER sockets per server is set with ``async_sockets`` in the
+``zmq_servers`` entry (default ``ZEROMQ_ASYNC_SOCKETS``).
+"""
+
+import asyncio
+import collections
+import contextlib
+import itertools
+import time
+import uuid
+import weakref
+
+import zmq
+import zmq.asyncio
+
+from ..constants import (
+    ZEROMQ_ASYNC_SOCKETS,
+    ZEROMQ_CONTEXT,
+    ZEROMQ_POLLER_RETRIES,
+    ZEROMQ_POLLIN_TIMEOUT,
+)
+from ..utils.config import Config
+from ..utils.deadline import remaining
+from ..utils.logs import Log
+from ..utils.singleflight import AsyncSingleFlight
+from ..utils.singleton import Singleton
+from .base import BaseZMQ
+from .exceptions import NoSocketException, ZMQException, ZMQTimeoutException
+
+
+class Channel:
+    """DEALER sockets and pending replies for one server_key on one event loop."""
+
+    def __init__(self, zmq_client, context, server_key, size):
+        self._zmq = zmq_client
+        self.server_key = server_key
+        self.url = zmq_client._instances[server_key]["url"]
+        self.zero_copy = zmq_client._instances[server_key]["conf"].get(
+            "zero_copy", False
+        )
+        self.loop = asyncio.get_running_loop()
+        self.pending = {}
+        self.sockets = []
+        self.readers = []
+        # cids in send order per socket, to match the replies of backends
+        # that do not echo X-Cid; not kept once the backend echoed one
+        self._order = {}
+        self.echoes_cid = False
+        self._next_socket = itertools.cycle(range(size))
+
+        for _ in range(size):
+            _socket = context.socket(zmq.DEALER)
+            _socket.setsockopt(zmq.LINGER, 0)
+            _socket.connect(self.url)
+
+            self.sockets.append(_socket)
+            self._order[_socket] = collections.deque()
+            self.readers.append(self.loop.create_task(self._read(_socket)))
+
+    async def _read(self, socket):
+        while True:
+            try:
+                _frames = await socket.recv_multipart(copy=not self.zero_copy)
+            except asyncio.CancelledError:
+                raise
+            except zmq.ZMQError as e:
+                if socket.closed:
+                    return
+
+                Log.error(f"ZMQ::async::recv : {self.url} :: {e}")
+                continue
+
+            try:
+                _response = self._zmq.decode_response(_frames)
+            except Exception as e:
+                Log.error(f"ZMQ::async::recv : Invalid reply from {self.url}. Error: {e}")
+                continue
+
+            _order = self._order[socket]
+            _cid = (_response.get("headers") or {}).get("X-Cid")
+
+            if _cid:
+                # the backend echoes X-Cid, replies are routed by it alone
+                if not self.echoes_cid:
+                    self.echoes_cid = True
+
+                    for _sent in self._order.values():
+                        _sent.clear()
+            elif _order:
+                # Backends that do not echo X-Cid reply in the order requests
+                # were received on this socket. Forgotten cids keep their
+                # place, their late replies are dropped below.
+                _cid = _order.popleft()
+            else:
+                _cid = None
+
+            _future = self.pending.pop(_cid, None)
+
+            if _future is None:
+                if Log.is_gte_log_level(Log.DEBUG):
+                    Log.debug(f"ZMQ::async::recv : Discarding late reply {_cid} from {self.url}")
+                continue
+
+            if not _future.done():
+                _future.set_result(self._zmq.clean_response(_response))
+
+    async def send(self, cid, frames):
+        _socket = self.sockets[next(self._next_socket)]
+        _future = self.loop.create_future()
+
+        self.pending[cid] = _future
+
+        if not self.echoes_cid:
+            self._order[_socket].append(cid)
+
+        try:
+            await _socket.send_multipart([b"", *frames], copy=False)
+        except Exception:
+            self.pending.pop(cid, None)
+
+            # not sent, no reply will take its place
+            with contextlib.suppress(ValueError):
+                self._order[_socket].remove(cid)
+
+            raise
+
+        return _future
+
+    def forget(self, cid):
+        # the cid stays in _order as a tombstone: the reply to a timed out
+        # request may still come and must not answer the next one
+        self.pending.pop(cid, None)
+
+    def close(self):
+        for _reader in self.readers:
+            if not self.loop.is_closed():
+                _reader.cancel()
+
+        if not self.loop.is_closed() and not self.loop.is_running():
+            # Loops driven with run_until_complete (bulk_requests) are idle
+            # here, let the readers process their cancellation
+            self.loop.run_until_complete(
+                asyncio.gather(*self.readers, return_exceptions=True)
+            )
+
+        for _socket in self.sockets:
+            with contextlib.suppress(Exception):
+                _socket.close(linger=0)
+
+        for _future in self.pending.values():
+            if not _future.done() and not self.loop.is_closed():
+                _future.cancel()
+
+        self.pending.clear()
+
+
+class AsyncZMQ(BaseZMQ, Singleton):
+    def __init__(self):
+        self._instances = {}
+        self._context = zmq.asyncio.Context(ZEROMQ_CONTEXT)
+        self._channels = weakref.WeakKeyDictionary()
+        self._flights = weakref.WeakKeyDictionary()
+
+        self.load_servers()
+
+        Config.subscribe(self.reload_servers, node="zmq_servers")
+
+    def reload_servers(self, server_confs):
+        """Apply a new ``zmq_servers`` config node: the channels of the
+        servers that changed are closed once their pending requests are
+        answered, new requests open channels with the new configuration."""
+        _changed = self.load_servers(server_confs)
+
+        for _loop, _channels in list(self._channels.items()):
+            for _server_key in _changed:
+                _channel = _channels.pop(_server_key, None)
+
+                if _channel is None:
+                    continue
+
+                if _loop.is_running():
+                    asyncio.run_coroutine_threadsafe(self._retire(_channel), _loop)
+                elif not _loop.is_closed():
+                    _channel.close()
+
+    @staticmethod
+    async def _retire(channel):
+        _pending = [_future for _future in channel.pending.values() if not _future.done()]
+
+        if _pending:
+            await asyncio.wait(_pending)
+
+        channel.close()
+
+    def get_channel(self, server_key):
+        _loop = asyncio.get_running_loop()
+        _channels = self._channels.setdefault(_loop, {})
+
+        _channel = _channels.get(server_key)
+
+        if _channel is None:
+            _size = int(
+                self._instances[server_key]["conf"].get(
+                    "async_sockets", ZEROMQ_ASYNC_SOCKETS
+                )
+            )
+
+            _channel = Channel(self, self._context, server_key, max(_size, 1))
+            _channels[server_key] = _channel
+
+        return _channel
+
+    def get_flights(self):
+        _loop = asyncio.get_running_loop()
+        _flights = self._flights.get(_loop)
+
+        if _flights is None:
+            _flights = self._flights[_loop] = AsyncSingleFlight()
+
+        return _flights
+
+    async def send_and_recv(self, server_key, message, deadline=None):
+        """Requests to ``cached_routes`` are coalesced: concurrent callers
+        missing the cache for the same request share one backend call.
+        """
+        _cached_route = self.get_cached_route(server_key, message)
+
+        if not _cached_route:
+            return await self._send_and_recv(server_key, message, deadline=deadline)
+
+        _cached_response, _is_stale = self.lookup_cached_response(
+            message, _cached_route
+        )
+
+        _flights = self.get_flights()
+        _flight_key = self.flight_key(server_key, message)
+
+        if _cached_response:
+            if _is_stale:
+                # Serve the stale entry, refresh it in the background
+                _flights.start(
+                    _flight_key,
+                    self._fetch_and_cache,
+                    server_key,
+                    message,
+                    _cached_route,
+                )
+
+            return _cached_response
+
+        try:
+            return await _flights.do(
+                _flight_key,
+                self._fetch_and_cache,
+                server_key,
+                message,
+                _cached_route,
+                deadline,
+                timeout=remaining(deadline),
+            )
+        except TimeoutError as e:
+            raise ZMQTimeoutException(
+                f"ZMQ::async::send_and_recv : Deadline exceeded waiting for the in-flight request to {self._instances[server_key]['url']}"
+            ) from e
+
+    async def _fetch_and_cache(self, server_key, message, cached_route, deadline=None):
+        _response = await self._send_and_recv(server_key, message, deadline=deadline)
+
+        self.set_cached_response(message, cached_route, _response)
+
+        return _response
+
+    async def _send_and_recv(self, server_key, message, deadline=None):
+        _start = time.perf_counter()
+        _span = self.start_span(server_key, message)
+
+        try:
+            _response = await self._send_and_recv_attempts(
+                server_key, message, deadline=deadline
+            )
+        except Exception as e:
+            self.observe_request(server_key, _start, e, span=_span)
+            raise
+
+        self.observe_request(server_key, _start, span=_span)
+
+        return _response
+
+    async def _send_and_recv_attempts(self, server_key, message, deadline=None):
+        if Log.is_gte_log_level(Log.DEBUG):
+            _start = time.time()
+
+        _instance = self._instances[server_key]
+
+        _channel = self.get_channel(server_key)
+
+        _cid = message["headers"].get("X-Cid") or str(uuid.uuid4())
+
+        if _cid in _channel.pending:
+            # Caller-provided ids may repeat, correlation ids must not
+            _cid = f"{_cid}-{uuid.uuid4().hex[:8]}"
+
+        message["headers"]["X-Cid"] = _cid
+
+        try:
+            _frames = self.encode_message(server_key, message)
+        except (TypeError, OverflowError) as e:
+            Log.error(
+                f"ZMQ::async::send_and_recv : Message serialization failed for {_instance['url']}. Error: {e}"
+            )
+            raise ValueError(f"Cannot serialize message: {e}") from e
+
+        _poll_timeout = (ZEROMQ_POLLIN_TIMEOUT / 1000) * ZEROMQ_POLLER_RETRIES
+        _breaker = _instance["circuit_breaker"]
+        _retry = _instance["retry_policy"].start(deadline=remaining(deadline))
+
+        while True:
+            _timeout = remaining(deadline, _poll_timeout)
+
+            if _timeout <= 0:
+                raise ZMQTimeoutException(
+                    f"ZMQ::async::send_and_recv : Deadline exceeded before sending to {_instance['url']}"
+                )
+
+            _breaker.check()
+            _succeeded = None
+
+            try:
+                _future = await _channel.send(_cid, _frames)
+
+                try:
+                    _response = await asyncio.wait_for(
+                        _future, min(_timeout, _poll_timeout)
+                    )
+                except TimeoutError as e:
+                    if _timeout < _poll_timeout:
+                        raise ZMQTimeoutException(
+                            f"Deadline exceeded waiting for a reply from {_instance['url']}"
+                        ) from e
+
+                    raise NoSocketException(
+                        f"No events received in {_timeout} secs on {_instance['url']}"
+                    ) from e
+                finally:
+                    _channel.forget(_cid)
+
+                _succeeded = True
+
+            except ZMQTimeoutException:
+                _succeeded = False
+                raise
+
+            except (NoSocketException, zmq.ZMQError) as e:
+                _succeeded = False
+                _error = e
+
+            finally:
+                # cancelled: no outcome, the trial slot is only given back
+                _breaker.record(_succeeded)
+
+            if _succeeded:
+                break
+
+            Log.warning(
+                f'ZMQ::async::send_and_recv : It is not possible to send message using the ZMQ server "{_instance["url"]}". Error: {_error}'
+            )
+
+            _delay = _retry.next_delay()
+
+            if _delay is None:
+                raise ZMQException(
+                    f'ZMQ::async::send_and_recv : Giving up on ZMQ server "{_instance["url"]}" '
+                    f"after {_retry.attempts} attempts in {_retry.elapsed():.2f} secs. Error: {_error}"
+                ) from _error
+
+            await asyncio.sleep(_delay)
+
+        if Log.is_gte_log_level(Log.DEBUG):
+            _duration = time.time() - _start
+
+            Log.debug(
+                f">>> ZMQ::async::send_and_recv::time:: {_instance['url']} :: {_duration} :: {message} "
+            )
+
+        return _response
+
+    def close(self):
+        for _channels in list(self._channels.values()):
+            for _channel in _channels.values():
+                _channel.close()
+
+        self._channels.clear()
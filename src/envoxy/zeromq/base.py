@@ -0,0 +1,316 @@
+import time
+
+import zmq
+
+from ..cache import Cache
+from ..constants import (
+    TRACEPARENT_HEADER,
+    ZEROMQ_RETRY_DEADLINE,
+    ZEROMQ_RETRY_MAX_ATTEMPTS,
+    ZEROMQ_RETRY_MAX_DELAY,
+    ZEROMQ_RETRY_TIMEOUT,
+)
+from ..utils.circuit_breaker import CircuitBreaker, CircuitOpenException
+from ..utils.config import Config
+from ..utils.encoders import envoxy_json_dumps
+from ..utils.logs import Log
+from ..utils.metrics import metrics
+from ..utils.retry import RetryPolicy
+from ..utils.tracing import tracer
+from .codecs import decode_frames, encode_frames, get_codec
+from .exceptions import ZMQTimeoutException
+from .passthrough import EncodedMessage, RawReply
+
+REQUESTS = metrics.counter(
+    "envoxy_zmq_requests_total",
+    "ZMQ requests by outcome: ok, timeout, circuit_open or error.",
+    ("server_key", "outcome"),
+)
+REQUEST_SECONDS = metrics.histogram(
+    "envoxy_zmq_request_duration_seconds",
+    "Duration of the successful ZMQ requests, retries included.",
+    ("server_key",),
+)
+CACHE_LOOKUPS = metrics.counter(
+    "envoxy_cache_lookups_total",
+    "Cache lookups by source (zmq cached routes or @cache views) and result.",
+    ("source", "result"),
+)
+
+
+class BaseZMQ:
+    """Configuration, cached routes and reply handling shared by the sync
+    (:class:`~envoxy.zeromq.dispatcher.ZMQ`) and asyncio
+    (:class:`~envoxy.zeromq.aio.AsyncZMQ`) clients.
+    """
+
+    _cache = None
+    _instances = {}
+    _server_confs = None
+
+    def load_servers(self, server_confs=None):
+        """(Re)build the server entries from ``server_confs``, the
+        ``zmq_servers`` config node by default. Returns the keys of the
+        servers added, changed or removed."""
+        if server_confs is None:
+            server_confs = Config.get("zmq_servers")
+
+        if not server_confs:
+            raise Exception("Error to find ZMQ Servers config")
+
+        self._server_confs = server_confs
+
+        _changed = set(self._instances) - set(server_confs)
+
+        for _server_key in _changed:
+            self._instances.pop(_server_key, None)
+
+        for _server_key, _conf in server_confs.items():
+            _instance = self._instances.get(_server_key)
+
+            if _instance is not None and _instance["conf"] == _conf:
+                continue
+
+            _changed.add(_server_key)
+
+            self._instances[_server_key] = {
+                "server_key": _server_key,
+                "conf": _conf,
+                "url": f"tcp://{_conf.get('host')}:{_conf.get('port')}",
+                "retry_policy": RetryPolicy.from_conf(
+                    _conf.get("retry"),
+                    max_attempts=ZEROMQ_RETRY_MAX_ATTEMPTS,
+                    base_delay=ZEROMQ_RETRY_TIMEOUT,
+                    max_delay=ZEROMQ_RETRY_MAX_DELAY,
+                    deadline=ZEROMQ_RETRY_DEADLINE,
+                ),
+                "circuit_breaker": CircuitBreaker.get(
+                    f"zmq:{_server_key}", _conf.get("circuit_breaker")
+                ),
+                "codec": get_codec(_conf.get("codec")),
+            }
+
+        # Cached Routes
+        if self._cache is None and Config.get("cache"):
+            _cache_instance = Cache()
+            self._cache = _cache_instance.get_backend()
+
+        return _changed
+
+    def remove_header(self, response, header):
+        if "headers" in response and header in response["headers"]:
+            response["headers"].pop(header, None)
+
+    def remove_keys(self, response, keys):
+        for _key in keys:
+            response.pop(_key, None)
+
+    def encode_message(self, server_key, message):
+        """Encode ``message`` with the server's codec into multipart frames,
+        without the empty delimiter. Raw ``attachments`` of the message are
+        sent as extra frames instead of being encoded.
+        """
+        if isinstance(message, EncodedMessage):
+            return message.frames
+
+        _attachments = message.get("attachments")
+
+        if _attachments:
+            message = {_k: _v for _k, _v in message.items() if _k != "attachments"}
+
+        return encode_frames(
+            self._instances[server_key]["codec"], message, _attachments
+        )
+
+    def reply_frames(self, frames):
+        """Strip the empty delimiters of a multipart reply. Frames received
+        with ``copy=False`` are turned into memoryviews of their buffer.
+        """
+        _start = 0
+
+        while _start < len(frames) - 1 and not len(frames[_start]):
+            _start += 1
+
+        return [
+            _frame.buffer if isinstance(_frame, zmq.Frame) else _frame
+            for _frame in frames[_start:]
+        ]
+
+    def decode_response(self, frames):
+        """Decode a multipart reply into a dict, see :mod:`.codecs`."""
+        return decode_frames(self.reply_frames(frames))
+
+    def raw_response(self, frames):
+        """Wrap a multipart reply in an undecoded :class:`RawReply`."""
+        return RawReply(self.reply_frames(frames), decode_frames)
+
+    def start_span(self, server_key, message):
+        """Start the trace span of a request, when there is a trace, and
+        send its ``traceparent`` to the backend."""
+        _span = tracer.start_span(
+            "zmq.request",
+            server_key=server_key,
+            resource=message["resource"],
+            performative=int(message["performative"]),
+        )
+
+        # Pre-encoded messages keep the traceparent of the calling span
+        if _span is not None and not isinstance(message, EncodedMessage):
+            message["headers"][TRACEPARENT_HEADER] = _span.traceparent
+
+        return _span
+
+    def observe_request(self, server_key, started, error=None, span=None):
+        """Record the outcome of a request started at ``started``
+        (``time.perf_counter()``) that failed with ``error``, if any, and
+        finish its trace ``span``."""
+        if span is not None:
+            tracer.finish(span, error)
+
+        if error is None:
+            REQUESTS.labels(server_key, "ok").inc()
+            REQUEST_SECONDS.labels(server_key).observe(time.perf_counter() - started)
+        elif isinstance(error, ZMQTimeoutException):
+            REQUESTS.labels(server_key, "timeout").inc()
+        elif isinstance(error, CircuitOpenException):
+            REQUESTS.labels(server_key, "circuit_open").inc()
+        else:
+            REQUESTS.labels(server_key, "error").inc()
+
+    def clean_response(self, response):
+        self.remove_header(response, "X-Cid")
+
+        self.remove_keys(response, ["protocol", "performative"])
+
+        return response
+
+    def get_cached_route(self, server_key, message):
+        """Return the ``cached_routes`` entry that applies to ``message``, if any."""
+
+        if not self._cache:
+            return None
+
+        _cached_routes = self._instances[server_key]["conf"].get("cached_routes")
+
+        if not _cached_routes:
+            return None
+
+        _message_headers = message.get("headers") or {}
+
+        if (
+            "X-No-Cache" in _message_headers
+            and _message_headers.get("X-No-Cache") is not False
+        ):
+            return None
+
+        _performative = message["performative"]
+        _resource = message["resource"]
+
+        _cached_key = f"{_performative}:{'/'.join(_resource.split('/')[:4])}"
+
+        return _cached_routes.get(_cached_key)
+
+    def flight_key(self, server_key, message):
+        """Coalescing key of a cached route request, matching its cache key."""
+        return (
+            server_key,
+            message["performative"],
+            message["resource"],
+            envoxy_json_dumps(message.get("params")),
+        )
+
+    def get_cached_response(self, message):
+        _performative = message["performative"]
+        _resource = message["resource"]
+        _params = message.get("params")
+
+        _cached_response = self._cache.get(_resource, _performative, _params)
+
+        if _cached_response and Log.is_gte_log_level(Log.DEBUG):
+            Log.debug(
+                f">>> ZMQ::cache::get::cached: {_resource} :: {_performative} :: {_params}"
+            )
+
+        return _cached_response
+
+    def lookup_cached_response(self, message, cached_route):
+        """Return ``(response, is_stale)`` for ``message``.
+
+        With ``stale_ttl`` set on the route, entries are kept ``stale_ttl``
+        seconds past their ``ttl`` and reported stale during that window so
+        they can be served while being refreshed. Error replies only live
+        their ``error_ttl`` and are never stale.
+        """
+        _stale_ttl = int(cached_route.get("stale_ttl", 0))
+
+        if not _stale_ttl or not hasattr(self._cache, "get_with_ttl"):
+            _cached_response = self.get_cached_response(message)
+
+            CACHE_LOOKUPS.labels("zmq", "hit" if _cached_response else "miss").inc()
+
+            return _cached_response, False
+
+        _cached_response, _ttl = self._cache.get_with_ttl(
+            message["resource"], message["performative"], message.get("params")
+        )
+
+        if not _cached_response:
+            CACHE_LOOKUPS.labels("zmq", "miss").inc()
+
+            return _cached_response, False
+
+        _is_stale = (
+            _ttl is not None
+            and _ttl <= _stale_ttl
+            and 200 <= int(_cached_response.get("status", 0)) < 300
+        )
+
+        CACHE_LOOKUPS.labels("zmq", "stale" if _is_stale else "hit").inc()
+
+        if Log.is_gte_log_level(Log.DEBUG):
+            Log.debug(
+                f">>> ZMQ::cache::get::cached{'::stale' if _is_stale else ''}: "
+                f"{message['resource']} :: {message['performative']} :: {message.get('params')}"
+            )
+
+        return _cached_response, _is_stale
+
+    def set_cached_response(self, message, cached_route, response):
+        _performative = message["performative"]
+        _resource = message["resource"]
+        _params = message.get("params")
+
+        try:
+            _status_code = int(response.get("status", 0))
+
+            if _status_code >= 200 and _status_code < 300:
+                # kept stale_ttl past the ttl, see lookup_cached_response
+                _ttl = int(cached_route.get("ttl", 3600)) + int(
+                    cached_route.get("stale_ttl", 0)
+                )
+
+            else:
+                _ttl = int(cached_route.get("error_ttl", 60))
+
+                if Log.is_gte_log_level(Log.ERROR):
+                    Log.error(
+                        f"ZMQ::cache::set::Error: "
+                        f"(state_code: {_status_code}, this cached entry will expire in {_ttl} seconds) "
+                        f"{_resource} :: {_performative} :: {_params}"
+                    )
+
+            self._cache.set(
+                _resource,
+                _performative,
+                _params,
+                response,
+                _ttl,
+            )
+
+            if Log.is_gte_log_level(Log.DEBUG):
+                Log.debug(
+                    f">>> ZMQ::cache::set: {_resource} :: {_performative} :: {_params}"
+                )
+
+        except Exception as e:
+            Log.error(f"ZMQ::cache::set::Error: {e}")
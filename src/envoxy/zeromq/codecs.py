@@ -0,0 +1,124 @@
+"""Wire codecs for ZMQ messages.
+
+The codec is chosen per ``zmq_servers`` entry with ``"codec"`` (``json`` by
+default). JSON messages without attachments keep the historical framing::
+
+    [b"", body]
+
+Any other codec, or a message carrying raw ``attachments``, is sent framed
+with the codec marker so the backend knows how to decode it::
+
+    [b"", b"application/msgpack", body, attachment, ...]
+
+Attachments are ``bytes``/``memoryview`` parts sent as they are, without
+being encoded into the body. Replies are decoded the same way: a leading
+marker frame selects the codec and trailing frames become the reply's
+``attachments``.
+"""
+
+import datetime
+import decimal
+
+from ..utils.encoders import envoxy_json_dumps, envoxy_json_loads
+
+# Optional, only needed for servers configured with "codec": "msgpack"
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class JSONCodec:
+    name = "json"
+    marker = b"application/json"
+
+    def encode(self, obj):
+        return envoxy_json_dumps(obj)
+
+    def decode(self, data):
+        return envoxy_json_loads(data)
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+
+    raise TypeError(f"Object of type {type(obj).__name__} is not msgpack serializable")
+
+
+class MsgpackCodec:
+    name = "msgpack"
+    marker = b"application/msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError(
+                'The "msgpack" codec requires the msgpack package (pip install msgpack)'
+            )
+
+    def encode(self, obj):
+        return msgpack.packb(obj, default=_msgpack_default, use_bin_type=True)
+
+    def decode(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+
+CODECS = {
+    JSONCodec.name: JSONCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+
+MARKERS = {
+    JSONCodec.marker: JSONCodec.name,
+    MsgpackCodec.marker: MsgpackCodec.name,
+}
+
+_MARKER_MAX_LENGTH = max(len(_marker) for _marker in MARKERS)
+
+_codecs = {}
+
+
+def get_codec(name=None):
+    """Return the codec registered as ``name`` (``json`` when empty)."""
+    name = name or JSONCodec.name
+
+    _codec = _codecs.get(name)
+
+    if _codec is None:
+        try:
+            _codec = _codecs[name] = CODECS[name]()
+        except KeyError as e:
+            raise ValueError(
+                f'Unknown ZMQ codec "{name}", expected one of {", ".join(CODECS)}'
+            ) from e
+
+    return _codec
+
+
+def encode_frames(codec, message, attachments=None):
+    """Return the frames (without the empty delimiter) for ``message``."""
+    _body = codec.encode(message)
+
+    if codec.name == JSONCodec.name and not attachments:
+        return [_body]
+
+    return [codec.marker, _body, *(attachments or ())]
+
+
+def decode_frames(frames):
+    """Decode reply ``frames`` (delimiter already stripped) into a dict."""
+    if len(frames) > 1 and len(frames[0]) <= _MARKER_MAX_LENGTH:
+        _name = MARKERS.get(bytes(frames[0]))
+
+        if _name is not None:
+            _response = get_codec(_name).decode(frames[1])
+
+            if len(frames) > 2:
+                _response["attachments"] = list(frames[2:])
+
+            return _response
+
+    return envoxy_json_loads(frames[-1])
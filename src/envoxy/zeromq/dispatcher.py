@@ -1,5 +1,8 @@
 import asyncio
-import queue
+import contextlib
+import contextvars
+import functools
+import itertools
 import threading
 import time
 import uuid
@@ -8,44 +11,71 @@ from concurrent.futures import ThreadPoolExecutor
 import zmq
 
 from ..asserts import assertz_integer, assertz_mandatory, assertz_string, assertz_uri
-from ..cache import Cache
 from ..constants import (
     SERVER_NAME,
+    TRACEPARENT_HEADER,
     ZEROMQ_CONTEXT,
+    ZEROMQ_DEADLINE_HEADER,
     ZEROMQ_MAX_WORKERS,
+    ZEROMQ_MIN_WORKERS,
     ZEROMQ_POLLER_RETRIES,
     ZEROMQ_POLLIN_TIMEOUT,
-    ZEROMQ_RETRY_TIMEOUT,
+    ZEROMQ_WORKER_IDLE_TIMEOUT,
+    ZEROMQ_WORKER_TIMEOUT,
     Performative,
 )
 from ..exceptions import ValidationException
 from ..utils.config import Config
 from ..utils.datetime import Now
+from ..utils.deadline import remaining, resolve_deadline, to_header
+from ..utils.encoders import envoxy_json_loads
 from ..utils.logs import Log
+from ..utils.metrics import metrics
+from ..utils.singleflight import SingleFlight
 from ..utils.singleton import Singleton
-from ..utils.encoders import envoxy_json_loads, envoxy_json_dumps
-
-
-class NoSocketException(Exception):
-    pass
-
-
-class ZMQException(Exception):
-    pass
+from ..utils.tracing import current_span
+from .aio import AsyncZMQ
+from .base import BaseZMQ
+from .exceptions import (
+    NoSocketException,
+    ZMQException,
+    ZMQTimeoutException,
+)
+from .codecs import JSONCodec
+from .passthrough import splice_message
+from .pool import WorkerPool
+
+WORKERS_IN_USE = metrics.gauge(
+    "envoxy_zmq_workers_in_use",
+    "ZMQ pool workers currently handling a request.",
+    ("server_key",),
+)
+WORKER_WAIT_TIMEOUTS = metrics.counter(
+    "envoxy_zmq_worker_wait_timeouts_total",
+    "Requests that timed out waiting for a free ZMQ pool worker.",
+    ("server_key",),
+)
 
 
-class ZMQ(Singleton):
+class ZMQ(BaseZMQ, Singleton):
     _cache = None
     _instances = {}
     _contexts = {}
     _workers = {}
-    _available_workers = {}
+    _pools = {}
+    _stale_workers = set()  # workers of servers changed by a reload
+    _worker_ids = itertools.count()
     _executor = None
+    _reaper = None
     _lock = threading.Lock()
 
     def __init__(self):
         try:
-            _workers_conf = Config.get("zmq_workers")
+            _workers_conf = Config.get("zmq_workers") or {}
+        except Exception:
+            _workers_conf = {}
+
+        try:
             self._thread_poll_executor_max_workers = int(
                 _workers_conf.get(
                     "thread_poll_executor_max_workers", ZEROMQ_MAX_WORKERS
@@ -55,57 +85,154 @@ class ZMQ(Singleton):
             self._thread_poll_executor_max_workers = ZEROMQ_MAX_WORKERS
 
         try:
-            _workers_conf = Config.get("zmq_workers")
             self._max_workers = int(
                 _workers_conf.get("context_max_workers", ZEROMQ_MAX_WORKERS)
             )
         except Exception:
             self._max_workers = ZEROMQ_MAX_WORKERS
 
+        try:
+            self._min_workers = int(
+                _workers_conf.get("context_min_workers", ZEROMQ_MIN_WORKERS)
+            )
+        except Exception:
+            self._min_workers = ZEROMQ_MIN_WORKERS
+
+        self._idle_timeout = _workers_conf.get(
+            "idle_timeout", ZEROMQ_WORKER_IDLE_TIMEOUT
+        )
+        self._worker_timeout = _workers_conf.get(
+            "worker_timeout", ZEROMQ_WORKER_TIMEOUT
+        )
+
         Log.info(
             f"ZMQ: ThreadPoolExecutor max workers: {self._thread_poll_executor_max_workers}"
         )
-        Log.info(f"ZMQ: Context max workers: {self._max_workers}")
-
-        self._server_confs = Config.get("zmq_servers")
+        Log.info(
+            f"ZMQ: Context workers: min {self._min_workers}, max {self._max_workers}, "
+            f"idle timeout {self._idle_timeout}"
+        )
 
-        if not self._server_confs:
-            raise Exception("Error to find ZMQ Servers config")
+        self.load_servers()
 
         for _server_key in self._server_confs.keys():
-            _conf = self._server_confs[_server_key]
+            self.start_pool(_server_key)
 
-            self._contexts[_server_key] = zmq.Context(ZEROMQ_CONTEXT)
+        Config.subscribe(self.reload_servers, node="zmq_servers")
 
-            self._instances[_server_key] = {
-                "server_key": _server_key,
-                "conf": _conf,
-                "url": f"tcp://{_conf.get('host')}:{_conf.get('port')}",
-            }
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._thread_poll_executor_max_workers,
+            thread_name_prefix="zmqc-worker",
+        )
 
-            self._available_workers[_server_key] = queue.Queue()
+        self._flights = SingleFlight()
 
-            for _i in range(self._max_workers):
-                self.add_worker(_server_key, f"zmqc-poller-{_server_key}-{_i}")
+        if any(_pool.idle_timeout for _pool in self._pools.values()):
+            self._reaper = threading.Thread(
+                target=self._reap_idle_workers, name="zmqc-reaper", daemon=True
+            )
+            self._reaper.start()
 
-        # Cached Routes
-        if Config.get("cache"):
-            _cache_instance = Cache()
-            self._cache = _cache_instance.get_backend()
+    def start_pool(self, server_key):
+        if server_key not in self._contexts:
+            self._contexts[server_key] = zmq.Context(ZEROMQ_CONTEXT)
 
-        self._executor = ThreadPoolExecutor(
-            max_workers=self._thread_poll_executor_max_workers,
-            thread_name_prefix="zmqc-worker",
+        _conf = self._instances[server_key]["conf"]
+
+        self._pools[server_key] = WorkerPool(
+            server_key,
+            create=functools.partial(self.add_worker, server_key),
+            destroy=self.remove_worker,
+            min_workers=_conf.get("min_workers", self._min_workers),
+            max_workers=_conf.get("max_workers", self._max_workers),
+            idle_timeout=_conf.get("idle_timeout", self._idle_timeout),
+        )
+
+    def reload_servers(self, server_confs):
+        """Apply a new ``zmq_servers`` config node. Servers that changed or
+        were removed get their idle workers closed right away and their
+        busy ones when freed; new requests use the new configuration."""
+        for _server_key in self.load_servers(server_confs):
+            _pool = self._pools.pop(_server_key, None)
+
+            if _pool is not None:
+                with self._lock:
+                    self._stale_workers.update(
+                        _worker_id
+                        for _worker_id, _worker in self._workers.items()
+                        if _worker["server_key"] == _server_key
+                    )
+
+                _pool.close()
+
+            if _server_key in self._instances:
+                self.start_pool(_server_key)
+
+            Log.info(f"ZMQ: reloaded the configuration of {_server_key}")
+
+    def _reap_idle_workers(self):
+        _interval = min(
+            _pool.idle_timeout for _pool in self._pools.values() if _pool.idle_timeout
         )
 
-    def get_available_worker(self, server_key):
-        return self._available_workers[server_key].get()
+        while True:
+            time.sleep(max(_interval / 2, 1))
+
+            for _server_key, _pool in list(self._pools.items()):
+                try:
+                    _reaped = _pool.reap()
+                except Exception as e:
+                    Log.error(f"ZMQ::reaper : {_server_key} :: {e}")
+                    continue
+
+                if _reaped and Log.is_gte_log_level(Log.DEBUG):
+                    Log.debug(f"ZMQ::reaper : {_server_key} :: reaped {_reaped} idle workers")
+
+    def get_available_worker(self, server_key, timeout=None):
+        """Take a worker for ``server_key``, growing the pool if allowed.
+
+        Waits at most ``timeout`` seconds (``worker_timeout`` from the
+        ``zmq_workers`` config when not given) for a busy worker to be freed.
+        """
+        if timeout is None and self._worker_timeout is not None:
+            timeout = float(self._worker_timeout)
+
+        try:
+            _worker_id = self._pools[server_key].acquire(timeout=timeout)
+        except ZMQTimeoutException:
+            WORKER_WAIT_TIMEOUTS.labels(server_key).inc()
+            raise
+
+        WORKERS_IN_USE.labels(server_key).inc()
+
+        return _worker_id
+
+    def add_worker(self, server_key, worker_id=None):
+        if worker_id is None:
+            worker_id = f"zmqc-poller-{server_key}-{next(self._worker_ids)}"
 
-    def add_worker(self, server_key, worker_id):
         with self._lock:
-            self._workers[worker_id] = {"poller": zmq.Poller(), "socket": None}
+            self._workers[worker_id] = {
+                "server_key": server_key,
+                "poller": zmq.Poller(),
+                "socket": None,
+            }
+
+        return worker_id
+
+    def remove_worker(self, worker_id):
+        self.close_and_unregister_socket(worker_id)
+
+        with self._lock:
+            self._workers.pop(worker_id, None)
+            self._stale_workers.discard(worker_id)
+
+    def stats(self, server_key=None):
+        """Pool metrics (size, idle, in_use, waiters, ...) per server_key."""
+        if server_key is not None:
+            return self._pools[server_key].stats()
 
-        self.free_worker(server_key, worker_id)
+        return {_key: _pool.stats() for _key, _pool in self._pools.items()}
 
     def get_or_create_socket(self, server_key, worker_id):
         with self._lock:
@@ -155,204 +282,271 @@ class ZMQ(Singleton):
                 _worker["socket"] = None
 
     def free_worker(self, server_key, worker_id, close_socket=False):
-        if close_socket:
-            self.close_and_unregister_socket(worker_id)
+        if worker_id in self._stale_workers:
+            self.remove_worker(worker_id)
+        else:
+            if close_socket:
+                self.close_and_unregister_socket(worker_id)
+
+            self._pools[server_key].release(worker_id)
+
+        WORKERS_IN_USE.labels(server_key).dec()
+
+    def send_and_recv_future(self, server_key, message, deadline=None, raw=False):
+        # The worker thread records its trace span under the caller's one
+        return self._executor.submit(
+            contextvars.copy_context().run,
+            self.send_and_recv,
+            server_key,
+            message,
+            deadline=deadline,
+            raw=raw,
+        )
 
-        self._available_workers[server_key].put(worker_id)
+    def send_and_recv(self, server_key, message, deadline=None, raw=False):
+        """Send ``message`` to ``server_key`` and return the decoded reply.
 
-    def remove_header(self, response, header):
-        if "headers" in response and header in response["headers"]:
-            response["headers"].pop(header, None)
+        ``deadline`` (absolute epoch seconds) caps the wait for a worker, the
+        polling and the retries; :class:`ZMQTimeoutException` is raised once
+        it passes.
 
-    def remove_keys(self, response, keys):
-        for _key in keys:
-            response.pop(_key, None)
+        Requests to ``cached_routes`` are coalesced: concurrent callers
+        missing the cache for the same request share one backend call.
 
-    def send_and_recv_future(self, server_key, message):
-        return self._executor.submit(self.send_and_recv, server_key, message)
+        With ``raw`` the reply is returned undecoded as a
+        :class:`~envoxy.zeromq.passthrough.RawReply`, except for cached
+        routes which always return the decoded dict.
+        """
+        _cached_route = self.get_cached_route(server_key, message)
+
+        if not _cached_route:
+            return self._send_and_recv(server_key, message, deadline=deadline, raw=raw)
 
-    def send_and_recv(self, server_key, message):
         if Log.is_gte_log_level(Log.DEBUG):
             _start = time.time()
 
-        _response = None
-        _instance = self._instances[server_key]
+        _cached_response, _is_stale = self.lookup_cached_response(
+            message, _cached_route
+        )
 
-        _is_in_cached_routes = None
+        _flight_key = self.flight_key(server_key, message)
+
+        if _cached_response:
+            if _is_stale and not self._flights.in_flight(_flight_key):
+                # Serve the stale entry, refresh it in the background
+                self._executor.submit(
+                    self._flights.do,
+                    _flight_key,
+                    self._fetch_and_cache,
+                    server_key,
+                    message,
+                    _cached_route,
+                )
 
-        if self._cache:
-            _cached_routes = _instance["conf"].get("cached_routes")
+            if Log.is_gte_log_level(Log.DEBUG):
+                _duration = time.time() - _start
 
-            if _cached_routes:
-                _message_headers = message.get("headers", {})
+                Log.debug(
+                    f">>> ZMQ::send_and_recv::time:: {self._instances[server_key]['url']} :: {_duration} :: {message} "
+                )
 
-                if (
-                    "X-No-Cache" not in _message_headers.keys()
-                    or _message_headers.get("X-No-Cache") is False
-                ):
-                    _performative = message["performative"]
-                    _resource = message["resource"]
-                    _params = message.get("params")
+            return _cached_response
 
-                    _cached_key = (
-                        f"{_performative}:{'/'.join(_resource.split('/')[:4])}"
-                    )
+        try:
+            return self._flights.do(
+                _flight_key,
+                self._fetch_and_cache,
+                server_key,
+                message,
+                _cached_route,
+                deadline,
+                timeout=remaining(deadline),
+            )
+        except TimeoutError as e:
+            raise ZMQTimeoutException(
+                f"ZMQ::send_and_recv : Deadline exceeded waiting for the in-flight request to {self._instances[server_key]['url']}"
+            ) from e
 
-                    _is_in_cached_routes = _cached_routes.get(_cached_key)
+    def _fetch_and_cache(self, server_key, message, cached_route, deadline=None):
+        _response = self._send_and_recv(server_key, message, deadline=deadline)
 
-                    if _is_in_cached_routes:
-                        _cached_response = self._cache.get(
-                            _resource, _performative, _params
-                        )
+        self.set_cached_response(message, cached_route, _response)
 
-                        if _cached_response:
-                            if Log.is_gte_log_level(Log.DEBUG):
-                                Log.debug(
-                                    f">>> ZMQ::cache::get::cached: {_resource} :: {_performative} :: {_params}"
-                                )
+        return _response
 
-                                _duration = time.time() - _start
+    def _send_and_recv(self, server_key, message, deadline=None, raw=False):
+        _start = time.perf_counter()
+        _span = self.start_span(server_key, message)
 
-                                Log.debug(
-                                    f">>> ZMQ::send_and_recv::time:: {_instance['url']} :: {_duration} :: {message} "
-                                )
+        try:
+            _response = self._send_and_recv_attempts(
+                server_key, message, deadline=deadline, raw=raw
+            )
+        except Exception as e:
+            self.observe_request(server_key, _start, e, span=_span)
+            raise
 
-                            return _cached_response
+        self.observe_request(server_key, _start, span=_span)
 
-        try:
-            while True:
-                _worker_id = self.get_available_worker(server_key)
+        return _response
 
-                with self._lock:
-                    _worker = self._workers[_worker_id]
+    def _send_and_recv_attempts(self, server_key, message, deadline=None, raw=False):
+        if Log.is_gte_log_level(Log.DEBUG):
+            _start = time.time()
 
-                _socket = self.get_or_create_socket(server_key, _worker_id)
+        _instance = self._instances[server_key]
 
-                try:
-                    # Attempt serialization separately to catch errors early and prevent infinite recursion
-                    serialized_message = envoxy_json_dumps(message)
-                except (TypeError, OverflowError) as e:
-                    Log.error(
-                        f"ZMQ::send_and_recv : Message serialization failed for {_instance['url']}. "
-                        f"Error: {e}. This usually indicates data type issues (e.g., integers exceeding 64-bit range)."
-                    )
-                    # Don't retry - this is a data problem, not a connection problem
-                    raise ValueError(f"Cannot serialize message: {e}") from e
+        try:
+            # Serialize once, before taking a worker: a data problem is not
+            # worth retrying
+            _frames = self.encode_message(server_key, message)
+        except (TypeError, OverflowError) as e:
+            Log.error(
+                f"ZMQ::send_and_recv : Message serialization failed for {_instance['url']}. "
+                f"Error: {e}. This usually indicates data type issues (e.g., integers exceeding 64-bit range)."
+            )
+            raise ValueError(f"Cannot serialize message: {e}") from e
 
-                _socket.send_multipart([b"", serialized_message])
+        _breaker = _instance["circuit_breaker"]
+        _retry = _instance["retry_policy"].start(deadline=remaining(deadline))
 
-                try:
-                    _poller_attempt = 0
+        while True:
+            if deadline is not None and remaining(deadline) <= 0:
+                raise ZMQTimeoutException(
+                    f"ZMQ::send_and_recv : Deadline exceeded before sending to {_instance['url']}"
+                )
 
-                    while True:
-                        _socks = dict(_worker["poller"].poll(ZEROMQ_POLLIN_TIMEOUT))
+            # Fail fast instead of holding a worker on a backend known to be down
+            _breaker.check()
 
-                        if not _socks:
-                            _poller_attempt += 1
+            try:
+                _worker_id = self.get_available_worker(
+                    server_key, timeout=remaining(deadline)
+                )
+            except BaseException:
+                # nothing reached the backend
+                _breaker.record(None)
+                raise
 
-                            if _poller_attempt <= ZEROMQ_POLLER_RETRIES:
-                                continue
-                            else:
-                                raise NoSocketException(
-                                    f"No events received in {(ZEROMQ_POLLIN_TIMEOUT / 1000) * ZEROMQ_POLLER_RETRIES} secs on {_instance['url']}"
-                                )
+            _succeeded = None
 
-                        if _socks.get(_socket) == zmq.POLLIN:
-                            _recv = _socket.recv_multipart()
+            try:
+                _response = self._send_and_recv_with_worker(
+                    server_key, _worker_id, _frames, deadline=deadline, raw=raw
+                )
+                _succeeded = True
+
+            except ZMQTimeoutException:
+                _succeeded = False
+                # The caller ran out of time; the REQ socket is left waiting
+                # for a reply so it cannot be reused.
+                self.free_worker(server_key, _worker_id, close_socket=True)
+                raise
+
+            except NoSocketException as e:
+                _succeeded = False
+                Log.warning(
+                    f'ZMQ::send_and_recv : It is not possible to send message using the ZMQ server "{_instance["url"]}". Error: {e}'
+                )
+                _error = e
 
-                            self.free_worker(server_key, _worker_id)
+            except IOError as e:
+                _succeeded = False
+                Log.error(
+                    f"ZMQ::send_and_recv : Could not connect to ZeroMQ machine: {_instance['url']}"
+                )
+                _error = e
 
-                            _recv.pop(0)  # discard delimiter
-                            _response = envoxy_json_loads(
-                                _recv.pop(0)
-                            )  # actual message
+            except Exception as e:
+                _succeeded = False
+                Log.warning(
+                    f'ZMQ::send_and_recv : Unexpected error. It is not possible to send message using the ZMQ server "{_instance["url"]}". Error: {e}'
+                )
+                _error = e
 
-                            self.remove_header(_response, "X-Cid")
+            finally:
+                _breaker.record(_succeeded)
 
-                            self.remove_keys(_response, ["protocol", "performative"])
+            if _succeeded:
+                if Log.is_gte_log_level(Log.DEBUG):
+                    _duration = time.time() - _start
 
-                            if self._cache and _is_in_cached_routes:
-                                _performative = message["performative"]
-                                _resource = message["resource"]
-                                _params = message.get("params")
+                    Log.debug(
+                        f">>> ZMQ::send_and_recv::time:: {_instance['url']} :: {_duration} :: {message} "
+                    )
 
-                                try:
-                                    _status_code = int(_response.get("status", 0))
+                return _response
 
-                                    if _status_code >= 200 and _status_code < 300:
-                                        _ttl = int(
-                                            _is_in_cached_routes.get("ttl", 3600)
-                                        )
+            self.free_worker(server_key, _worker_id, close_socket=True)
 
-                                    else:
-                                        _ttl = int(
-                                            _is_in_cached_routes.get("error_ttl", 60)
-                                        )
+            _delay = _retry.next_delay()
 
-                                        if Log.is_gte_log_level(Log.ERROR):
-                                            Log.error(
-                                                f"ZMQ::cache::set::Error: "
-                                                f"(state_code: {_status_code}, this cached entry will expire in {_ttl} seconds) "
-                                                f"{_resource} :: {_performative} :: {_params}"
-                                            )
+            if _delay is None:
+                raise ZMQException(
+                    f'ZMQ::send_and_recv : Giving up on ZMQ server "{_instance["url"]}" '
+                    f"after {_retry.attempts} attempts in {_retry.elapsed():.2f} secs. Error: {_error}"
+                ) from _error
 
-                                    self._cache.set(
-                                        _resource,
-                                        _performative,
-                                        _params,
-                                        _response,
-                                        _ttl,
-                                    )
+            time.sleep(_delay)
 
-                                    if Log.is_gte_log_level(Log.DEBUG):
-                                        Log.debug(
-                                            f">>> ZMQ::cache::set: {_resource} :: {_performative} :: {_params}"
-                                        )
+    def _send_and_recv_with_worker(
+        self, server_key, worker_id, frames, deadline=None, raw=False
+    ):
+        """Single request/reply exchange on ``worker_id``.
 
-                                except Exception as e:
-                                    Log.error(f"ZMQ::cache::set::Error: {e}")
+        The worker is freed on success; on error the caller frees it and
+        closes its socket.
+        """
+        _instance = self._instances[server_key]
 
-                            if Log.is_gte_log_level(Log.DEBUG):
-                                _duration = time.time() - _start
+        with self._lock:
+            _worker = self._workers[worker_id]
 
-                                Log.debug(
-                                    f">>> ZMQ::send_and_recv::time:: {_instance['url']} :: {_duration} :: {message} "
-                                )
+        _socket = self.get_or_create_socket(server_key, worker_id)
 
-                            return _response
+        _socket.send_multipart([b"", *frames], copy=False)
 
-                except IOError:
-                    Log.error(
-                        f"ZMQ::send_and_recv : Could not connect to ZeroMQ machine: {_instance['url']}"
-                    )
+        _poller_attempt = 0
 
-                    self.free_worker(server_key, _worker_id, close_socket=True)
+        while True:
+            _poll_timeout = ZEROMQ_POLLIN_TIMEOUT
 
-                    time.sleep(ZEROMQ_RETRY_TIMEOUT)
+            if deadline is not None:
+                _remaining_ms = remaining(deadline) * 1000
 
-                    return self.send_and_recv(server_key, message)
+                if _remaining_ms <= 0:
+                    raise ZMQTimeoutException(
+                        f"Deadline exceeded waiting for a reply from {_instance['url']}"
+                    )
 
-        except NoSocketException as e:
-            Log.warning(
-                f'ZMQ::send_and_recv : It is not possible to send message using the ZMQ server "{_instance["url"]}". Error: {e}'
-            )
+                _poll_timeout = min(_poll_timeout, int(_remaining_ms) + 1)
 
-            self.free_worker(server_key, _worker_id, close_socket=True)
+            _socks = dict(_worker["poller"].poll(_poll_timeout))
 
-            time.sleep(ZEROMQ_RETRY_TIMEOUT)
+            if not _socks:
+                _poller_attempt += 1
 
-            return self.send_and_recv(server_key, message)
+                if _poller_attempt <= ZEROMQ_POLLER_RETRIES:
+                    continue
+                else:
+                    raise NoSocketException(
+                        f"No events received in {(ZEROMQ_POLLIN_TIMEOUT / 1000) * ZEROMQ_POLLER_RETRIES} secs on {_instance['url']}"
+                    )
 
-        except Exception as e:
-            Log.warning(
-                f'ZMQ::send_and_recv : Unexpected error. It is not possible to send message using the ZMQ server "{_instance["url"]}". Error: {e}'
-            )
+            if _socks.get(_socket) == zmq.POLLIN:
+                # zero_copy keeps large replies in the frame buffers
+                _recv = _socket.recv_multipart(
+                    copy=not _instance["conf"].get("zero_copy", False)
+                )
 
-            self.free_worker(server_key, _worker_id, close_socket=True)
+                if raw:
+                    _response = self.raw_response(_recv)
+                else:
+                    _response = self.clean_response(self.decode_response(_recv))
 
-            time.sleep(ZEROMQ_RETRY_TIMEOUT)
+                self.free_worker(server_key, worker_id)
 
-            return self.send_and_recv(server_key, message)
+                return _response
 
 
 class Dispatcher:
@@ -381,6 +575,11 @@ class Dispatcher:
         else:
             _headers["X-Cid"] = str(uuid.uuid4())
 
+        _span = current_span()
+
+        if _span is not None:
+            _headers[TRACEPARENT_HEADER] = _span.traceparent
+
         return _headers
 
     @staticmethod
@@ -400,8 +599,39 @@ class Dispatcher:
             raise
 
     @staticmethod
-    def bulk_requests(request_list):
-        _loop = Dispatcher._get_or_create_eventloop()
+    def build_message(
+        performative,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        deadline=None,
+        attachments=None,
+    ):
+        _message = {
+            "resource": url,
+            "headers": Dispatcher.generate_headers(),
+            "params": params,
+            "payload": payload,
+            "performative": performative,
+        }
+
+        if attachments:
+            # raw frames sent after the body, see envoxy.zeromq.codecs
+            _message["attachments"] = list(attachments)
+
+        if headers:
+            _message["headers"].update(dict(headers))
+
+        if deadline is not None:
+            # lets the backend drop work nobody is waiting for anymore
+            _message["headers"][ZEROMQ_DEADLINE_HEADER] = to_header(deadline)
+
+        return _message
+
+    @staticmethod
+    def _build_bulk_messages(request_list, timeout=None, deadline=None):
+        _deadline = resolve_deadline(timeout, deadline)
 
         _requests = []
 
@@ -415,141 +645,506 @@ class Dispatcher:
             assertz_mandatory(_request, "url")
             assertz_uri(_request, "url")
 
-            _message = {
-                "performative": _request["performative"],
-                "resource": _request["url"],
-                "headers": Dispatcher.generate_headers(),
-                "params": _request.get("params"),
-                "payload": _request.get("payload"),
-            }
+            _request_deadline = resolve_deadline(_request.get("timeout"), _deadline)
+
+            _message = Dispatcher.build_message(
+                _request["performative"],
+                _request["url"],
+                params=_request.get("params"),
+                payload=_request.get("payload"),
+                headers=_request.get("headers"),
+                deadline=_request_deadline,
+                attachments=_request.get("attachments"),
+            )
 
-            if "headers" in _request and _request.get("headers"):
-                _message["headers"].update(dict(_request["headers"]))
+            _requests.append((_request["server_key"], _message, _request_deadline))
 
-            _requests.append((_request["server_key"], _message))
+        return _requests
 
-        if _requests:
-            _executor = ZMQ.instance()._executor
-            _func = ZMQ.instance().send_and_recv
+    @staticmethod
+    async def astream_requests(
+        request_list, timeout=None, deadline=None, concurrency=None
+    ):
+        """Send all requests and yield ``(index, reply)`` as replies arrive.
+
+        Requests are pipelined over the asyncio client, grouped by
+        ``server_key`` so each server's requests go out back-to-back on its
+        multiplexed DEALER sockets. ``concurrency`` caps the requests in
+        flight. A failed request yields its exception instead of a reply, so
+        one failure does not cancel the rest of the batch.
+        """
+        _requests = Dispatcher._build_bulk_messages(request_list, timeout, deadline)
+
+        if not _requests:
+            return
+
+        _zmq = AsyncZMQ.instance()
+        _semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+        async def _send(index, server_key, message, request_deadline):
+            try:
+                if _semaphore is None:
+                    return index, await _zmq.send_and_recv(
+                        server_key, message, deadline=request_deadline
+                    )
 
-            _futures = [
-                _loop.run_in_executor(_executor, _func, _server_key, _message)
-                for _server_key, _message in _requests
-            ]
+                async with _semaphore:
+                    return index, await _zmq.send_and_recv(
+                        server_key, message, deadline=request_deadline
+                    )
+            except Exception as e:
+                return index, e
 
-            return (
-                _loop.run_until_complete(asyncio.gather(*_futures)) if _futures else []
+        _tasks = [
+            asyncio.ensure_future(_send(_index, *_request))
+            for _index, _request in sorted(
+                enumerate(_requests), key=lambda _item: _item[1][0]
             )
+        ]
 
-        return []
+        try:
+            for _next in asyncio.as_completed(_tasks):
+                yield await _next
+        finally:
+            for _task in _tasks:
+                _task.cancel()
 
     @staticmethod
-    def get(server_key, url, params=None, payload=None, headers=None, future=False):
-        _message = {
-            "resource": url,
-            "headers": Dispatcher.generate_headers(),
-            "params": params,
-            "payload": payload,
-            "performative": Performative.GET,
-        }
+    async def abulk_requests(
+        request_list,
+        timeout=None,
+        deadline=None,
+        concurrency=None,
+        callback=None,
+        return_exceptions=False,
+    ):
+        """Send all requests and return the replies in ``request_list`` order.
+
+        ``callback(index, reply)`` is called as each reply arrives. The first
+        failure is raised unless ``return_exceptions`` is set, in which case
+        failed items hold their exception.
+        """
+        _responses = [None] * len(request_list)
+
+        async with contextlib.aclosing(
+            Dispatcher.astream_requests(
+                request_list, timeout=timeout, deadline=deadline, concurrency=concurrency
+            )
+        ) as _stream:
+            async for _index, _response in _stream:
+                if isinstance(_response, Exception) and not return_exceptions:
+                    raise _response
 
-        if headers:
-            _message["headers"].update(dict(headers))
+                _responses[_index] = _response
 
-        if not future:
-            return ZMQ.instance().send_and_recv(server_key, _message)
-        else:
-            return ZMQ.instance().send_and_recv_future(server_key, _message)
+                if callback is not None:
+                    callback(_index, _response)
+
+        return _responses
 
     @staticmethod
-    def post(server_key, url, params=None, payload=None, headers=None, future=False):
-        _message = {
-            "resource": url,
-            "headers": Dispatcher.generate_headers(),
-            "params": params,
-            "payload": payload,
-            "performative": Performative.POST,
-        }
+    def bulk_requests(
+        request_list,
+        timeout=None,
+        deadline=None,
+        concurrency=None,
+        callback=None,
+        return_exceptions=False,
+    ):
+        """Send all requests concurrently and return the replies in order.
+
+        ``timeout``/``deadline`` bound the whole batch; an item may also
+        carry its own ``timeout`` (seconds), the earliest deadline wins. See
+        :meth:`abulk_requests` for ``concurrency``, ``callback`` and
+        ``return_exceptions``.
+        """
+        if not request_list:
+            return []
 
-        if headers:
-            _message["headers"].update(dict(headers))
+        _loop = Dispatcher._get_or_create_eventloop()
+
+        return _loop.run_until_complete(
+            Dispatcher.abulk_requests(
+                request_list,
+                timeout=timeout,
+                deadline=deadline,
+                concurrency=concurrency,
+                callback=callback,
+                return_exceptions=return_exceptions,
+            )
+        )
+
+    @staticmethod
+    def request(
+        server_key,
+        performative,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        future=False,
+        timeout=None,
+        deadline=None,
+        attachments=None,
+        raw=False,
+    ):
+        """Send a request and wait for its reply (or a future with ``future=True``).
+
+        ``timeout`` (seconds from now) and ``deadline`` (epoch seconds) cap the
+        whole call and are sent to the backend in the ``X-Deadline`` header.
+        ``attachments`` are raw ``bytes`` parts sent after the encoded message.
+        ``raw`` returns the reply undecoded, see :meth:`ZMQ.send_and_recv`.
+        """
+        _deadline = resolve_deadline(timeout, deadline)
+
+        _message = Dispatcher.build_message(
+            performative,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            deadline=_deadline,
+            attachments=attachments,
+        )
 
         if not future:
-            return ZMQ.instance().send_and_recv(server_key, _message)
+            return ZMQ.instance().send_and_recv(
+                server_key, _message, deadline=_deadline, raw=raw
+            )
         else:
-            return ZMQ.instance().send_and_recv_future(server_key, _message)
+            return ZMQ.instance().send_and_recv_future(
+                server_key, _message, deadline=_deadline, raw=raw
+            )
 
     @staticmethod
-    def put(server_key, url, params=None, payload=None, headers=None, future=False):
-        _message = {
-            "resource": url,
-            "headers": Dispatcher.generate_headers(),
-            "params": params,
-            "payload": payload,
-            "performative": Performative.PUT,
-        }
+    def proxy(
+        server_key,
+        performative,
+        url,
+        body=None,
+        params=None,
+        headers=None,
+        timeout=None,
+        deadline=None,
+    ):
+        """Forward a raw JSON ``body`` and return the undecoded
+        :class:`~envoxy.zeromq.passthrough.RawReply`.
+
+        For JSON servers the body is spliced into the envelope as is instead
+        of being decoded and encoded again.
+
+        :raises ValueError: ``body`` is not valid JSON.
+        """
+        _deadline = resolve_deadline(timeout, deadline)
+
+        _message = Dispatcher.build_message(
+            performative,
+            url,
+            params=params,
+            headers=headers,
+            deadline=_deadline,
+        )
 
-        if headers:
-            _message["headers"].update(dict(headers))
+        _zmq = ZMQ.instance()
 
-        if not future:
-            return ZMQ.instance().send_and_recv(server_key, _message)
+        if _zmq._instances[server_key]["codec"].name == JSONCodec.name:
+            _message = splice_message(_message, body)
         else:
-            return ZMQ.instance().send_and_recv_future(server_key, _message)
+            _message["payload"] = envoxy_json_loads(body) if body else None
+
+        return _zmq.send_and_recv(server_key, _message, deadline=_deadline, raw=True)
 
     @staticmethod
-    def patch(server_key, url, params=None, payload=None, headers=None, future=False):
-        _message = {
-            "resource": url,
-            "headers": Dispatcher.generate_headers(),
-            "params": params,
-            "payload": payload,
-            "performative": Performative.PATCH,
-        }
+    async def arequest(
+        server_key,
+        performative,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        timeout=None,
+        deadline=None,
+        attachments=None,
+    ):
+        _deadline = resolve_deadline(timeout, deadline)
+
+        _message = Dispatcher.build_message(
+            performative,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            deadline=_deadline,
+            attachments=attachments,
+        )
 
-        if headers:
-            _message["headers"].update(dict(headers))
+        return await AsyncZMQ.instance().send_and_recv(
+            server_key, _message, deadline=_deadline
+        )
 
-        if not future:
-            return ZMQ.instance().send_and_recv(server_key, _message)
-        else:
-            return ZMQ.instance().send_and_recv_future(server_key, _message)
+    @staticmethod
+    def get(
+        server_key,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        future=False,
+        timeout=None,
+        deadline=None,
+    ):
+        return Dispatcher.request(
+            server_key,
+            Performative.GET,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            future=future,
+            timeout=timeout,
+            deadline=deadline,
+        )
 
     @staticmethod
-    def delete(server_key, url, params=None, payload=None, headers=None, future=False):
-        _message = {
-            "resource": url,
-            "headers": Dispatcher.generate_headers(),
-            "params": params,
-            "payload": payload,
-            "performative": Performative.DELETE,
-        }
+    def post(
+        server_key,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        future=False,
+        timeout=None,
+        deadline=None,
+    ):
+        return Dispatcher.request(
+            server_key,
+            Performative.POST,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            future=future,
+            timeout=timeout,
+            deadline=deadline,
+        )
 
-        if headers:
-            _message["headers"].update(dict(headers))
+    @staticmethod
+    def put(
+        server_key,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        future=False,
+        timeout=None,
+        deadline=None,
+    ):
+        return Dispatcher.request(
+            server_key,
+            Performative.PUT,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            future=future,
+            timeout=timeout,
+            deadline=deadline,
+        )
 
-        if not future:
-            return ZMQ.instance().send_and_recv(server_key, _message)
-        else:
-            return ZMQ.instance().send_and_recv_future(server_key, _message)
+    @staticmethod
+    def patch(
+        server_key,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        future=False,
+        timeout=None,
+        deadline=None,
+    ):
+        return Dispatcher.request(
+            server_key,
+            Performative.PATCH,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            future=future,
+            timeout=timeout,
+            deadline=deadline,
+        )
 
     @staticmethod
-    def head(server_key, url, params=None, payload=None, headers=None, future=False):
-        _message = {
-            "resource": url,
-            "headers": Dispatcher.generate_headers(),
-            "params": params,
-            "payload": payload,
-            "performative": Performative.HEAD,
-        }
+    def delete(
+        server_key,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        future=False,
+        timeout=None,
+        deadline=None,
+    ):
+        return Dispatcher.request(
+            server_key,
+            Performative.DELETE,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            future=future,
+            timeout=timeout,
+            deadline=deadline,
+        )
 
-        if headers:
-            _message["headers"].update(dict(headers))
+    @staticmethod
+    def head(
+        server_key,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        future=False,
+        timeout=None,
+        deadline=None,
+    ):
+        return Dispatcher.request(
+            server_key,
+            Performative.HEAD,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            future=future,
+            timeout=timeout,
+            deadline=deadline,
+        )
 
-        if not future:
-            return ZMQ.instance().send_and_recv(server_key, _message)
-        else:
-            return ZMQ.instance().send_and_recv_future(server_key, _message)
+    @staticmethod
+    async def aget(
+        server_key,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        timeout=None,
+        deadline=None,
+    ):
+        return await Dispatcher.arequest(
+            server_key,
+            Performative.GET,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            timeout=timeout,
+            deadline=deadline,
+        )
+
+    @staticmethod
+    async def apost(
+        server_key,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        timeout=None,
+        deadline=None,
+    ):
+        return await Dispatcher.arequest(
+            server_key,
+            Performative.POST,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            timeout=timeout,
+            deadline=deadline,
+        )
+
+    @staticmethod
+    async def aput(
+        server_key,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        timeout=None,
+        deadline=None,
+    ):
+        return await Dispatcher.arequest(
+            server_key,
+            Performative.PUT,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            timeout=timeout,
+            deadline=deadline,
+        )
+
+    @staticmethod
+    async def apatch(
+        server_key,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        timeout=None,
+        deadline=None,
+    ):
+        return await Dispatcher.arequest(
+            server_key,
+            Performative.PATCH,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            timeout=timeout,
+            deadline=deadline,
+        )
+
+    @staticmethod
+    async def adelete(
+        server_key,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        timeout=None,
+        deadline=None,
+    ):
+        return await Dispatcher.arequest(
+            server_key,
+            Performative.DELETE,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            timeout=timeout,
+            deadline=deadline,
+        )
+
+    @staticmethod
+    async def ahead(
+        server_key,
+        url,
+        params=None,
+        payload=None,
+        headers=None,
+        timeout=None,
+        deadline=None,
+    ):
+        return await Dispatcher.arequest(
+            server_key,
+            Performative.HEAD,
+            url,
+            params=params,
+            payload=payload,
+            headers=headers,
+            timeout=timeout,
+            deadline=deadline,
+        )
 
     @staticmethod
     def validate_response(response):
@@ -0,0 +1,10 @@
+class NoSocketException(Exception):
+    pass
+
+
+class ZMQException(Exception):
+    pass
+
+
+class ZMQTimeoutException(ZMQException):
+    pass
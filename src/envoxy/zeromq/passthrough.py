@@ -0,0 +1,223 @@
+"""Raw ZMQ messages for proxying HTTP requests to a backend and back.
+
+Requests: :func:`splice_message` builds the JSON envelope from a pre-encoded
+template, splicing the raw HTTP body in as ``payload`` instead of decoding
+and re-encoding it.
+
+Replies: a :class:`RawReply` keeps the reply frames as received (zero-copy
+with the ``zero_copy`` server option) and only decodes the envelope for its
+status and headers. When the envelope is JSON and ``payload`` is its last
+member, the HTTP body is sliced straight out of the reply bytes instead of
+being serialized again.
+"""
+
+import re
+
+from ..utils.encoders import envoxy_json_dumps, envoxy_json_loads
+from .codecs import MARKERS, JSONCodec
+
+_ENVELOPE = (
+    b'{"resource":%b,"headers":%b,"params":%b,"performative":%d,"payload":%b}'
+)
+
+# One JSON token: a string, a structural character or a scalar
+_TOKEN = re.compile(rb'\s*("(?:[^"\\]|\\.)*"|[{}\[\],:]|[^\s"{}\[\],:]+)')
+_PAYLOAD_KEY = b'"payload"'
+_WHITESPACE = b" \t\r\n"
+_OPENERS = (b"{", b"[")
+_CLOSERS = (b"}", b"]")
+
+
+class EncodedMessage(dict):
+    """Message fields plus its already encoded wire ``frames``."""
+
+    def __init__(self, frames, fields):
+        super().__init__(fields)
+        self.frames = frames
+
+
+def splice_message(message, body):
+    """Encode ``message`` (its payload is ignored) with the raw JSON ``body``
+    as payload.
+
+    The body is still validated, otherwise a crafted body could add members
+    to the envelope, but it is never re-encoded.
+
+    :raises ValueError: ``body`` is not a single JSON value.
+    """
+    if body:
+        envoxy_json_loads(body)
+    else:
+        body = b"null"
+
+    _fields = {_k: _v for _k, _v in message.items() if _k != "payload"}
+
+    _frame = _ENVELOPE % (
+        envoxy_json_dumps(message["resource"]),
+        envoxy_json_dumps(message["headers"]),
+        envoxy_json_dumps(message.get("params")),
+        int(message["performative"]),
+        body,
+    )
+
+    return EncodedMessage([_frame], _fields)
+
+
+def _skip_value(buffer, pos):
+    """Return the position right after the JSON value starting at ``pos``."""
+    _depth = 0
+
+    while True:
+        _match = _TOKEN.match(buffer, pos)
+
+        if _match is None:
+            raise ValueError("Truncated JSON value")
+
+        _token = _match.group(1)
+        pos = _match.end()
+
+        if _token in _OPENERS:
+            _depth += 1
+        elif _token in _CLOSERS:
+            _depth -= 1
+
+        if _depth == 0:
+            return pos
+
+
+def payload_span(buffer):
+    """Return ``(start, end)`` of the top-level ``payload`` value of a JSON
+    envelope, or ``None`` when there is none.
+
+    The payload must be the envelope's last member, which is not verified
+    here: only the members before ``payload`` are tokenized since they are
+    small (status, headers) compared to the payload itself. Check the member
+    order on the decoded envelope first.
+    """
+    _match = _TOKEN.match(buffer, 0)
+
+    if _match is None or _match.group(1) != b"{":
+        return None
+
+    _pos = _match.end()
+
+    while True:
+        _match = _TOKEN.match(buffer, _pos)
+
+        if _match is None:
+            return None
+
+        _token = _match.group(1)
+
+        if _token == b",":
+            _pos = _match.end()
+            continue
+
+        if _token == b"}" or not _token.startswith(b'"'):
+            return None
+
+        _colon = _TOKEN.match(buffer, _match.end())
+
+        if _colon is None or _colon.group(1) != b":":
+            return None
+
+        _value = _TOKEN.match(buffer, _colon.end())
+
+        if _value is None:
+            return None
+
+        _start = _value.start(1)
+
+        if _token == _PAYLOAD_KEY:
+            break
+
+        _pos = _skip_value(buffer, _start)
+
+    # payload is the last member: it ends right before the closing brace
+    _end = len(buffer)
+
+    while _end and buffer[_end - 1] in _WHITESPACE:
+        _end -= 1
+
+    if not _end or buffer[_end - 1] != ord("}"):
+        return None
+
+    _end -= 1
+
+    while _end > _start and buffer[_end - 1] in _WHITESPACE:
+        _end -= 1
+
+    return _start, _end
+
+
+class RawReply:
+    """Undecoded reply of a ZMQ backend.
+
+    :param frames: reply frames, delimiters stripped; ``bytes`` or
+        ``memoryview`` parts.
+    :param decode: callable decoding ``frames`` into the envelope dict.
+    """
+
+    def __init__(self, frames, decode):
+        self.frames = frames
+        self._decode = decode
+        self._envelope = None
+
+    @property
+    def envelope(self):
+        if self._envelope is None:
+            self._envelope = self._decode(self.frames)
+
+        return self._envelope
+
+    @property
+    def status(self):
+        return self.envelope.get("status")
+
+    @property
+    def headers(self):
+        _headers = dict(self.envelope.get("headers") or {})
+        _headers.pop("X-Cid", None)
+
+        return _headers
+
+    @property
+    def cookies(self):
+        return self.envelope.get("cookies") or []
+
+    def _json_body(self):
+        """The JSON envelope bytes, or ``None`` for other codecs."""
+        if len(self.frames) == 1:
+            return self.frames[0]
+
+        if MARKERS.get(bytes(self.frames[0])) == JSONCodec.name and len(self.frames) == 2:
+            return self.frames[1]
+
+        return None
+
+    def body(self):
+        """HTTP body as :class:`envoxy.Response` would render the payload."""
+        _payload = self.envelope.get("payload")
+
+        if not isinstance(_payload, (dict, list)):
+            return _payload
+
+        _buffer = self._json_body()
+        _span = None
+
+        # the decoded dict keeps the members order of the reply
+        if _buffer is not None and next(reversed(self.envelope), None) == "payload":
+            _span = payload_span(_buffer)
+
+        if _span is None:
+            if isinstance(_payload, list):
+                _payload = {"elements": _payload, "size": len(_payload)}
+
+            return envoxy_json_dumps(_payload)
+
+        _raw = bytes(memoryview(_buffer)[_span[0] : _span[1]])
+
+        if isinstance(_payload, list):
+            return b'{"elements":%s,"size":%d}' % (_raw, len(_payload))
+
+        return _raw
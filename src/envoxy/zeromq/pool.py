@@ -0,0 +1,155 @@
+"""Elastic pool of ZMQ workers for one server_key.
+
+Workers are created lazily up to ``max_workers`` when every existing one is
+busy, and workers idle for longer than ``idle_timeout`` seconds are reaped
+down to ``min_workers``. Idle workers are handed out LIFO so the hot ones
+keep being reused and the cold ones age out. Callers waiting for a worker
+give up after ``timeout`` seconds with :class:`ZMQTimeoutException` instead
+of blocking forever.
+
+The pool only manages worker ids: ``create`` returns a new id and
+``destroy`` releases whatever the id owns (poller, socket).
+"""
+
+import collections
+import threading
+import time
+
+from .exceptions import ZMQTimeoutException
+
+
+class WorkerPool:
+    def __init__(
+        self, server_key, create, destroy, min_workers, max_workers, idle_timeout
+    ):
+        self.server_key = server_key
+        self.min_workers = max(int(min_workers), 0)
+        self.max_workers = max(int(max_workers), 1, self.min_workers)
+        self.idle_timeout = float(idle_timeout) if idle_timeout else None
+
+        self._create = create
+        self._destroy = destroy
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = collections.deque()  # (worker_id, released_at), newest last
+        self._size = 0
+        self._waiters = 0
+
+        self.created = 0
+        self.reaped = 0
+        self.timeouts = 0
+
+        for _ in range(self.min_workers):
+            self._size += 1
+            self.created += 1
+            self._idle.append((self._create(), time.monotonic()))
+
+    def acquire(self, timeout=None):
+        """Return an idle worker id, creating one if the pool may grow.
+
+        :raises ZMQTimeoutException: no worker got free within ``timeout``.
+        """
+        _deadline = time.monotonic() + timeout if timeout is not None else None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()[0]
+
+                if self._size < self.max_workers:
+                    self._size += 1
+                    self.created += 1
+                    break
+
+                _wait = None
+
+                if _deadline is not None:
+                    _wait = _deadline - time.monotonic()
+
+                    if _wait <= 0:
+                        self.timeouts += 1
+
+                        raise ZMQTimeoutException(
+                            f"No ZMQ worker available for {self.server_key} in {timeout:.2f} secs "
+                            f"({self._size} busy, {self._waiters} waiting)"
+                        )
+
+                self._waiters += 1
+
+                try:
+                    self._cond.wait(_wait)
+                finally:
+                    self._waiters -= 1
+
+        # Create the worker outside the lock, socket setup can be slow
+        try:
+            return self._create()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, worker_id):
+        with self._cond:
+            self._idle.append((worker_id, time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, worker_id):
+        """Drop a worker that must not be reused."""
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+        self._destroy(worker_id)
+
+    def reap(self):
+        """Destroy workers idle for longer than ``idle_timeout``, keeping
+        ``min_workers``. Returns the number of reaped workers.
+        """
+        if self.idle_timeout is None:
+            return 0
+
+        _expired = []
+        _limit = time.monotonic() - self.idle_timeout
+
+        with self._cond:
+            # oldest releases sit at the left of the deque
+            while (
+                self._idle
+                and self._idle[0][1] < _limit
+                and self._size > self.min_workers
+            ):
+                _expired.append(self._idle.popleft()[0])
+                self._size -= 1
+
+            self.reaped += len(_expired)
+
+        for _worker_id in _expired:
+            self._destroy(_worker_id)
+
+        return len(_expired)
+
+    def stats(self):
+        with self._cond:
+            _idle = len(self._idle)
+
+            return {
+                "size": self._size,
+                "idle": _idle,
+                "in_use": self._size - _idle,
+                "waiters": self._waiters,
+                "min": self.min_workers,
+                "max": self.max_workers,
+                "created": self.created,
+                "reaped": self.reaped,
+                "timeouts": self.timeouts,
+            }
+
+    def close(self):
+        with self._cond:
+            _idle = [_worker_id for _worker_id, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(_idle)
+
+        for _worker_id in _idle:
+            self._destroy(_worker_id)
@@ -0,0 +1,184 @@
+import sys
+import time
+import types
+
+import pytest
+
+from envoxy.cache.memory import MemoryCache
+from envoxy.cache.tiered import TieredCache
+
+
+def test_memory_cache_returns_copies():
+    _cache = MemoryCache({})
+    _cache.set("/v3/items", "get", {}, {"items": [1]})
+
+    _value = _cache.get("/v3/items", "get", {})
+    _value["items"].append(2)
+
+    assert _cache.get("/v3/items", "get", {}) == {"items": [1]}
+
+
+def test_memory_cache_expires_entries():
+    _cache = MemoryCache({})
+    _cache.set("/v3/items", "get", {}, {"id": 1}, ttl=0.01)
+
+    time.sleep(0.02)
+
+    assert _cache.get("/v3/items", "get", {}) == {}
+
+
+def test_memory_cache_evicts_least_recently_used():
+    _cache = MemoryCache({"max_entries": 2})
+
+    _cache.set("/a", "get", {}, {"id": "a"})
+    _cache.set("/b", "get", {}, {"id": "b"})
+    _cache.get("/a", "get", {})
+    _cache.set("/c", "get", {}, {"id": "c"})
+
+    assert _cache.get("/b", "get", {}) == {}
+    assert _cache.get("/a", "get", {}) == {"id": "a"}
+    assert _cache.stats()["evictions"] == 1
+
+
+def test_memory_cache_respects_byte_budget():
+    _cache = MemoryCache({"max_bytes": 64})
+
+    _cache.set("/a", "get", {}, {"data": "x" * 40})
+    _cache.set("/b", "get", {}, {"data": "y" * 40})
+
+    assert _cache.stats()["entries"] == 1
+    assert _cache.stats()["bytes"] <= 64
+
+    # too large for the budget, the previous value must not linger
+    assert _cache.set("/b", "get", {}, {"data": "z" * 100}) is False
+    assert _cache.get("/b", "get", {}) == {}
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.published = []
+        self.pubsubs = []
+        self.gets = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value, ex)
+        return True
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        self.pubsubs.append(FakePubSub())
+        return self.pubsubs[-1]
+
+
+class FakePubSub:
+    def __init__(self):
+        self.handlers = {}
+
+    def subscribe(self, **handlers):
+        self.handlers.update(handlers)
+
+    def run_in_thread(self, sleep_time=0, daemon=False, exception_handler=None):
+        return object()
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def get(self, key):
+        self.commands.append(("get", key))
+
+    def ttl(self, key):
+        self.commands.append(("ttl", key))
+
+    def execute(self):
+        _results = []
+
+        for _command, _key in self.commands:
+            _value, _ttl = self.redis.data.get(_key, (None, -2))
+
+            if _command == "get":
+                self.redis.gets += 1
+                _results.append(_value)
+            else:
+                _results.append(_ttl)
+
+        return _results
+
+
+@pytest.fixture
+def tiered_cache():
+    _cache = TieredCache({"key_prefix": "test", "memory": {"ttl": 5}})
+    _cache.l2.r = FakeRedis()
+
+    return _cache
+
+
+def test_tiered_cache_serves_hot_keys_from_memory(tiered_cache):
+    tiered_cache.set("/v3/items", "get", {}, {"id": 1}, ttl=60)
+    tiered_cache.l1.clear()
+
+    assert tiered_cache.get("/v3/items", "get", {}) == {"id": 1}
+    assert tiered_cache.get("/v3/items", "get", {}) == {"id": 1}
+
+    assert tiered_cache.l2.r.gets == 1
+    assert tiered_cache.stats()["hits"] == 1
+
+
+def test_tiered_cache_reports_redis_ttl_from_memory(tiered_cache):
+    tiered_cache.set("/v3/items", "get", {}, {"id": 1}, ttl=60)
+
+    _value, _ttl = tiered_cache.get_with_ttl("/v3/items", "get", {})
+
+    assert _value == {"id": 1}
+    assert 58 <= _ttl <= 60
+    assert tiered_cache.l2.r.gets == 0
+
+
+def test_tiered_cache_invalidation_drops_other_processes_entries(tiered_cache):
+    tiered_cache._channel = "test:invalidate"
+    tiered_cache.set("/v3/items", "get", {}, {"id": 1}, ttl=60)
+
+    _channel, _message = tiered_cache.l2.r.published[0]
+    _key = tiered_cache.l2.make_key("/v3/items", "get", {})
+
+    assert _message == f"{tiered_cache._id} {_key}"
+
+    # our own message is ignored
+    tiered_cache._on_invalidate({"data": _message.encode()})
+    assert tiered_cache.l1.get_raw(_key)
+
+    tiered_cache._on_invalidate({"data": f"other {_key}".encode()})
+    assert tiered_cache.l1.get_raw(_key) is None
+
+
+def test_tiered_cache_forked_workers_restart_the_subscriber(tiered_cache, monkeypatch):
+    tiered_cache._channel = "test:invalidate"
+    tiered_cache._subscribe()
+    _parent_id = tiered_cache._id
+
+    # a forked worker: same object, another pid
+    monkeypatch.setattr(
+        sys.modules["envoxy.cache.tiered"], "os", types.SimpleNamespace(getpid=lambda: -1)
+    )
+
+    tiered_cache.set("/v3/items", "get", {}, {"id": 1}, ttl=60)
+    _key = tiered_cache.l2.make_key("/v3/items", "get", {})
+
+    _pubsubs = tiered_cache.l2.r.pubsubs
+    assert len(_pubsubs) == 2
+    assert tiered_cache._id != _parent_id
+
+    # another worker, forked from the same parent, wrote the key
+    _pubsubs[-1].handlers["test:invalidate"]({"data": f"{_parent_id} {_key}".encode()})
+    assert tiered_cache.l1.get_raw(_key) is None
+
+    tiered_cache.get("/v3/items", "get", {})
+    assert len(_pubsubs) == 2
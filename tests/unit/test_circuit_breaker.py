@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from envoxy.utils.circuit_breaker import CircuitBreaker, CircuitOpenException
+
+
+def _breaker(**kwargs):
+    _params = {"failure_rate": 0.5, "minimum_calls": 4, "window": 60, "reset_timeout": 0.05}
+    _params.update(kwargs)
+    return CircuitBreaker("test", **_params)
+
+
+def test_breaker_opens_when_failure_rate_is_reached():
+    _cb = _breaker()
+
+    _cb.record_success()
+    _cb.record_failure()
+    _cb.record_success()
+    assert _cb.state == CircuitBreaker.CLOSED
+
+    _cb.record_failure()
+    assert _cb.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenException):
+        _cb.check()
+
+
+def test_breaker_needs_minimum_calls():
+    _cb = _breaker()
+
+    for _ in range(3):
+        _cb.record_failure()
+
+    assert _cb.state == CircuitBreaker.CLOSED
+    assert _cb.allow_request()
+
+
+def test_half_open_trial_closes_or_reopens():
+    _cb = _breaker()
+
+    for _ in range(4):
+        _cb.record_failure()
+
+    time.sleep(0.06)
+    assert _cb.state == CircuitBreaker.HALF_OPEN
+
+    # a single trial call goes through
+    assert _cb.allow_request()
+    assert not _cb.allow_request()
+
+    _cb.record_failure()
+    assert _cb.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    assert _cb.allow_request()
+    _cb.record_success()
+    assert _cb.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_trial_slots_are_given_back():
+    _cb = _breaker()
+
+    for _ in range(4):
+        _cb.record_failure()
+
+    time.sleep(0.06)
+
+    # a cancelled trial releases its slot
+    assert _cb.allow_request()
+    _cb.record(None)
+    assert _cb.allow_request()
+    assert not _cb.allow_request()
+
+    # a trial that never reports back expires after reset_timeout
+    time.sleep(0.06)
+    assert _cb.state == CircuitBreaker.HALF_OPEN
+    assert _cb.allow_request()
+
+    _cb.record(True)
+    assert _cb.state == CircuitBreaker.CLOSED
+
+
+def test_disabled_breaker_always_allows():
+    _cb = _breaker(enabled=False)
+
+    for _ in range(10):
+        _cb.record_failure()
+
+    assert _cb.allow_request()
+
+
+def test_registry_shares_breakers_per_name():
+    CircuitBreaker.reset_all()
+
+    _first = CircuitBreaker.get("zmq:backend", {"minimum_calls": 2})
+
+    assert CircuitBreaker.get("zmq:backend") is _first
+    assert _first.minimum_calls == 2
+
+    CircuitBreaker.reset_all()
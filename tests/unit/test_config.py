@@ -0,0 +1,109 @@
+import json
+import os
+
+import pytest
+
+from envoxy.utils.config import Config
+
+
+@pytest.fixture
+def conf_file(tmp_path, monkeypatch):
+    _path = tmp_path / "envoxy.json"
+
+    def _write(content):
+        _path.write_text(json.dumps(content))
+        # make the change visible even within the mtime granularity
+        _stat = os.stat(_path)
+        os.utime(_path, ns=(_stat.st_atime_ns, _stat.st_mtime_ns + 1_000_000_000))
+
+    _write({"zmq_servers": {"a": {"port": 1}}, "cache": {}})
+
+    monkeypatch.setattr(Config, "_subscribers", [])
+    _previous_path = Config.file_path
+    Config.set_file_path(str(_path))
+
+    yield _write
+
+    Config.set_file_path(_previous_path)
+
+
+def test_content_is_parsed_once(conf_file, monkeypatch):
+    _content = Config.content()
+
+    monkeypatch.setattr(Config, "check_interval", 0)
+    monkeypatch.setattr(json, "loads", lambda text: pytest.fail("parsed again"))
+
+    assert Config.content() is _content
+    assert Config.get("zmq_servers") == {"a": {"port": 1}}
+
+
+def test_changes_are_seen_after_the_check_interval(conf_file, monkeypatch):
+    assert Config.get("zmq_servers") == {"a": {"port": 1}}
+
+    conf_file({"zmq_servers": {"a": {"port": 2}}})
+
+    # still within the interval
+    assert Config.get("zmq_servers") == {"a": {"port": 1}}
+
+    monkeypatch.setattr(Config, "check_interval", 0)
+
+    assert Config.get("zmq_servers") == {"a": {"port": 2}}
+
+
+def test_subscribers_only_hear_about_their_node(conf_file):
+    Config.content()
+
+    _zmq, _cache = [], []
+    Config.subscribe(_zmq.append, node="zmq_servers")
+    Config.subscribe(_cache.append, node="cache")
+
+    conf_file({"zmq_servers": {"a": {"port": 2}}, "cache": {}})
+    Config.reload()
+
+    assert _zmq == [{"a": {"port": 2}}]
+    assert _cache == []
+
+
+def test_bound_methods_are_held_weakly(conf_file):
+    class Connector:
+        calls = 0
+
+        def reload_servers(self, confs):
+            Connector.calls += 1
+
+    _connector = Connector()
+    Config.subscribe(_connector.reload_servers, node="zmq_servers")
+    Config.content()
+
+    del _connector
+
+    conf_file({"zmq_servers": {"b": {}}})
+    Config.reload()
+
+    assert Connector.calls == 0
+    assert Config._subscribers == []
+
+
+def test_a_broken_file_keeps_the_current_snapshot(conf_file, tmp_path):
+    _content = Config.content()
+
+    (tmp_path / "envoxy.json").write_text('{"zmq_servers": ')
+
+    assert Config.reload() is _content
+
+
+def test_subscriber_errors_do_not_stop_the_others(conf_file):
+    Config.content()
+
+    _calls = []
+
+    def _failing(value):
+        raise RuntimeError("boom")
+
+    Config.subscribe(_failing, node="zmq_servers")
+    Config.subscribe(_calls.append, node="zmq_servers")
+
+    conf_file({"zmq_servers": {}})
+    Config.reload()
+
+    assert _calls == [{}]
@@ -0,0 +1,111 @@
+import json
+import threading
+
+import pytest
+
+from envoxy.utils import logs
+from envoxy.utils.log_sink import BLOCK, DROP, AsyncLogSink, FileWriter
+from envoxy.utils.logs import Log
+
+
+class GatedWriter:
+    """Writer holding the sink thread until ``release`` is set."""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+        self.closed = False
+
+    def write(self, records):
+        self.release.wait()
+        self.batches.append(list(records))
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def writer():
+    return GatedWriter()
+
+
+def test_records_are_written_in_batches(writer):
+    _sink = AsyncLogSink(writer, batch_size=3, flush_interval=0.05)
+
+    for _i in range(7):
+        _sink.write(f"record {_i}")
+
+    _sink.close()
+
+    assert [_record for _batch in writer.batches for _record in _batch] == [
+        f"record {_i}" for _i in range(7)
+    ]
+    assert max(len(_batch) for _batch in writer.batches) <= 3
+    assert _sink.written == 7
+    assert writer.closed
+
+
+def test_drop_policy_counts_the_overflow(writer):
+    writer.release.clear()
+
+    _sink = AsyncLogSink(writer, capacity=2, batch_size=1, flush_interval=0.05, policy=DROP)
+
+    # the writer thread holds one record, the queue two more
+    _results = [_sink.write(f"record {_i}") for _i in range(10)]
+
+    writer.release.set()
+    _sink.close()
+
+    assert _results.count(False) == _sink.dropped
+    assert _sink.dropped >= 7
+    assert _sink.written + _sink.dropped == 10
+
+
+def test_block_policy_waits_for_room(writer):
+    writer.release.clear()
+
+    _sink = AsyncLogSink(writer, capacity=1, batch_size=1, flush_interval=0.05, policy=BLOCK)
+
+    _done = threading.Event()
+
+    def _produce():
+        for _i in range(5):
+            _sink.write(f"record {_i}")
+        _done.set()
+
+    threading.Thread(target=_produce, daemon=True).start()
+
+    assert not _done.wait(0.2)
+
+    writer.release.set()
+
+    assert _done.wait(2)
+
+    _sink.close()
+
+    assert _sink.dropped == 0
+    assert _sink.written == 5
+
+
+def test_unknown_policy_is_rejected(writer):
+    with pytest.raises(ValueError):
+        AsyncLogSink(writer, policy="maybe")
+
+
+def test_log_records_go_through_the_sink(tmp_path, monkeypatch):
+    monkeypatch.setattr(logs.uwsgi, "log", lambda text: pytest.fail("written synchronously"))
+
+    _path = tmp_path / "envoxy.log"
+    _sink = AsyncLogSink(FileWriter(str(_path)), flush_interval=0.05)
+
+    Log.set_sink(_sink)
+
+    try:
+        Log.error("queued %s", "record")
+        _sink.flush(timeout=2)
+    finally:
+        Log.set_sink(None)
+
+    assert _sink.dropped == 0
+    assert json.loads(_path.read_text().splitlines()[0])["short_message"] == "queued record"
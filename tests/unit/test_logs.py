@@ -0,0 +1,91 @@
+import json
+import sys
+
+import pytest
+
+from envoxy.utils import logs
+from envoxy.utils.logs import Log
+
+
+class FakeUwsgi:
+    def __init__(self, level):
+        self.opt = {"log-level": level}
+        self.lines = []
+
+    def log(self, text):
+        self.lines.append(text)
+
+
+@pytest.fixture
+def uwsgi(monkeypatch):
+    _uwsgi = FakeUwsgi(Log.INFO)
+    monkeypatch.setattr(logs, "uwsgi", _uwsgi)
+
+    return _uwsgi
+
+
+class Expensive:
+    formatted = 0
+
+    def __str__(self):
+        Expensive.formatted += 1
+        return "expensive"
+
+
+def test_records_are_gelf_json_with_caller_info(uwsgi):
+    Log.error('quote " and\nnewline %s', "arg")
+    _line = sys._getframe().f_lineno
+
+    _record = json.loads(uwsgi.lines[0])
+
+    assert _record["short_message"] == 'quote " and\nnewline arg'
+    assert _record["level"] == 3
+    assert _record["file"] == "tests.unit.test_logs.py"
+    assert _record["line"] == _line - 1
+    assert _record["version"] == "1.1"
+
+
+def test_arguments_are_only_formatted_when_enabled(uwsgi):
+    Expensive.formatted = 0
+
+    Log.debug("value %s", Expensive())
+    Log.warning("value %s", Expensive())
+
+    assert Expensive.formatted == 1
+    assert len(uwsgi.lines) == 1
+
+
+def test_warning_is_skipped_below_its_level(uwsgi):
+    uwsgi.opt["log-level"] = Log.ERROR
+
+    Log.warning("not logged")
+
+    assert uwsgi.lines == []
+
+
+def test_broken_format_arguments_do_not_raise(uwsgi):
+    Log.info("%d items", "many")
+
+    assert json.loads(uwsgi.lines[0])["short_message"] == "%d items many"
+
+
+def test_exec_name_is_read_once_per_config_file(uwsgi, monkeypatch, tmp_path):
+    _conf = tmp_path / "envoxy.json"
+    _conf.write_text(json.dumps({"boot": [{"name": "orders"}]}))
+
+    _reads = []
+    _get = logs.Config.get
+
+    def _counting_get(node):
+        _reads.append(node)
+        return _get(node)
+
+    monkeypatch.setattr(logs.Config, "file_path", str(_conf), raising=False)
+    monkeypatch.setattr(logs.Config, "get", staticmethod(_counting_get))
+    monkeypatch.setattr(logs, "_exec_name", None)
+
+    Log.info("one")
+    Log.info("two")
+
+    assert [json.loads(_line)["exec"] for _line in uwsgi.lines] == ["orders", "orders"]
+    assert _reads == ["boot"]
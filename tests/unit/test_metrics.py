@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+from envoxy.utils.metrics import Registry, read_values
+
+
+def test_counter_and_gauge_render():
+    _registry = Registry()
+
+    _counter = _registry.counter("requests_total", "Requests.", ("server_key",))
+    _counter.labels("backend").inc()
+    _counter.labels("backend").inc(2)
+
+    _gauge = _registry.gauge("in_use", "In use.")
+    _gauge.inc(3)
+    _gauge.dec()
+
+    _text = _registry.render()
+
+    assert "# TYPE requests_total counter" in _text
+    assert 'requests_total{server_key="backend"} 3.0' in _text
+    assert "in_use 2.0" in _text
+
+
+def test_histogram_buckets_are_cumulative():
+    _registry = Registry()
+
+    _histogram = _registry.histogram(
+        "duration_seconds", "Duration.", ("server_key",), buckets=(0.1, 1)
+    )
+
+    for _value in (0.05, 0.1, 0.5, 5):
+        _histogram.labels("backend").observe(_value)
+
+    _text = _registry.render()
+
+    assert 'duration_seconds_bucket{server_key="backend",le="0.1"} 2.0' in _text
+    assert 'duration_seconds_bucket{server_key="backend",le="1.0"} 3.0' in _text
+    assert 'duration_seconds_bucket{server_key="backend",le="+Inf"} 4.0' in _text
+    assert 'duration_seconds_count{server_key="backend"} 4.0' in _text
+    assert 'duration_seconds_sum{server_key="backend"} 5.65' in _text
+
+
+def test_registering_twice_returns_the_same_metric():
+    _registry = Registry()
+
+    _counter = _registry.counter("hits_total", "Hits.", ("source",))
+
+    assert _registry.counter("hits_total", "Hits.", ("source",)) is _counter
+
+    with pytest.raises(ValueError):
+        _registry.gauge("hits_total", "Hits.", ("source",))
+
+    with pytest.raises(ValueError):
+        _counter.labels("zmq", "extra")
+
+
+def test_label_values_are_escaped():
+    _registry = Registry()
+
+    _registry.counter("errors_total", "Errors.", ("reason",)).labels('a "b"\n').inc()
+
+    assert 'errors_total{reason="a \\"b\\"\\n"} 1.0' in _registry.render()
+
+
+def test_directory_mirrors_values_to_mmap_file(tmp_path):
+    _registry = Registry()
+    _counter = _registry.counter("requests_total", "Requests.")
+    _counter.inc()
+
+    _registry.configure(str(tmp_path))
+
+    # values from before configure are carried over
+    _counter.inc(4)
+
+    _path = tmp_path / f"metrics_{os.getpid()}.db"
+
+    assert read_values(str(_path)) == {'["requests_total","",[]]': 5.0}
+
+
+def test_mmap_file_grows(tmp_path):
+    _registry = Registry(str(tmp_path))
+    _counter = _registry.counter("requests_total", "Requests.", ("id",))
+
+    for _i in range(3000):
+        _counter.labels(f"server-{_i}").inc()
+
+    _values = read_values(str(tmp_path / f"metrics_{os.getpid()}.db"))
+
+    assert len(_values) == 3000
+
+
+def test_workers_are_summed(tmp_path):
+    _registry = Registry(str(tmp_path))
+    _counter = _registry.counter("requests_total", "Requests.")
+    _gauge = _registry.gauge("in_use", "In use.")
+
+    _counter.inc(2)
+    _gauge.set(1)
+
+    _pid = os.fork()
+
+    if _pid == 0:
+        try:
+            _registry.after_fork()
+            _counter.inc(3)
+            _gauge.set(7)
+        finally:
+            os._exit(0)
+
+    os.waitpid(_pid, 0)
+
+    assert len(os.listdir(tmp_path)) == 2
+
+    _text = _registry.render()
+
+    # counters of exited workers still count, their gauges do not
+    assert "requests_total 5.0" in _text
+    assert "in_use 1.0" in _text
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from envoxy.db.orm import EnvoxyBase, bulk_insert, fill_audit_defaults
+
+
+class BatchItem(EnvoxyBase):
+    __tablename__ = "batch_items"
+
+    name = Column(String(64), nullable=False)
+    qty = Column(Integer)
+
+
+def test_batch_shares_one_timestamp_and_keeps_given_values():
+    _rows = fill_audit_defaults(
+        BatchItem, [{"name": "a"}, {"name": "b", "id": "given", "href": "/custom"}]
+    )
+
+    assert _rows[0]["created"] == _rows[0]["updated"] == _rows[1]["updated"]
+    assert _rows[0]["href"] == f"/v3/data-layer/aux_batch_item/{_rows[0]['id']}"
+    assert (_rows[1]["id"], _rows[1]["href"]) == ("given", "/custom")
+
+
+def test_bulk_insert_fills_the_audit_columns():
+    _engine = create_engine("sqlite:///:memory:")
+    BatchItem.__table__.create(_engine)
+    _session = sessionmaker(bind=_engine)()
+
+    _rows = ({"name": f"n{_n}", "qty": _n} for _n in range(25))
+
+    assert bulk_insert(_session, BatchItem, _rows, page_size=10) == 25
+    _session.commit()
+
+    _items = _session.scalars(select(BatchItem)).all()
+    assert len(_items) == 25
+    assert all(_item.href.endswith("/" + _item.id) for _item in _items)
+    assert len({_item.created for _item in _items}) == 1
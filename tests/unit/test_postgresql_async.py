@@ -0,0 +1,175 @@
+import asyncio
+import weakref
+
+import pytest
+
+from envoxy.db.exceptions import DatabaseException
+from envoxy.postgresql.aio import AsyncClient, to_arguments
+from envoxy.postgresql.replicas import expand, router
+
+CONF = {
+    "main": {"host": "primary", "port": 5432, "db": "app", "user": "u", "passwd": "p"},
+    "read": {"host": "primary", "db": "app", "replicas": ["replica-a"]},
+}
+
+
+class Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        self.conn.log.append("begin")
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.conn.log.append("rollback" if exc_type else "commit")
+
+
+class Conn:
+    def __init__(self, pool):
+        self.pool = pool
+        self.log = []
+
+    async def fetch(self, text, *args):
+        await asyncio.sleep(0)
+        self.log.append((text, args))
+        return self.pool.results.pop(0) if self.pool.results else []
+
+    def transaction(self):
+        return Transaction(self)
+
+
+class Pool:
+    def __init__(self, server_key):
+        self.server_key = server_key
+        self.results = []
+        self.conns = []
+        self.in_use = 0
+        self.closed = False
+
+    async def acquire(self, timeout=None):
+        self.in_use += 1
+        self.conns.append(Conn(self))
+        return self.conns[-1]
+
+    async def release(self, conn):
+        self.in_use -= 1
+
+    def get_size(self):
+        return len(self.conns)
+
+    def get_idle_size(self):
+        return len(self.conns) - self.in_use
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def client():
+    _client = object.__new__(AsyncClient)
+    _client._confs = expand(CONF)
+    _client._pools = weakref.WeakKeyDictionary()
+    _client.created = {}
+
+    async def _create_pool(server_key, conf):
+        await asyncio.sleep(0)
+        _client.created[server_key] = Pool(server_key)
+        return _client.created[server_key]
+
+    _client._create_pool = _create_pool
+
+    yield _client
+
+    router.forget("read.replica0")
+
+
+def test_placeholders_become_positional_arguments():
+    assert to_arguments("SELECT %(a)s, %(b)s, %(a)s", {"a": 1, "b": 2, "c": 3}) == (
+        "SELECT $1, $2, $1",
+        [1, 2],
+    )
+    assert to_arguments("SELECT %s, %s", (1, 2)) == ("SELECT $1, $2", [1, 2])
+    assert to_arguments("SELECT '100%%'", {}) == ("SELECT '100%'", [])
+
+    with pytest.raises(DatabaseException):
+        to_arguments("SELECT %(a)s", {})
+
+
+def test_queries_share_one_pool_per_loop_and_page_offsets(client):
+    _sql = "SELECT id FROM t LIMIT %(chunk_size)s OFFSET %(offset_limit)s"
+
+    async def _run():
+        _results = await asyncio.gather(
+            *(client.aquery("main", "SELECT %(n)s AS n", {"n": _n}) for _n in range(3))
+        )
+
+        _pool = client.created["main"]
+        _pool.results = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+        _rows = await client.aquery("main", _sql, {"chunk_size": 2})
+
+        return _results, _rows, _pool
+
+    _results, _rows, _pool = asyncio.run(_run())
+
+    # the three concurrent first queries waited for the same pool
+    assert len(_pool.conns) == 4
+    assert _results == [[], [], []]
+    assert _rows == [{"id": 1}, {"id": 2}, {"id": 3}]
+    assert [_call[1] for _call in _pool.conns[-1].log] == [(2, 0), (2, 2)]
+    assert _pool.in_use == 0
+
+
+def test_transaction_queries_share_its_connection(client):
+    async def _run():
+        async with client.atransaction("main"):
+            await client.aquery("main", "INSERT INTO t VALUES (1)")
+            await client.aquery("main", "INSERT INTO t VALUES (2)")
+
+        with pytest.raises(ValueError):
+            async with client.atransaction("main"):
+                await client.aquery("main", "INSERT INTO t VALUES (3)")
+                raise ValueError("boom")
+
+        async with client.atransaction("main"):
+            with pytest.raises(DatabaseException):
+                async with client.atransaction("main"):
+                    pass
+
+    asyncio.run(_run())
+
+    _conns = client.created["main"].conns
+
+    assert len(_conns) == 3
+    assert [_entry if isinstance(_entry, str) else "query" for _entry in _conns[0].log] == [
+        "begin",
+        "query",
+        "query",
+        "commit",
+    ]
+    assert _conns[1].log[-1] == "rollback"
+
+
+def test_reads_go_to_replicas_and_primary_reads_to_the_primary(client):
+    async def _run():
+        await client.aquery("read", "SELECT 1")
+        await client.aquery("read", "SELECT 1", primary=True)
+
+    asyncio.run(_run())
+
+    assert set(client.created) == {"read", "read.replica0"}
+    assert client.created["read"].conns and client.created["read.replica0"].conns
+
+
+def test_reload_closes_the_pools_of_changed_servers(client):
+    async def _run():
+        await client.aquery("main", "SELECT 1")
+        await client.aquery("read", "SELECT 1", primary=True)
+
+        client.reload_config(dict(CONF, main=dict(CONF["main"], host="other")))
+        await asyncio.sleep(0.01)
+
+    asyncio.run(_run())
+
+    assert client.created["main"].closed
+    assert not client.created["read"].closed
+    assert client._confs["main"]["host"] == "other"
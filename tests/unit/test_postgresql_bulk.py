@@ -0,0 +1,132 @@
+import csv
+import io
+
+import pytest
+from psycopg2 import sql
+from sqlalchemy import JSON, Column, Integer, String
+
+from envoxy.db.exceptions import DatabaseException
+from envoxy.db.orm import EnvoxyBase
+from envoxy.postgresql.client import Client
+
+
+class BulkItem(EnvoxyBase):
+    __tablename__ = "bulk_items"
+
+    sku = Column(String(32), nullable=False, unique=True)
+    qty = Column(Integer, default=0)
+    extra = Column(JSON)
+
+
+def _render(query):
+    if isinstance(query, sql.Composed):
+        return "".join(_render(_part) for _part in query.seq)
+
+    if isinstance(query, sql.Identifier):
+        return ".".join(f'"{_string}"' for _string in query.strings)
+
+    return query.string if isinstance(query, sql.SQL) else query
+
+
+class Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = -1
+
+    def execute(self, query, params=None):
+        self.conn.executed.append(_render(query))
+        self.rowcount = len(self.conn.copied)
+
+    def copy_expert(self, query, file, size=64):
+        # small reads: the rows must come out whole across chunk boundaries
+        _data = ""
+
+        while True:
+            _chunk = file.read(size)
+
+            if not _chunk:
+                break
+
+            _data += _chunk
+
+        self.conn.executed.append(_render(query))
+        self.conn.copied = list(csv.reader(io.StringIO(_data)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Conn:
+    def __init__(self):
+        self.executed = []
+        self.copied = []
+        self.commits = 0
+
+    def cursor(self, *args, **kwargs):
+        return Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    _conn = Conn()
+    _client = object.__new__(Client)
+    _client._instances = {"pg": {"server": "pg", "conf": {}}}
+    _client._retired_pools = []
+    monkeypatch.setattr(_client, "_get_conn", lambda server_key: _conn, raising=False)
+    monkeypatch.setattr(_client, "release_conn", lambda server_key, conn: None, raising=False)
+    _client.conn = _conn
+
+    return _client
+
+
+def test_rows_are_copied_with_the_audit_columns(client):
+    _rows = ({"sku": f"sku-{_n}", "extra": {"n": _n}} for _n in range(50))
+
+    assert client.bulk_load("pg", BulkItem, _rows) == 50
+
+    _copied = client.conn.copied
+    assert len(_copied) == 50
+    assert "COPY" in client.conn.executed[-1] and "FORMAT csv" in client.conn.executed[-1]
+
+    _sku, _qty, _extra, _id, _created, _updated, _href = _copied[7]
+    assert (_sku, _qty, _extra) == ("sku-7", "0", '{"n": 7}')
+    assert _href == f"/v3/data-layer/aux_bulk_item/{_id}"
+    # one timestamp for the whole load
+    assert {_row[4] for _row in _copied} == {_created} and _updated == _created
+    assert len({_row[3] for _row in _copied}) == 50
+    assert client.conn.commits == 1
+
+
+def test_values_are_quoted_and_nulls_left_empty(client):
+    client.bulk_load("pg", BulkItem, [BulkItem(sku='a,"b\nc', qty=None, extra=None, id="given")])
+
+    _sku, _qty, _extra, _id, *_ = client.conn.copied[0]
+    assert (_sku, _qty, _extra, _id) == ('a,"b\nc', "0", "", "given")
+
+
+def test_upsert_merges_through_a_staging_table(client):
+    client.bulk_load("pg", BulkItem, [{"sku": "a", "qty": 1}], upsert=True, conflict_columns="sku")
+
+    _create, _copy, _merge, _drop = client.conn.executed
+    assert _create.startswith("CREATE TEMP TABLE")
+    assert "ON CONFLICT" in _merge
+    _updates = _merge.split("DO UPDATE SET")[1]
+    assert '"qty" = EXCLUDED."qty"' in _updates and '"updated"' in _updates
+    assert '"created"' not in _updates and '"id"' not in _updates
+    assert _drop.startswith("DROP TABLE")
+
+
+def test_upsert_needs_the_conflict_columns_loaded(client):
+    with pytest.raises(DatabaseException):
+        client.bulk_load(
+            "pg", BulkItem, [{"sku": "a"}], upsert=True, conflict_columns="missing"
+        )
@@ -0,0 +1,195 @@
+import asyncio
+import threading
+
+import pytest
+
+from envoxy.db.dispatcher import PgDispatcher
+from envoxy.db.exceptions import DatabaseException
+from envoxy.postgresql.client import Client
+
+
+class NamedCursor:
+    def __init__(self, rows, name=None):
+        self.name = name
+        self.rows = list(rows)
+        self.description = None
+        self.fetches = 0
+        self.closed = False
+
+    def execute(self, query, params=None):
+        if query == "SELECT 1":
+            return
+
+        self.description = [("id",), ("name",)]
+
+    def fetchmany(self, size):
+        self.fetches += 1
+        _rows, self.rows = self.rows[:size], self.rows[size:]
+        return _rows
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class CursorConn:
+    def __init__(self, rows):
+        self.rows = rows
+        self.autocommit = True
+        self.named = []
+        self.commits = 0
+
+    def cursor(self, name=None, **kwargs):
+        _cursor = NamedCursor(self.rows if name else (), name)
+
+        if name:
+            assert not self.autocommit, "named cursors need a transaction"
+            self.named.append(_cursor)
+
+        return _cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+class Pool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.released = 0
+
+    def getconn(self, timeout=None):
+        return self.conn
+
+    def putconn(self, conn, close=False):
+        self.released += 1
+
+
+@pytest.fixture
+def client():
+    _rows = [(_i, f"row {_i}") for _i in range(5)]
+    _conn = CursorConn(_rows)
+
+    _client = object.__new__(Client)
+    _client._instances = {
+        "pg": {"server": "pg", "conf": {}, "conn_pool": Pool(_conn)}
+    }
+    _client._retired_pools = []
+
+    return _client
+
+
+def test_rows_are_fetched_lazily_in_itersize_batches(client):
+    _rows = client.query_iter("pg", "select id, name from items", itersize=2)
+
+    _pool = client._instances["pg"]["conn_pool"]
+    assert _pool.conn.named == []
+
+    assert next(_rows) == {"id": 0, "name": "row 0"}
+    assert _pool.conn.named[0].fetches == 1
+
+    assert [_row["id"] for _row in _rows] == [1, 2, 3, 4]
+
+    _cursor = _pool.conn.named[0]
+    assert _cursor.fetches == 3
+    assert _cursor.closed
+    assert _pool.released == 1
+    assert _pool.conn.autocommit is True
+
+
+def test_tuples_come_after_a_shared_header(client):
+    _rows = list(
+        client.query_iter("pg", "select id, name from items", itersize=2, batches=True, as_tuples=True)
+    )
+
+    assert _rows[0] == ("id", "name")
+    assert _rows[1:] == [[(0, "row 0"), (1, "row 1")], [(2, "row 2"), (3, "row 3")], [(4, "row 4")]]
+
+
+def test_stopping_early_releases_the_connection(client):
+    _rows = client.query_iter("pg", "select id, name from items", itersize=2)
+
+    next(_rows)
+    _rows.close()
+
+    _pool = client._instances["pg"]["conn_pool"]
+    assert _pool.conn.named[0].closed
+    assert _pool.released == 1
+
+
+def test_invalid_arguments_raise_before_iterating(client):
+    with pytest.raises(DatabaseException):
+        client.query_iter("pg", "")
+
+    with pytest.raises(DatabaseException):
+        client.query_iter("pg", "select 1", itersize=0)
+
+
+def test_async_iteration_yields_rows(client, monkeypatch):
+    monkeypatch.setattr(
+        "envoxy.db.dispatcher.PgConnector.instance",
+        staticmethod(lambda: type("Connector", (), {"postgres": client})()),
+    )
+
+    async def _collect():
+        return [
+            _row
+            async for _row in PgDispatcher.aquery_iter(
+                "pg", "select id, name from items", itersize=2, as_tuples=True
+            )
+        ]
+
+    _rows = asyncio.run(_collect())
+
+    assert _rows[0] == ("id", "name")
+    assert _rows[1:] == [(_i, f"row {_i}") for _i in range(5)]
+
+
+def test_cancelling_mid_fetch_releases_the_connection(client, monkeypatch):
+    monkeypatch.setattr(
+        "envoxy.db.dispatcher.PgConnector.instance",
+        staticmethod(lambda: type("Connector", (), {"postgres": client})()),
+    )
+
+    _fetching = threading.Event()
+    _release = threading.Event()
+    _fetchmany = NamedCursor.fetchmany
+
+    def _slow_fetchmany(self, size):
+        if self.fetches:
+            _fetching.set()
+            _release.wait(2)
+
+        return _fetchmany(self, size)
+
+    monkeypatch.setattr(NamedCursor, "fetchmany", _slow_fetchmany)
+
+    async def _consume():
+        async for _row in PgDispatcher.aquery_iter(
+            "pg", "select id, name from items", itersize=2
+        ):
+            pass
+
+    async def _run():
+        _task = asyncio.create_task(_consume())
+
+        await asyncio.get_running_loop().run_in_executor(None, _fetching.wait, 2)
+        _task.cancel()
+        await asyncio.sleep(0.05)
+        _release.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await _task
+
+    asyncio.run(_run())
+
+    _pool = client._instances["pg"]["conn_pool"]
+    assert _pool.conn.named[0].closed
+    assert _pool.released == 1
@@ -0,0 +1,82 @@
+import pytest
+
+from envoxy.db.exceptions import DatabaseException
+from envoxy.postgresql.client import Client, keyset_query
+
+
+class KeysetCursor:
+    """Serves ``rows`` ordered by id the way the rewritten query would."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+        self._result = []
+
+    def execute(self, query, params=None):
+        self.executed.append((repr(query), dict(params or {})))
+
+        if "WHERE" in repr(query):
+            _rows = [_row for _row in self.rows if _row["id"] > params["keyset_last_0"]]
+        else:
+            _rows = list(self.rows)
+
+        self._result = _rows[: params["chunk_size"]]
+        self.rowcount = len(self._result)
+
+    def fetchall(self):
+        return self._result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _client():
+    _client = object.__new__(Client)
+    _client._instances = {"pg": {"server": "pg", "conf": {}}}
+
+    return _client
+
+
+def test_pages_seek_after_the_last_key():
+    _cursor = KeysetCursor([{"id": _i, "name": f"row {_i}"} for _i in range(5)])
+
+    _data = _client()._fetch_keyset(
+        _cursor, "select id, name from items", {"chunk_size": 2}, "id"
+    )
+
+    assert [_row["id"] for _row in _data] == [0, 1, 2, 3, 4]
+    # 2 + 2 + 1 rows, each page only scans past the previous one
+    assert [_params.get("keyset_last_0") for _, _params in _cursor.executed] == [None, 1, 3]
+
+
+def test_an_exact_last_page_ends_with_an_empty_one():
+    _cursor = KeysetCursor([{"id": _i} for _i in range(4)])
+
+    _data = _client()._fetch_keyset(_cursor, "select id from items", {"chunk_size": 2}, "id")
+
+    assert len(_data) == 4
+    assert len(_cursor.executed) == 3
+
+
+def test_missing_key_column_is_reported():
+    _cursor = KeysetCursor([{"id": _i} for _i in range(4)])
+
+    with pytest.raises(DatabaseException):
+        _client()._fetch_keyset(_cursor, "select id from items", {"chunk_size": 2}, "uuid")
+
+
+def test_rewrite_wraps_the_query_and_quotes_the_keys():
+    _query = repr(keyset_query("select * from items where kind = %(kind)s;", ("created", "id"), after=True))
+
+    assert "SQL('SELECT * FROM ('), SQL('select * from items where kind = %(kind)s')" in _query
+    assert "Identifier('created'), SQL(', '), Identifier('id')" in _query
+    assert "Placeholder('keyset_last_0'), SQL(', '), Placeholder('keyset_last_1')" in _query
+    assert "ORDER BY" in _query and "LIMIT %(chunk_size)s" in _query
+
+
+def test_keyset_needs_named_params():
+    with pytest.raises(DatabaseException):
+        _client().query("pg", "select id from items", ("x",), keyset="id")
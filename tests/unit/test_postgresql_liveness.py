@@ -0,0 +1,129 @@
+import psycopg2.extensions
+import pytest
+
+from envoxy.postgresql import client as pg_client
+from envoxy.postgresql import pool as pg_pool
+from envoxy.postgresql.client import Client, SemaphoreThreadedConnectionPool
+
+
+class Info:
+    def __init__(self):
+        self.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+
+        self.conn.pings += query == "SELECT 1"
+        # psycopg2 opens a transaction on the first statement
+        self.conn.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Conn:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.pings = 0
+        self.info = Info()
+
+    def cursor(self, *args, **kwargs):
+        return Cursor(self)
+
+    def rollback(self):
+        self.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class Pool(SemaphoreThreadedConnectionPool):
+    def _connect(self):
+        return Conn()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    _now = [1000.0]
+    monkeypatch.setattr(pg_pool, "monotonic", lambda: _now[0])
+
+    return _now
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(Client, "_start_validator", lambda self: None)
+
+    _client = object.__new__(Client)
+    _client._instances = {
+        "pg": {
+            "server": "pg",
+            "conf": {"ping_after_idle": 30},
+            "conn_pool": Pool(2, 4),
+        }
+    }
+    _client._retired_pools = []
+
+    return _client
+
+
+def test_hot_connections_skip_the_ping(client, clock):
+    _conn = client._get_conn("pg")
+    client.release_conn("pg", _conn)
+
+    clock[0] += 5
+
+    assert client._get_conn("pg") is _conn
+    assert _conn.pings == 0
+
+
+def test_connections_idle_for_too_long_are_pinged(client, clock):
+    _conn = client._get_conn("pg")
+    client.release_conn("pg", _conn)
+
+    clock[0] += 31
+
+    assert client._get_conn("pg") is _conn
+    assert _conn.pings == 1
+
+
+def test_closed_connections_are_replaced_without_a_round_trip(client, clock, monkeypatch):
+    monkeypatch.setattr(pg_client, "sleep", lambda seconds: None)
+
+    _conn = client._get_conn("pg")
+    client.release_conn("pg", _conn)
+    _conn.closed = 1
+
+    _other = client._get_conn("pg")
+
+    assert _other is not _conn
+    assert _conn.pings == 0
+
+
+def test_validator_closes_broken_idle_connections(client, clock):
+    _pool = Pool(2, 4)
+    _healthy, _broken = list(_pool._idle)
+    _broken.broken = True
+
+    clock[0] += 60
+
+    _closed = _pool.validate_idle(30, client._is_connection_healthy)
+
+    assert _closed == 1
+    assert list(_pool._idle) == [_healthy]
+    assert _broken.closed
+    # validated just now: the next checkout does not ping again
+    assert _pool.idle_for(_healthy) == 0
+    # and the ping's transaction is not left open on the server
+    assert _healthy.pings == 1
+    assert _healthy.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE
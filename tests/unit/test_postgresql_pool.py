@@ -0,0 +1,232 @@
+import threading
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+from envoxy.db.exceptions import DatabaseException
+from envoxy.postgresql import pool as pg_pool
+from envoxy.postgresql.client import Client
+from envoxy.postgresql.pool import ConnectionPool
+from envoxy.postgresql.statements import StatementCache, execute_statement, to_prepared
+
+
+class Info:
+    transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        _query = str(query) if isinstance(query, str) else repr(query)
+
+        if _query.startswith("PREPARE") and self.conn.refuse_prepare:
+            raise psycopg2.ProgrammingError("could not determine data type")
+
+        self.conn.executed.append(_query)
+
+    def fetchall(self):
+        return []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Conn:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.refuse_prepare = False
+        self.executed = []
+        self.info = Info()
+
+    def cursor(self, *args, **kwargs):
+        return Cursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class Pool(ConnectionPool):
+    def _connect(self):
+        return Conn()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    _now = [1000.0]
+    monkeypatch.setattr(pg_pool, "monotonic", lambda: _now[0])
+
+    return _now
+
+
+def test_idle_connections_are_handed_out_lifo():
+    _pool = Pool(0, 4)
+    _first, _second = _pool.getconn(), _pool.getconn()
+
+    _pool.putconn(_first)
+    _pool.putconn(_second)
+
+    assert _pool.getconn() is _second
+    assert _pool.stats()["size"] == 2
+
+
+def test_waiters_are_served_in_arrival_order():
+    _pool = Pool(0, 1)
+    _conn = _pool.getconn()
+    _served = []
+
+    def _wait(label):
+        _got = _pool.getconn(timeout=5)
+        _served.append(label)
+        _pool.putconn(_got)
+
+    _threads = []
+
+    for _label in ("first", "second"):
+        _thread = threading.Thread(target=_wait, args=(_label,))
+        _thread.start()
+        _threads.append(_thread)
+
+        while _pool.stats()["waiters"] < len(_threads):
+            pass
+
+    _pool.putconn(_conn)
+
+    for _thread in _threads:
+        _thread.join()
+
+    assert _served == ["first", "second"]
+    assert _pool.stats()["waits"] == 2
+
+
+def test_waiting_times_out():
+    _pool = Pool(0, 1)
+    _pool.getconn()
+
+    with pytest.raises(DatabaseException):
+        _pool.getconn(timeout=0.01)
+
+    _stats = _pool.stats()
+    assert (_stats["timeouts"], _stats["waiters"], _stats["in_use"]) == (1, 0, 1)
+
+
+def test_connections_are_recycled_past_their_lifetime(clock):
+    _pool = Pool(1, 2, max_lifetime=60)
+    _old = _pool.getconn()
+
+    clock[0] += 61
+    _pool.putconn(_old)
+
+    assert _old.closed
+    assert _pool.getconn() is not _old
+    assert _pool.stats()["recycled"] == 1
+
+
+def test_reap_keeps_min_idle(clock):
+    _pool = Pool(1, 4, max_idle_time=10)
+    _conns = [_pool.getconn() for _ in range(3)]
+
+    for _conn in _conns:
+        _pool.putconn(_conn)
+
+    clock[0] += 11
+
+    assert _pool.reap() == 2
+    assert _pool.stats()["idle"] == 1
+
+
+def test_closed_pool_closes_returned_connections():
+    _pool = Pool(1, 2)
+    _conn = _pool.getconn()
+
+    _pool.closeall()
+    _pool.putconn(_conn)
+
+    assert _conn.closed
+    assert _pool.stats()["size"] == 0
+
+
+def test_placeholders_are_numbered():
+    assert to_prepared("select * from t where a = %(a)s and b = %(b)s or c = %(a)s") == (
+        "select * from t where a = $1 and b = $2 or c = $1",
+        ("a", "b"),
+        0,
+    )
+    assert to_prepared("select %s, %s, '100%%'") == ("select $1, $2, '100%'", (), 2)
+    assert execute_statement("s1", ("a", "b"), 0) == "EXECUTE s1 (%(a)s, %(b)s)"
+
+    with pytest.raises(ValueError):
+        to_prepared("select %s, %(a)s")
+
+
+def test_statement_cache_evicts_the_least_recently_used():
+    _cache = StatementCache(2)
+    _cache.add("q1", ("s1", "EXECUTE s1"))
+    _cache.add("q2", ("s2", "EXECUTE s2"))
+    _cache.get("q1")
+
+    assert _cache.add("q3", ("s3", "EXECUTE s3")) == "s2"
+    assert "q1" in _cache and "q2" not in _cache
+
+
+def _pg_client(conf):
+    _client = object.__new__(Client)
+    _client._instances = {"pg": {"server": "pg", "conf": conf}}
+    _client._retired_pools = []
+    _client._validator_pid = None
+    _client._start_validator = lambda: None
+    _client._instances["pg"]["conn_pool"] = Pool(
+        1, 1, configure=lambda conn, state: _client._configure_conn(conf, conn, state)
+    )
+
+    return _client
+
+
+def test_search_path_is_set_once_per_connection():
+    _client = _pg_client({"schema": "app"})
+    _conn = _client._instances["pg"]["conn_pool"]._idle[0]
+
+    _client.query("pg", "select 1")
+    _client.query("pg", "select 2")
+
+    assert [_q for _q in _conn.executed if "search_path" in _q] == [
+        repr(psycopg2.sql.SQL("SET search_path TO {}").format(psycopg2.sql.Identifier("app")))
+    ]
+
+
+def test_repeated_queries_reuse_their_prepared_statement():
+    _client = _pg_client({"prepared_statements": 10})
+    _conn = _client._instances["pg"]["conn_pool"]._idle[0]
+
+    for _ in range(3):
+        _client.query("pg", "select * from t where id = %(id)s", {"id": 1})
+
+    assert [_q.split(" ")[0] for _q in _conn.executed].count("PREPARE") == 1
+    assert [_q.split(" ")[0] for _q in _conn.executed].count("EXECUTE") == 3
+    assert _client.stats("pg")["statements"]["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_refused_statements_run_unprepared():
+    _client = _pg_client({"prepared_statements": 10})
+    _conn = _client._instances["pg"]["conn_pool"]._idle[0]
+    _conn.refuse_prepare = True
+
+    _client.query("pg", "select %(x)s", {"x": 1})
+    _client.query("pg", "select %(x)s", {"x": 1})
+
+    assert "ROLLBACK TO SAVEPOINT envoxy_prepare" in _conn.executed
+    assert _conn.executed.count("select %(x)s") == 2
+    assert _client.stats("pg")["statements"]["refused"] == 2
@@ -0,0 +1,78 @@
+import pytest
+
+from envoxy.postgresql.client import Client
+from envoxy.postgresql.replicas import ReplicaRouter, expand, router
+
+CONF = {
+    "main": {
+        "host": "primary",
+        "db": "app",
+        "replicas": ["replica-a", {"host": "replica-b", "port": 5433}],
+    },
+    "default": "main",
+}
+
+
+def test_replicas_become_entries_of_their_own():
+    _confs = expand(CONF)
+
+    assert set(_confs) == {"main", "main.replica0", "main.replica1", "default"}
+    assert _confs["main.replica0"] == {"host": "replica-a", "db": "app", "primary": "main"}
+    assert _confs["main.replica1"]["port"] == 5433
+    assert "replicas" not in _confs["main.replica1"]
+
+
+def test_round_robin_skips_ejected_replicas():
+    _router = ReplicaRouter()
+    _conf = CONF["main"]
+
+    assert [_router.pick("main", _conf) for _ in range(4)] == [
+        "main.replica0",
+        "main.replica1",
+        "main.replica0",
+        "main.replica1",
+    ]
+
+    assert _router.report("main.replica0", 30.0, 10)
+    assert {_router.pick("main", _conf) for _ in range(4)} == {"main.replica1"}
+
+    # unreachable: every replica out, reads go to the primary
+    assert _router.report("main.replica1", None, 10)
+    assert _router.pick("main", _conf) == "main"
+
+    assert _router.report("main.replica0", 0.5, 10)
+    assert not _router.report("main.replica0", 0.2, 10)
+    assert _router.pick("main", _conf) == "main.replica0"
+
+
+def test_least_outstanding_picks_the_idlest_replica():
+    _conf = dict(CONF["main"], replica_balance="least_outstanding")
+    _load = {"main.replica0": 3, "main.replica1": 1}
+
+    assert ReplicaRouter().pick("main", _conf, load=_load.get) == "main.replica1"
+
+
+@pytest.fixture
+def client():
+    _client = object.__new__(Client)
+    _client._instances = {
+        _key: {"server": _key, "conf": _conf} for _key, _conf in expand(CONF).items()
+    }
+    _client._retired_pools = []
+
+    yield _client
+
+    for _key in ("main.replica0", "main.replica1"):
+        router.forget(_key)
+
+
+def test_reads_go_to_replicas_and_transactions_to_the_primary(client):
+    assert client._read_key("main").startswith("main.replica")
+    assert client._read_key("main", primary=True) == "main"
+
+    client._thread_local_data.conn = object()
+
+    try:
+        assert client._read_key("main") == "main"
+    finally:
+        del client._thread_local_data.conn
@@ -0,0 +1,129 @@
+import functools
+import sqlite3
+import threading
+
+import psycopg2.extensions
+import pytest
+from sqlalchemy import create_engine, text
+
+from envoxy.db.exceptions import DatabaseException
+from envoxy.postgresql import client as pg_client
+from envoxy.postgresql import pool as pg_pool
+from envoxy.postgresql.client import Client
+from envoxy.postgresql.pool import ConnectionBudget, ConnectionPool
+from envoxy.postgresql.sqlalchemy.pool import SharedPool
+
+
+class Info:
+    transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class Cursor(sqlite3.Cursor):
+    def execute(self, *args):
+        if self.connection.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+
+        return super().execute(*args)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Conn(sqlite3.Connection):
+    info = Info()
+    closed = 0
+    broken = False
+
+    def cursor(self, factory=Cursor):
+        return super().cursor(factory)
+
+    def close(self):
+        self.closed = 1
+        super().close()
+
+
+class Pool(ConnectionPool):
+    def _connect(self):
+        return sqlite3.connect(":memory:", factory=Conn, check_same_thread=False)
+
+
+def test_engine_borrows_the_connections_of_the_shared_pool():
+    _shared = Pool(1, 2)
+    _engine = create_engine("sqlite://", pool=SharedPool(_shared))
+
+    with _engine.connect() as _conn:
+        assert _conn.execute(text("select 1")).scalar() == 1
+        assert _shared.stats()["in_use"] == 1
+
+    # back to the shared pool, open
+    _stats = _shared.stats()
+    assert (_stats["size"], _stats["idle"], _stats["created"]) == (1, 1, 1)
+    assert not _shared._idle[0].closed
+
+    with _engine.connect():
+        assert _shared.stats()["created"] == 1
+
+
+def test_invalidated_connections_are_closed_in_the_shared_pool():
+    _shared = Pool(1, 2)
+    _engine = create_engine("sqlite://", pool=SharedPool(_shared))
+
+    with _engine.connect() as _conn:
+        _dbapi = _conn.connection.dbapi_connection
+        _conn.invalidate()
+
+    assert _dbapi.closed
+    assert _shared.stats()["size"] == 0
+
+
+def test_broken_idle_connections_are_not_lent(monkeypatch):
+    monkeypatch.setattr(Client, "_start_validator", lambda self: None)
+    monkeypatch.setattr(pg_client, "sleep", lambda seconds: None)
+    _now = [1000.0]
+    monkeypatch.setattr(pg_pool, "monotonic", lambda: _now[0])
+
+    _shared = Pool(1, 2)
+    _client = object.__new__(Client)
+    _client._instances = {
+        "pg": {"server": "pg", "conf": {"ping_after_idle": 30}, "conn_pool": _shared}
+    }
+    _client._retired_pools = []
+
+    _engine = create_engine(
+        "sqlite://",
+        pool=SharedPool(_shared, acquire=functools.partial(_client._get_conn, "pg")),
+    )
+
+    # e.g. the server restarted while the connection sat idle
+    _broken = _shared._idle[0]
+    _broken.broken = True
+    _now[0] += 60
+
+    with _engine.connect() as _conn:
+        assert _conn.connection.dbapi_connection is not _broken
+        assert _conn.execute(text("select 1")).scalar() == 1
+
+    assert _broken.closed
+
+
+def test_pools_share_the_process_budget():
+    _budget = ConnectionBudget(2)
+    _main, _reports = Pool(0, 2, budget=_budget), Pool(0, 2, budget=_budget)
+
+    _first, _second = _main.getconn(), _main.getconn()
+
+    with pytest.raises(DatabaseException):
+        _reports.getconn(timeout=0.1)
+
+    _got = []
+    _waiter = threading.Thread(target=lambda: _got.append(_reports.getconn(timeout=5)))
+    _waiter.start()
+
+    # closing a connection of another pool frees budget for the waiter
+    _main.putconn(_first, close=True)
+    _waiter.join()
+
+    assert _got and _budget.stats() == {"limit": 2, "used": 2}
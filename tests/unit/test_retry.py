@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from envoxy.utils.circuit_breaker import CircuitBreaker
+from envoxy.utils.config import Config
+from envoxy.utils.retry import RetryPolicy
+from envoxy.zeromq.dispatcher import (
+    ZMQ,
+    Dispatcher,
+    NoSocketException,
+    ZMQException,
+    ZMQTimeoutException,
+)
+
+
+def test_retry_policy_bounds_attempts():
+    _retry = RetryPolicy(max_attempts=3, base_delay=1, jitter=0).start()
+
+    assert _retry.next_delay() == 1
+    assert _retry.next_delay() == 2
+    assert _retry.next_delay() is None
+    assert _retry.attempts == 3
+
+
+def test_retry_policy_caps_and_jitters_delays():
+    _policy = RetryPolicy(
+        max_attempts=10, base_delay=1, max_delay=4, multiplier=3, jitter=0.5
+    )
+
+    for _retry_number in range(1, 10):
+        _delay = _policy.backoff(_retry_number)
+        _ceiling = min(3 ** (_retry_number - 1), 4)
+
+        assert _ceiling * 0.5 <= _delay <= _ceiling
+
+
+def test_retry_policy_respects_deadline():
+    _retry = RetryPolicy(max_attempts=100, base_delay=1, jitter=0, deadline=2.5).start()
+
+    assert _retry.next_delay() == 1
+    assert _retry.next_delay() == 2
+    # elapsed time is ~0 but the next delay (4s) does not fit the deadline
+    assert _retry.next_delay() is None
+
+
+def test_retry_policy_from_conf_uses_defaults():
+    _policy = RetryPolicy.from_conf({"max_attempts": 5}, base_delay=2, deadline=30)
+
+    assert _policy.max_attempts == 5
+    assert _policy.base_delay == 2
+    assert _policy.deadline == 30
+
+
+@pytest.fixture
+def zmq_client(tmp_path):
+    _conf_path = tmp_path / "envoxy.json"
+    _conf_path.write_text(
+        json.dumps(
+            {
+                "zmq_workers": {"context_max_workers": 2},
+                "zmq_servers": {
+                    "backend": {
+                        "host": "127.0.0.1",
+                        "port": 1,
+                        "retry": {"max_attempts": 3, "base_delay": 0},
+                    }
+                },
+            }
+        )
+    )
+
+    _previous_path = Config.file_path
+    Config.set_file_path(str(_conf_path))
+    CircuitBreaker.reset_all()
+    ZMQ._instance = None
+
+    yield ZMQ.instance()
+
+    ZMQ._instance = None
+    Config.set_file_path(_previous_path)
+
+
+def test_send_and_recv_fails_fast_once_policy_is_exhausted(zmq_client, monkeypatch):
+    _calls = []
+
+    def _fail(server_key, worker_id, frames, **kwargs):
+        _calls.append(worker_id)
+        raise NoSocketException("backend down")
+
+    monkeypatch.setattr(zmq_client, "_send_and_recv_with_worker", _fail)
+
+    with pytest.raises(ZMQException):
+        Dispatcher.get("backend", "/v3/items")
+
+    assert len(_calls) == 3
+    # every worker went back to the pool
+    assert zmq_client.stats("backend")["in_use"] == 0
+
+
+def test_send_and_recv_does_not_retry_serialization_errors(zmq_client, monkeypatch):
+    monkeypatch.setattr(
+        zmq_client,
+        "_send_and_recv_with_worker",
+        lambda *args, **kwargs: pytest.fail("should not be sent"),
+    )
+
+    with pytest.raises(ValueError):
+        Dispatcher.post("backend", "/v3/items", payload={"value": object()})
+
+
+def test_deadline_caps_the_wait_for_a_worker(zmq_client):
+    _busy = [zmq_client.get_available_worker("backend") for _ in range(2)]
+
+    try:
+        with pytest.raises(ZMQTimeoutException):
+            Dispatcher.get("backend", "/v3/items", timeout=0.05)
+    finally:
+        for _worker_id in _busy:
+            zmq_client.free_worker("backend", _worker_id)
@@ -0,0 +1,281 @@
+import asyncio
+import copy
+import json
+import threading
+import time
+
+import pytest
+
+from envoxy.constants import Performative
+from envoxy.utils.circuit_breaker import CircuitBreaker
+from envoxy.utils.config import Config
+from envoxy.utils.singleflight import AsyncSingleFlight, SingleFlight
+from envoxy.zeromq.dispatcher import ZMQ, Dispatcher
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    _flights = SingleFlight()
+    _calls = []
+    _release = threading.Event()
+
+    def _work():
+        _calls.append(1)
+        _release.wait(2)
+        return {"status": 200}
+
+    _results = []
+    _threads = [
+        threading.Thread(target=lambda: _results.append(_flights.do("key", _work)))
+        for _ in range(5)
+    ]
+
+    for _thread in _threads:
+        _thread.start()
+
+    time.sleep(0.05)
+    _release.set()
+
+    for _thread in _threads:
+        _thread.join()
+
+    assert len(_calls) == 1
+    assert _results == [{"status": 200}] * 5
+    assert not _flights.in_flight("key")
+
+
+def test_single_flight_shares_errors_and_times_out_waiters():
+    _flights = SingleFlight()
+    _started = threading.Event()
+    _release = threading.Event()
+
+    def _work():
+        _started.set()
+        _release.wait(2)
+        raise ValueError("backend error")
+
+    _errors = []
+
+    def _leader():
+        try:
+            _flights.do("key", _work)
+        except ValueError as e:
+            _errors.append(e)
+
+    _thread = threading.Thread(target=_leader)
+    _thread.start()
+    _started.wait(2)
+
+    with pytest.raises(TimeoutError):
+        _flights.do("key", _work, timeout=0.01)
+
+    _release.set()
+    _thread.join()
+
+    assert len(_errors) == 1
+
+
+def test_async_single_flight_coalesces_concurrent_calls():
+    _flights = AsyncSingleFlight()
+    _calls = []
+
+    async def _work(value):
+        _calls.append(value)
+        await asyncio.sleep(0.01)
+        return {"value": value}
+
+    async def _run():
+        return await asyncio.gather(
+            *[_flights.do("key", _work, 1) for _ in range(10)]
+        )
+
+    assert asyncio.run(_run()) == [{"value": 1}] * 10
+    assert _calls == [1]
+
+
+def test_single_flight_waiters_do_not_see_the_leader_mutations(monkeypatch):
+    _flights = SingleFlight()
+    _started = threading.Event()
+    _release = threading.Event()
+    _mutated = threading.Event()
+    _deepcopy = copy.deepcopy
+
+    def _late_deepcopy(value):
+        # waiters copy only once the leader's caller changed its reply
+        if threading.current_thread() is not _leader:
+            _mutated.wait(2)
+
+        return _deepcopy(value)
+
+    monkeypatch.setattr("envoxy.utils.singleflight.copy.deepcopy", _late_deepcopy)
+
+    def _work():
+        _started.set()
+        _release.wait(2)
+        return {"status": 200}
+
+    def _lead():
+        _results.append(_flights.do("key", _work))
+        _results[0]["status"] = 500
+        _mutated.set()
+
+    _results = []
+    _waited = []
+    _leader = threading.Thread(target=_lead)
+    _leader.start()
+    _started.wait(2)
+
+    _waiter = threading.Thread(target=lambda: _waited.append(_flights.do("key", _work)))
+    _waiter.start()
+    time.sleep(0.05)
+    _release.set()
+
+    _leader.join()
+    _waiter.join()
+
+    assert _waited == [{"status": 200}]
+
+
+def test_async_single_flight_callers_get_their_own_copy():
+    _flights = AsyncSingleFlight()
+
+    async def _work():
+        await asyncio.sleep(0.01)
+        return {"items": [1]}
+
+    async def _lead():
+        _result = await _flights.do("key", _work)
+        _result["items"].append(2)
+        return _result
+
+    async def _run():
+        return await asyncio.gather(_lead(), _flights.do("key", _work))
+
+    assert asyncio.run(_run()) == [{"items": [1, 2]}, {"items": [1]}]
+
+
+class FakeCache:
+    def __init__(self):
+        self.data = {}
+
+    def get_with_ttl(self, endpoint, method, params):
+        _value, _expires = self.data.get((endpoint, method), ({}, None))
+
+        if not _value:
+            return {}, None
+
+        return _value, int(_expires - time.monotonic())
+
+    def get(self, endpoint, method, params):
+        return self.get_with_ttl(endpoint, method, params)[0]
+
+    def set(self, endpoint, method, params, json_data, ttl=None):
+        self.data[(endpoint, method)] = (json_data, time.monotonic() + ttl)
+
+
+@pytest.fixture
+def cached_zmq_client(tmp_path):
+    _conf_path = tmp_path / "envoxy.json"
+    _conf_path.write_text(
+        json.dumps(
+            {
+                "zmq_workers": {"context_max_workers": 4},
+                "zmq_servers": {
+                    "backend": {
+                        "host": "127.0.0.1",
+                        "port": 1,
+                        "cached_routes": {
+                            "0:/v3/items": {"ttl": 10, "stale_ttl": 30}
+                        },
+                    }
+                },
+            }
+        )
+    )
+
+    _previous_path = Config.file_path
+    Config.set_file_path(str(_conf_path))
+    CircuitBreaker.reset_all()
+    ZMQ._instance = None
+
+    _client = ZMQ.instance()
+    _client._cache = FakeCache()
+
+    yield _client
+
+    ZMQ._instance = None
+    Config.set_file_path(_previous_path)
+
+
+def test_cached_route_misses_are_coalesced(cached_zmq_client, monkeypatch):
+    _calls = []
+
+    def _send(server_key, message, deadline=None):
+        _calls.append(message["resource"])
+        time.sleep(0.05)
+        return {"status": 200, "payload": {"id": 1}}
+
+    monkeypatch.setattr(cached_zmq_client, "_send_and_recv", _send)
+
+    _threads = [
+        threading.Thread(target=Dispatcher.get, args=("backend", "/v3/items"))
+        for _ in range(8)
+    ]
+
+    for _thread in _threads:
+        _thread.start()
+
+    for _thread in _threads:
+        _thread.join()
+
+    assert _calls == ["/v3/items"]
+    # stored for ttl + stale_ttl
+    _, _ttl = cached_zmq_client._cache.get_with_ttl("/v3/items", Performative.GET, None)
+    assert 30 < _ttl <= 40
+
+
+def test_error_replies_are_not_kept_stale(cached_zmq_client, monkeypatch):
+    monkeypatch.setattr(
+        cached_zmq_client,
+        "_send_and_recv",
+        lambda server_key, message, deadline=None: {"status": 503, "payload": {}},
+    )
+
+    Dispatcher.get("backend", "/v3/items")
+
+    # stored for error_ttl only
+    _response, _ttl = cached_zmq_client._cache.get_with_ttl(
+        "/v3/items", Performative.GET, None
+    )
+    assert _response["status"] == 503
+    assert 50 < _ttl <= 60
+
+    # within the last stale_ttl seconds, yet not served as stale
+    cached_zmq_client._cache.set(
+        "/v3/items", Performative.GET, None, {"status": 503, "payload": {}}, 5
+    )
+    _, _is_stale = cached_zmq_client.lookup_cached_response(
+        {"resource": "/v3/items", "performative": Performative.GET},
+        {"ttl": 10, "stale_ttl": 30},
+    )
+    assert not _is_stale
+
+
+def test_stale_cached_route_is_served_and_refreshed(cached_zmq_client, monkeypatch):
+    cached_zmq_client._cache.set(
+        "/v3/items", Performative.GET, None, {"status": 200, "payload": "old"}, 5
+    )
+
+    _refreshed = threading.Event()
+
+    def _send(server_key, message, deadline=None):
+        _refreshed.set()
+        return {"status": 200, "payload": "new"}
+
+    monkeypatch.setattr(cached_zmq_client, "_send_and_recv", _send)
+
+    assert Dispatcher.get("backend", "/v3/items")["payload"] == "old"
+    assert _refreshed.wait(2)
+
+    time.sleep(0.05)
+
+    assert Dispatcher.get("backend", "/v3/items")["payload"] == "new"
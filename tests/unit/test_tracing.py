@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from envoxy.constants import TRACEPARENT_HEADER, Performative
+from envoxy.utils.tracing import (
+    Tracer,
+    current_span,
+    parse_traceparent,
+    tracer,
+)
+from envoxy.zeromq.base import BaseZMQ
+from envoxy.zeromq.dispatcher import Dispatcher
+
+_TRACEPARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (_TRACEPARENT, ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)),
+        (_TRACEPARENT[:-2] + "00", ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", False)),
+        ("00-" + "0" * 32 + "-00f067aa0ba902b7-01", None),
+        ("ff" + _TRACEPARENT[2:], None),
+        ("garbage", None),
+        (None, None),
+    ],
+)
+def test_parse_traceparent(value, expected):
+    assert parse_traceparent(value) == expected
+
+
+def test_child_spans_continue_the_remote_trace():
+    _tracer = Tracer()
+
+    with _tracer.span("http.request", traceparent=_TRACEPARENT, root=True) as _root:
+        assert current_span() is _root
+
+        with _tracer.span("zmq.request") as _child:
+            assert _child.parent_id == _root.span_id
+
+    assert current_span() is None
+    assert _root.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert _root.parent_id == "00f067aa0ba902b7"
+    assert [_span.name for _span in _tracer.spans(_root.trace_id)] == [
+        "zmq.request",
+        "http.request",
+    ]
+
+
+def test_nothing_is_traced_outside_of_a_trace():
+    _tracer = Tracer()
+
+    with _tracer.span("zmq.request") as _span:
+        assert _span is None
+
+    assert _tracer.spans() == []
+
+
+def test_unsampled_traces_propagate_without_recording():
+    _tracer = Tracer()
+    _tracer.configure({"sample_rate": 0})
+
+    with _tracer.span("http.request", root=True) as _root:
+        assert _root.traceparent.endswith("-00")
+
+    assert _tracer.spans() == []
+
+
+def test_span_records_the_error():
+    _tracer = Tracer()
+
+    with pytest.raises(KeyError), _tracer.span("http.request", root=True):
+        raise KeyError("missing")
+
+    assert _tracer.spans()[0].error == "KeyError: 'missing'"
+
+
+def test_json_lines_exporter(tmp_path):
+    _path = tmp_path / "spans.jsonl"
+
+    _tracer = Tracer()
+    _tracer.configure({"exporter": {"path": str(_path), "flush_every": 1}})
+
+    with _tracer.span("http.request", root=True, route="/v3/items"):
+        pass
+
+    _line = json.loads(_path.read_text().splitlines()[0])
+
+    assert _line["name"] == "http.request"
+    assert _line["attributes"] == {"route": "/v3/items"}
+    assert _line["duration"] >= 0
+
+
+def test_zmq_messages_carry_the_traceparent():
+    with tracer.span("http.request", root=True) as _root:
+        _message = Dispatcher.build_message(Performative.GET, "/v3/items")
+
+        assert _message["headers"][TRACEPARENT_HEADER] == _root.traceparent
+
+        # the request span replaces it with its own
+        _span = BaseZMQ().start_span("backend", _message)
+
+    assert _span.parent_id == _root.span_id
+    assert _message["headers"][TRACEPARENT_HEADER] == _span.traceparent
+
+    assert TRACEPARENT_HEADER not in Dispatcher.build_message(Performative.GET, "/v3/items")["headers"]
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import threading
+
+import pytest
+import zmq
+
+from envoxy.constants import Performative
+from envoxy.utils.circuit_breaker import CircuitBreaker
+from envoxy.utils.config import Config
+from envoxy.zeromq.aio import AsyncZMQ
+from envoxy.zeromq.dispatcher import Dispatcher, ZMQTimeoutException
+
+
+class EchoBackend(threading.Thread):
+    """ROUTER backend replying to every request, in reverse arrival order
+    unless ``reverse`` is off."""
+
+    def __init__(self, batch=1, reverse=True, echo_cid=True):
+        super().__init__(daemon=True)
+        self.batch = batch
+        self.reverse = reverse
+        self.echo_cid = echo_cid
+        self.context = zmq.Context()
+        self.socket = self.context.socket(zmq.ROUTER)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.port = self.socket.bind_to_random_port("tcp://127.0.0.1")
+        self.received = []
+
+    def run(self):
+        _poller = zmq.Poller()
+        _poller.register(self.socket, zmq.POLLIN)
+        _batch = []
+
+        while not self.socket.closed:
+            try:
+                if not _poller.poll(50):
+                    continue
+
+                _identity, _delimiter, _body = self.socket.recv_multipart()
+            except zmq.ZMQError:
+                return
+
+            _message = json.loads(_body)
+            self.received.append(_message)
+            _batch.append((_identity, _message))
+
+            if len(_batch) < self.batch:
+                continue
+
+            for _identity, _message in reversed(_batch) if self.reverse else _batch:
+                _headers = dict(_message["headers"])
+
+                if not self.echo_cid:
+                    _headers.pop("X-Cid", None)
+
+                _reply = {
+                    "status": 200,
+                    "headers": _headers,
+                    "payload": {"resource": _message["resource"]},
+                    "performative": Performative.REPLY,
+                }
+                self.socket.send_multipart(
+                    [_identity, b"", json.dumps(_reply).encode()]
+                )
+
+            _batch = []
+
+    def stop(self):
+        self.socket.close(linger=0)
+        self.context.term()
+
+
+@pytest.fixture
+def zmq_backend(tmp_path):
+    _backend = EchoBackend(batch=4)
+    _backend.start()
+
+    _conf_path = tmp_path / "envoxy.json"
+    _conf_path.write_text(
+        json.dumps(
+            {
+                "zmq_servers": {
+                    "backend": {
+                        "host": "127.0.0.1",
+                        "port": _backend.port,
+                        "async_sockets": 2,
+                    }
+                }
+            }
+        )
+    )
+
+    _previous_path = Config.file_path
+    Config.set_file_path(str(_conf_path))
+    CircuitBreaker.reset_all()
+    AsyncZMQ._instance = None
+
+    yield _backend
+
+    AsyncZMQ.instance().close()
+    AsyncZMQ._instance = None
+    Config.set_file_path(_previous_path)
+    _backend.stop()
+
+
+def test_async_requests_are_multiplexed_and_correlated(zmq_backend):
+    async def _run():
+        return await asyncio.gather(
+            *[Dispatcher.aget("backend", f"/v3/items/{_i}") for _i in range(8)]
+        )
+
+    _responses = asyncio.run(_run())
+
+    assert [_r["payload"]["resource"] for _r in _responses] == [
+        f"/v3/items/{_i}" for _i in range(8)
+    ]
+    assert all("X-Cid" not in _r["headers"] for _r in _responses)
+    assert all("performative" not in _r for _r in _responses)
+
+
+def test_async_duplicated_cids_are_disambiguated(zmq_backend):
+    async def _run():
+        return await asyncio.gather(
+            *[
+                Dispatcher.apost(
+                    "backend", f"/v3/items/{_i}", headers={"X-Cid": "same"}
+                )
+                for _i in range(4)
+            ]
+        )
+
+    _responses = asyncio.run(_run())
+
+    assert [_r["payload"]["resource"] for _r in _responses] == [
+        f"/v3/items/{_i}" for _i in range(4)
+    ]
+    assert len({_m["headers"]["X-Cid"] for _m in zmq_backend.received}) == 4
+
+
+def test_async_deadline_is_sent_and_enforced(tmp_path):
+    _backend = EchoBackend(batch=2)
+    _backend.start()
+
+    _conf_path = tmp_path / "envoxy.json"
+    _conf_path.write_text(
+        json.dumps(
+            {"zmq_servers": {"backend": {"host": "127.0.0.1", "port": _backend.port}}}
+        )
+    )
+
+    _previous_path = Config.file_path
+    Config.set_file_path(str(_conf_path))
+    CircuitBreaker.reset_all()
+    AsyncZMQ._instance = None
+
+    try:
+        # the backend only replies in pairs, so a lone request never gets one
+        with pytest.raises(ZMQTimeoutException):
+            asyncio.run(Dispatcher.aget("backend", "/v3/items/1", timeout=0.2))
+
+        _headers = _backend.received[0]["headers"]
+        assert int(_headers["X-Deadline"]) > 0
+    finally:
+        AsyncZMQ.instance().close()
+        AsyncZMQ._instance = None
+        Config.set_file_path(_previous_path)
+        _backend.stop()
+
+
+def test_async_late_reply_without_cid_is_not_given_to_the_next_request(tmp_path):
+    # replies in pairs, in arrival order and without X-Cid
+    _backend = EchoBackend(batch=2, reverse=False, echo_cid=False)
+    _backend.start()
+
+    _conf_path = tmp_path / "envoxy.json"
+    _conf_path.write_text(
+        json.dumps(
+            {
+                "zmq_servers": {
+                    "backend": {
+                        "host": "127.0.0.1",
+                        "port": _backend.port,
+                        "async_sockets": 1,
+                    }
+                }
+            }
+        )
+    )
+
+    _previous_path = Config.file_path
+    Config.set_file_path(str(_conf_path))
+    CircuitBreaker.reset_all()
+    AsyncZMQ._instance = None
+
+    async def _run():
+        with pytest.raises(ZMQTimeoutException):
+            await Dispatcher.aget("backend", "/v3/items/1", timeout=0.2)
+
+        # its reply comes first, just before the one to this request
+        return await Dispatcher.aget("backend", "/v3/items/2", timeout=2)
+
+    try:
+        _response = asyncio.run(_run())
+
+        assert _response["payload"]["resource"] == "/v3/items/2"
+    finally:
+        AsyncZMQ.instance().close()
+        AsyncZMQ._instance = None
+        Config.set_file_path(_previous_path)
+        _backend.stop()
+
+
+def test_bulk_requests_are_pipelined_and_ordered(zmq_backend):
+    _completed = []
+
+    _responses = Dispatcher.bulk_requests(
+        [
+            {
+                "server_key": "backend",
+                "performative": Performative.GET,
+                "url": f"/v3/items/{_i}",
+            }
+            for _i in range(8)
+        ],
+        concurrency=4,
+        callback=lambda _index, _response: _completed.append(_index),
+    )
+
+    assert [_r["payload"]["resource"] for _r in _responses] == [
+        f"/v3/items/{_i}" for _i in range(8)
+    ]
+    assert sorted(_completed) == list(range(8))
+
+
+def test_stream_requests_yields_failures_per_item(zmq_backend):
+    async def _run():
+        _results = {}
+
+        async for _index, _response in Dispatcher.astream_requests(
+            [
+                {
+                    "server_key": "backend",
+                    "performative": Performative.GET,
+                    "url": f"/v3/items/{_i}",
+                }
+                for _i in range(4)
+            ]
+            + [
+                {
+                    "server_key": "backend",
+                    "performative": Performative.GET,
+                    "url": "/v3/items/late",
+                    "timeout": 0.2,
+                }
+            ],
+            # the late request is only sent once the first batch is answered
+            concurrency=4,
+        ):
+            _results[_index] = _response
+
+        return _results
+
+    _results = asyncio.run(_run())
+
+    # the backend answers in batches of 4, the fifth request times out
+    assert isinstance(_results[4], ZMQTimeoutException)
+    assert [_results[_i]["payload"]["resource"] for _i in range(4)] == [
+        f"/v3/items/{_i}" for _i in range(4)
+    ]
@@ -0,0 +1,60 @@
+import datetime
+import decimal
+
+import pytest
+
+from envoxy.zeromq.base import BaseZMQ
+from envoxy.zeromq.codecs import decode_frames, encode_frames, get_codec
+
+_MESSAGE = {
+    "resource": "/v3/items",
+    "performative": 0,
+    "headers": {"X-Cid": "abc"},
+    "params": {"ts": datetime.datetime(2024, 1, 2, 3, 4, 5)},
+    "payload": {"price": decimal.Decimal("1.5"), "ids": [1, 2, 3]},
+}
+
+
+def test_json_without_attachments_keeps_legacy_framing():
+    _frames = encode_frames(get_codec(), _MESSAGE)
+
+    assert len(_frames) == 1
+    assert decode_frames(_frames)["payload"] == {"price": 1.5, "ids": [1, 2, 3]}
+
+
+def test_msgpack_frames_carry_marker_and_attachments():
+    _blob = bytes(range(256)) * 4
+    _frames = encode_frames(get_codec("msgpack"), _MESSAGE, [_blob])
+
+    assert _frames[0] == b"application/msgpack"
+    assert _frames[2] is _blob
+
+    _decoded = decode_frames(_frames)
+
+    assert _decoded["params"]["ts"] == "2024-01-02T03:04:05"
+    assert _decoded["attachments"] == [_blob]
+
+
+def test_decode_response_skips_delimiters():
+    _frames = [b"", b""] + encode_frames(get_codec("msgpack"), {"status": 200})
+
+    assert BaseZMQ().decode_response(_frames) == {"status": 200}
+    assert BaseZMQ().decode_response([b"", b'{"status": 200}']) == {"status": 200}
+
+
+def test_encode_message_moves_attachments_to_frames():
+    _zmq = BaseZMQ()
+    _zmq._instances = {"backend": {"codec": get_codec("json")}}
+
+    _frames = _zmq.encode_message(
+        "backend", {"resource": "/v3/files", "attachments": [b"\x00\x01"]}
+    )
+
+    assert _frames[0] == b"application/json"
+    assert b"attachments" not in _frames[1]
+    assert _frames[2:] == [b"\x00\x01"]
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        get_codec("xml")
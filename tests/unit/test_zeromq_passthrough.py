@@ -0,0 +1,89 @@
+import orjson
+import pytest
+import zmq
+
+from envoxy.views.containers import Response
+from envoxy.zeromq.base import BaseZMQ
+from envoxy.zeromq.passthrough import payload_span, splice_message
+
+
+def _reply(envelope):
+    return [zmq.Frame(orjson.dumps(envelope))]
+
+
+def test_payload_span_finds_last_member():
+    _buffer = b'{"status": 200, "headers": {"a": "{\\"}"}, "payload": {"b": [1, 2]} }'
+    _start, _end = payload_span(_buffer)
+
+    assert _buffer[_start:_end] == b'{"b": [1, 2]}'
+
+
+def test_payload_span_requires_a_payload_object():
+    assert payload_span(b'{"status": 200}') is None
+    assert payload_span(b"[1, 2]") is None
+
+
+def test_raw_reply_slices_payload_from_zero_copy_frames():
+    _raw = BaseZMQ().raw_response(
+        [b""]
+        + _reply(
+            {
+                "status": 201,
+                "headers": {"X-Cid": "abc", "X-Total": "2"},
+                "payload": [{"id": 1}, {"id": 2}],
+            }
+        )
+    )
+
+    assert isinstance(_raw.frames[0], memoryview)
+    assert _raw.status == 201
+    assert _raw.headers == {"X-Total": "2"}
+    assert orjson.loads(_raw.body()) == {
+        "elements": [{"id": 1}, {"id": 2}],
+        "size": 2,
+    }
+
+
+def test_raw_reply_falls_back_when_payload_is_not_last():
+    _raw = BaseZMQ().raw_response(
+        _reply({"payload": {"id": 1}, "status": 200, "performative": 7})
+    )
+
+    assert orjson.loads(_raw.body()) == {"id": 1}
+
+
+def test_response_renders_raw_reply_like_a_decoded_one():
+    _envelope = {"status": 404, "headers": {"X-Custom": "1"}, "payload": {"error": "x"}}
+
+    _raw_response = Response(BaseZMQ().raw_response(_reply(_envelope)))
+    _response = Response(_envelope)
+
+    assert _raw_response.status_code == _response.status_code == 404
+    assert _raw_response.get_data() == _response.get_data()
+    assert _raw_response.headers["X-Custom"] == "1"
+
+
+def test_splice_message_embeds_raw_body():
+    _message = {
+        "resource": "/v3/items",
+        "headers": {"X-Cid": "abc"},
+        "params": {"page": "1"},
+        "payload": None,
+        "performative": 2,
+    }
+    _body = b'{"name": "item", "values": [1, 2.50, 3]}'
+
+    _encoded = splice_message(_message, _body)
+
+    assert _body in _encoded.frames[0]
+    assert orjson.loads(_encoded.frames[0]) == dict(
+        _message, payload=orjson.loads(_body)
+    )
+    assert BaseZMQ().encode_message("backend", _encoded) is _encoded.frames
+
+
+def test_splice_message_rejects_envelope_injection():
+    _message = {"resource": "/v3/items", "headers": {}, "performative": 2}
+
+    with pytest.raises(ValueError):
+        splice_message(_message, b'1, "resource": "/v3/admin"')
@@ -0,0 +1,105 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from envoxy.zeromq.exceptions import ZMQTimeoutException
+from envoxy.zeromq.pool import WorkerPool
+
+
+@pytest.fixture
+def pool_factory():
+    _created = []
+    _destroyed = []
+    _ids = itertools.count()
+
+    def _create():
+        _worker_id = f"worker-{next(_ids)}"
+        _created.append(_worker_id)
+        return _worker_id
+
+    def _factory(min_workers=0, max_workers=2, idle_timeout=None):
+        return WorkerPool(
+            "backend",
+            create=_create,
+            destroy=_destroyed.append,
+            min_workers=min_workers,
+            max_workers=max_workers,
+            idle_timeout=idle_timeout,
+        )
+
+    _factory.created = _created
+    _factory.destroyed = _destroyed
+
+    return _factory
+
+
+def test_pool_prewarms_min_and_grows_lazily(pool_factory):
+    _pool = pool_factory(min_workers=1, max_workers=3)
+
+    assert _pool.stats()["size"] == 1
+
+    _first = _pool.acquire()
+    _second = _pool.acquire()
+
+    assert _first != _second
+    assert _pool.stats()["size"] == 2
+    assert _pool.stats()["in_use"] == 2
+    assert len(pool_factory.created) == 2
+
+
+def test_pool_reuses_most_recently_released_worker(pool_factory):
+    _pool = pool_factory(max_workers=2)
+
+    _first = _pool.acquire()
+    _second = _pool.acquire()
+
+    _pool.release(_first)
+    _pool.release(_second)
+
+    assert _pool.acquire() == _second
+
+
+def test_pool_acquire_times_out_when_exhausted(pool_factory):
+    _pool = pool_factory(max_workers=1)
+    _pool.acquire()
+
+    with pytest.raises(ZMQTimeoutException):
+        _pool.acquire(timeout=0.05)
+
+    assert _pool.stats()["timeouts"] == 1
+    assert _pool.stats()["waiters"] == 0
+
+
+def test_pool_waiter_gets_released_worker(pool_factory):
+    _pool = pool_factory(max_workers=1)
+    _worker_id = _pool.acquire()
+
+    threading.Timer(0.05, _pool.release, args=(_worker_id,)).start()
+
+    assert _pool.acquire(timeout=2) == _worker_id
+
+
+def test_pool_reaps_idle_workers_down_to_min(pool_factory):
+    _pool = pool_factory(min_workers=1, max_workers=3, idle_timeout=0.01)
+
+    _workers = [_pool.acquire() for _ in range(3)]
+
+    for _worker_id in _workers:
+        _pool.release(_worker_id)
+
+    time.sleep(0.02)
+
+    assert _pool.reap() == 2
+    assert _pool.stats()["size"] == 1
+    assert pool_factory.destroyed == _workers[:2]
+
+
+def test_pool_discard_frees_a_slot(pool_factory):
+    _pool = pool_factory(max_workers=1)
+
+    _pool.discard(_pool.acquire())
+
+    assert _pool.stats()["size"] == 0
+    assert _pool.acquire(timeout=0.05) == "worker-1"
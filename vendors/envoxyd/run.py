@@ -15,6 +15,14 @@ import uwsgi
 from flask import Flask, request, g
 from flask_cors import CORS
 from envoxy.db.orm.listeners import register_envoxy_listeners
+from envoxy.utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics
+from envoxy.utils.tracing import activate, deactivate, tracer
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    'envoxy_http_request_duration_seconds',
+    'Duration of the HTTP requests by method and status code.',
+    ('method', 'status'),
+)
 
 
 # CRITICAL: Ensure editable install finders are registered in THIS interpreter
@@ -238,6 +246,20 @@ def load_packages(_package_list):
     return _view_classes
 
 
+def _restart_log_sink():
+    # the uwsgi workers are forked without the writer thread of the master
+    if envoxy.log.sink() is not None:
+        envoxy.log.sink().start()
+
+
+def _watch_config():
+    # reload the connectors when the config file changes, see Config.subscribe
+    _reload_conf = envoxy.Config.get('reload') or {}
+
+    if _reload_conf.get('enabled'):
+        envoxy.Config.watch(_reload_conf.get('interval'))
+
+
 class AppContext(object):
 
     _app = None
@@ -266,6 +288,38 @@ class AppContext(object):
                 """
                 return Response({"status": "healthy", "service": "envoxy"}, status=200, mimetype='application/json')
 
+            # Every uwsgi worker mirrors its metrics into this directory so
+            # any of them can report the totals
+            _metrics_conf = uwsgi.opt.get('conf_content', {}).get('metrics') or {}
+
+            if _metrics_conf.get('directory'):
+                metrics.configure(_metrics_conf['directory'])
+
+            tracer.configure(uwsgi.opt.get('conf_content', {}).get('tracing'))
+
+            # Write the log records from a background thread
+            _log_conf = uwsgi.opt.get('conf_content', {}).get('log') or {}
+
+            if _log_conf.get('sink'):
+                envoxy.log.configure_sink(_log_conf['sink'])
+
+            try:
+                from uwsgidecorators import postfork
+                postfork(metrics.after_fork)
+                postfork(_restart_log_sink)
+                postfork(_watch_config)
+            except ImportError:
+                pass
+
+            @cls._app.route('/_metrics')
+            def _internal_metrics():
+                """Internal metrics endpoint in the Prometheus text format.
+
+                Like ``/_health`` it is registered by the framework and meant
+                for the monitoring scraper only.
+                """
+                return Response(metrics.render(), status=200, content_type=METRICS_CONTENT_TYPE)
+
             if 'mode' in uwsgi.opt and uwsgi.opt['mode'] == b'test':
 
                 @cls._app.route('/')
@@ -348,9 +402,33 @@ class AppContext(object):
                         _server_key = _default_zmq_backend.get(
                             'server_key', next(iter(zmqc.instance()._instances.keys())))
 
+                        # Proxy the request body and the backend reply
+                        # without decoding and re-encoding their payloads
+                        _passthrough = _default_zmq_backend.get('passthrough', False)
+
                         @cls._app.route(f'{_path_prefix}<path:path>', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD'])
                         def default_zmq_backend(path):
 
+                            if _passthrough:
+
+                                try:
+                                    _body = request.get_data() if request.is_json else None
+
+                                    return Response(
+                                        zmqc.proxy(
+                                            _server_key,
+                                            envoxy.Performative[request.method],
+                                            f'{_path_prefix}{path}',
+                                            body=_body,
+                                            params=request.args if request.args else None,
+                                            headers=request.headers.items() if request.headers else None
+                                        )
+                                    )
+
+                                except ValueError as e:
+
+                                    return Response({'status': 400, 'payload': {'error': f'Invalid request: {e}'}})
+
                             _method = request.method.lower()
 
                             _fn = getattr(zmqc, _method, None)
@@ -450,8 +528,19 @@ app = AppContext.app()
 @app.before_request
 def before_request():
 
-    if envoxy.log.is_gte_log_level(envoxy.log.VERBOSE):
-        g.start = time.time()
+    g.start = time.time()
+
+    # Root span of the request, continuing the caller's trace if any
+    g.span = tracer.start_span(
+        'http.request',
+        traceparent=request.headers.get(envoxy.TRACEPARENT_HEADER),
+        root=True,
+        method=request.method,
+        route=request.url_rule.rule if request.url_rule else request.path,
+    )
+
+    if g.span is not None:
+        g.span_token = activate(g.span)
 
     if envoxy.log.is_gte_log_level(envoxy.log.INFO):
 
@@ -521,6 +610,13 @@ def after_request(response):
     _ts = time.time()
     uwsgi.opt['last_event_ms'] = _ts
 
+    if 'start' in g:
+        HTTP_REQUEST_SECONDS.labels(request.method, response.status_code).observe(_ts - g.start)
+
+    if g.get('span') is not None:
+        g.span.set_attribute('status', response.status_code)
+        response.headers[envoxy.TRACEPARENT_HEADER] = g.span.traceparent
+
     if envoxy.log.is_gte_log_level(envoxy.log.VERBOSE):
 
         envoxy.log.verbose('updating last_event_ms {}'.format(_ts))
@@ -531,3 +627,18 @@ def after_request(response):
             f"Request {request.full_path if request.full_path[-1] != '?' else request.path} took {_duration} sec")
 
     return response
+
+
+@app.teardown_request
+def teardown_request(exception=None):
+
+    if g.get('span') is not None:
+        tracer.finish(g.span, exception)
+
+        try:
+            deactivate(g.span_token)
+        except ValueError:
+            # set in another context, it is dropped along with it
+            pass
+
+        g.span = None